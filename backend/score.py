@@ -13,7 +13,11 @@ from langserve import add_routes
 from langchain_google_vertexai import ChatVertexAI
 from src.api_response import create_api_response
 from src.graphDB_dataAccess import graphDBdataAccess
-from src.graph_query import get_graph_results,get_chunktext_results,visualize_schema
+from src.graph_query import get_graph_results,get_chunktext_results,visualize_schema,driver_pool
+from src.job_queue import get_extract_worker_pool
+from src.shared.executors import event_loop_lag_monitor, run_io, shutdown_executors
+from src.shared.chunked_upload import get_missing_upload_parts
+from src.shared.neo4j_pool import checkout_scope
 from src.chunkid_entities import get_entities_from_chunkids
 from src.post_processing import create_vector_fulltext_indexes, create_entity_embedding, graph_schema_consolidation
 from sse_starlette.sse import EventSourceResponse
@@ -44,7 +48,7 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 logger = CustomLogger()
-CHUNK_DIR = os.path.join(os.path.dirname(__file__), "chunks")
+extract_worker_pool = get_extract_worker_pool(lambda params: run_extraction_in_checkout_scope(params))
 MERGED_DIR = os.path.join(os.path.dirname(__file__), "merged_files")
 
 DEFAULT_TOKEN_CHUNK_SIZE = 100
@@ -327,6 +331,17 @@ class CustomGZipMiddleware:
             compresslevel=self.compresslevel
         )
         await gzip_middleware(scope, receive, send)
+
+class ConnectionCheckoutMiddleware:
+    """Keep the pooled Neo4j connections used by a request checked out until its response is sent."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with checkout_scope():
+            await self.app(scope, receive, send)
 app = FastAPI()
 app.add_middleware(XContentTypeOptions)
 app.add_middleware(XFrame, Option={'X-Frame-Options': 'DENY'})
@@ -338,6 +353,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(SessionMiddleware, secret_key=os.urandom(24))
+app.add_middleware(ConnectionCheckoutMiddleware)
+
+@app.on_event("startup")
+def start_extract_workers():
+    event_loop_lag_monitor.start()
+    extract_worker_pool.start()
+
+@app.on_event("shutdown")
+async def close_neo4j_connections():
+    await extract_worker_pool.stop()
+    await event_loop_lag_monitor.stop()
+    shutdown_executors()
+    graph_connection_pool.close_all()
+    driver_pool.close_all()
 
 is_gemini_enabled = os.environ.get("GEMINI_ENABLED", "False").lower() in ("true", "1", "yes")
 if is_gemini_enabled:
@@ -394,7 +423,7 @@ async def create_source_knowledge_graph_url(
             lst_file_name,success_count,failed_count = await asyncio.to_thread(create_source_node_graph_url_s3,graph, model, source_url, aws_access_key_id, aws_secret_access_key, source_type
             )
         elif source_type == 'gcs bucket':
-            lst_file_name,success_count,failed_count = create_source_node_graph_url_gcs(graph, model, gcs_project_id, gcs_bucket_name, gcs_bucket_folder, source_type,Credentials(access_token)
+            lst_file_name,success_count,failed_count = await asyncio.to_thread(create_source_node_graph_url_gcs,graph, model, gcs_project_id, gcs_bucket_name, gcs_bucket_folder, source_type,Credentials(access_token)
             )
         elif source_type == 'web-url':
             lst_file_name,success_count,failed_count = await asyncio.to_thread(create_source_node_graph_web_url,graph, model, source_url, source_type
@@ -461,11 +490,13 @@ async def extract_knowledge_graph_from_file(
     access_token=Form(None),
     retry_condition=Form(None),
     additional_instructions=Form(None),
-    email=Form(None)
+    email=Form(None),
+    async_job=Form(None),
+    priority: Optional[int] = Form(None)
 ):
     """
-    Calls 'extract_graph_from_file' in a new thread to create Neo4jGraph from a
-    PDF file based on the model.
+    Queues the extraction of a source as a background job to create Neo4jGraph
+    from it based on the model.
 
     Args:
           uri: URI of the graph to extract
@@ -473,9 +504,65 @@ async def extract_knowledge_graph_from_file(
           password: Password to use for graph creation
           file: File object containing the PDF file
           model: Type of model to use ('Diffbot'or'OpenAI GPT')
+          async_job: When true, return the job id at once instead of waiting for the job
+          priority: Jobs with a higher priority are processed first
 
     Returns:
-          Nodes and Relations created in Neo4j databse for the pdf file
+          Nodes and Relations created in Neo4j databse for the pdf file, or the job id
+    """
+    params = {
+        'uri': uri, 'userName': userName, 'password': password, 'model': model, 'database': database,
+        'source_url': source_url, 'aws_access_key_id': aws_access_key_id, 'aws_secret_access_key': aws_secret_access_key,
+        'wiki_query': wiki_query, 'gcs_project_id': gcs_project_id, 'gcs_bucket_name': gcs_bucket_name,
+        'gcs_bucket_folder': gcs_bucket_folder, 'gcs_blob_filename': gcs_blob_filename, 'source_type': source_type,
+        'file_name': file_name, 'allowedNodes': allowedNodes, 'allowedRelationship': allowedRelationship,
+        'token_chunk_size': token_chunk_size, 'chunk_overlap': chunk_overlap, 'chunks_to_combine': chunks_to_combine,
+        'language': language, 'access_token': access_token, 'retry_condition': retry_condition,
+        'additional_instructions': additional_instructions, 'email': email,
+    }
+    job_id = extract_worker_pool.submit(params, priority or 0)
+    logging.info(f"Queued extraction job {job_id} for file name {file_name}")
+    if str(async_job).lower() in ("true", "1", "yes"):
+        return create_api_response('Success', data={'job_id': job_id, 'status': 'queued'}, file_name=file_name)
+    return await extract_worker_pool.wait(job_id)
+
+
+@app.get("/event_loop_lag")
+async def event_loop_lag():
+    """
+    Returns how late the event loop has been waking up tasks; a sustained lag means blocking work runs on the loop thread.
+    """
+    return create_api_response('Success', data=event_loop_lag_monitor.snapshot())
+
+
+@app.post("/extract_job_status")
+async def extract_job_status(job_id=Form()):
+    """
+    Returns the status of a job queued by /extract and, once it is finished, its response.
+    """
+    try:
+        job = extract_worker_pool.queue.get(job_id)
+        if job is None:
+            return create_api_response('Failed', message=f'Extraction job {job_id} not found')
+        return create_api_response('Success', data=job)
+    except Exception as e:
+        error_message = str(e)
+        logging.exception(f'Exception in getting the extraction job status:{error_message}')
+        return create_api_response('Failed', message='Unable to get the extraction job status', error=error_message)
+
+
+async def run_extraction_in_checkout_scope(params):
+    """Run an extraction job in its own checkout scope, so the pool does not close its connections mid-run."""
+    with checkout_scope():
+        return await run_extraction(**params)
+
+async def run_extraction(uri, userName, password, model, database, source_url, aws_access_key_id, aws_secret_access_key,
+                         wiki_query, gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, source_type,
+                         file_name, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine,
+                         language, access_token, retry_condition, additional_instructions, email):
+    """
+    Worker body of an extraction job: runs processing_source for the source
+    and returns the API response of the job.
     """
     try:
         start_time = time.time()
@@ -484,8 +571,6 @@ async def extract_knowledge_graph_from_file(
             chunk_overlap,
             chunks_to_combine,
         ) = resolve_chunk_settings(token_chunk_size, chunk_overlap, chunks_to_combine)
-        graph = create_graph_database_connection(uri, userName, password, database)
-        graphDb_data_Access = graphDBdataAccess(graph)
         if source_type == 'local file':
             file_name = sanitize_filename(file_name)
             merged_file_path = validate_file_path(MERGED_DIR, file_name)
@@ -511,10 +596,10 @@ async def extract_knowledge_graph_from_file(
         if result is not None:
             logging.info("Going for counting nodes and relationships in extract")
             count_node_time = time.time()
-            graph = create_graph_database_connection(uri, userName, password, database)   
+            graph = await run_io(create_graph_database_connection, uri, userName, password, database)
             graphDb_data_Access = graphDBdataAccess(graph)
-            count_response = graphDb_data_Access.update_node_relationship_count(file_name)
-            logging.info("Nodes and Relationship Counts updated")
+            count_response = await run_io(graphDb_data_Access.get_node_relationship_count, file_name)
+            logging.info("Nodes and Relationship Counts fetched")
             if count_response :
                 result['chunkNodeCount'] = count_response[file_name].get('chunkNodeCount',"0")
                 result['chunkRelCount'] =  count_response[file_name].get('chunkRelCount',"0")
@@ -667,10 +752,9 @@ async def chat_bot(uri=Form(None),model=Form(None),userName=Form(None), password
     logging.info(f"QA_RAG called at {datetime.now()}")
     qa_rag_start_time = time.time()
     try:
+        graph = create_graph_database_connection(uri, userName, password, database)
         if mode == "graph":
-            graph = Neo4jGraph( url=uri,username=userName,password=password,database=database,sanitize = True, refresh_schema=True)
-        else:
-            graph = create_graph_database_connection(uri, userName, password, database)
+            await asyncio.to_thread(graph.refresh_schema)
         
         graph_DB_dataAccess = graphDBdataAccess(graph)
         write_access = graph_DB_dataAccess.check_account_access(database=database)
@@ -811,18 +895,18 @@ async def connect(uri=Form(None), userName=Form(None), password=Form(None), data
 @app.post("/upload")
 async def upload_large_file_into_chunks(file:UploadFile = File(...), chunkNumber=Form(None), totalChunks=Form(None),
                                         originalname=Form(None), model=Form(None), uri=Form(None), userName=Form(None),
-                                        password=Form(None), database=Form(None), project=Form(None), email=Form(None)):
+                                        password=Form(None), database=Form(None), project=Form(None), email=Form(None),
+                                        chunkSize=Form(None)):
     try:
         start = time.time()
         graph = create_graph_database_connection(uri, userName, password, database)
-        result = await asyncio.to_thread(upload_file, graph, model, file, chunkNumber, totalChunks, originalname, uri, CHUNK_DIR, MERGED_DIR, project)
+        result = await asyncio.to_thread(upload_file, graph, model, file, chunkNumber, totalChunks, originalname, uri, MERGED_DIR, project, chunkSize)
         end = time.time()
         elapsed_time = end - start
-        if int(chunkNumber) == int(totalChunks):
+        if isinstance(result, dict):
             json_obj = {'api_name':'upload','db_url':uri,'userName':userName, 'database':database, 'chunkNumber':chunkNumber,'totalChunks':totalChunks,
                                 'original_file_name':originalname,'model':model, 'logging_time': formatted_time(datetime.now(timezone.utc)), 'elapsed_api_time':f'{elapsed_time:.2f}','email':email}
             logger.log_struct(json_obj, "INFO")
-        if int(chunkNumber) == int(totalChunks):
             return create_api_response('Success',data=result, message='Source Node Created Successfully')
         else:
             return create_api_response('Success', message=result)
@@ -837,6 +921,19 @@ async def upload_large_file_into_chunks(file:UploadFile = File(...), chunkNumber
         return create_api_response('Failed', message=message + error_message[:100], error=error_message, file_name = originalname)
     finally:
         gc.collect()
+
+@app.post("/upload_status")
+async def upload_status(originalname=Form(), totalChunks=Form()):
+    """
+    Returns the chunk numbers of an upload that were not received yet, so an interrupted upload resumes with only those.
+    """
+    try:
+        missing = await asyncio.to_thread(get_missing_upload_parts, MERGED_DIR, originalname, totalChunks)
+        return create_api_response('Success', data={'file_name': originalname, 'missing_chunks': missing})
+    except Exception as e:
+        error_message = str(e)
+        logging.exception(f'Exception in getting the upload status:{error_message}')
+        return create_api_response('Failed', message='Unable to get the upload status', error=error_message)
             
 @app.post("/schema")
 async def get_structured_schema(uri=Form(None), userName=Form(None), password=Form(None), database=Form(None),email=Form(None)):
@@ -991,8 +1088,10 @@ async def get_document_status(file_name, url, userName, password, database):
 async def cancelled_job(uri=Form(None), userName=Form(None), password=Form(None), database=Form(None), filenames=Form(None), source_types=Form(None),email=Form(None)):
     try:
         start = time.time()
+        for file_name in json.loads(filenames):
+            extract_worker_pool.cancel_queued(uri, userName, database, file_name.strip())
         graph = create_graph_database_connection(uri, userName, password, database)
-        result = manually_cancelled_job(graph,filenames, source_types, MERGED_DIR, uri)
+        result = manually_cancelled_job(graph,filenames, source_types, MERGED_DIR, uri, userName, database)
         end = time.time()
         elapsed_time = end - start
         json_obj = {'api_name':'cancelled_job','db_url':uri, 'userName':userName, 'database':database, 'filenames':filenames,
@@ -1012,7 +1111,8 @@ async def cancelled_job(uri=Form(None), userName=Form(None), password=Form(None)
 async def populate_graph_schema(input_text=Form(None), model=Form(None), is_schema_description_checked=Form(None),is_local_storage=Form(None),email=Form(None)):
     try:
         start = time.time()
-        result = populate_graph_schema_from_text(input_text, model, is_schema_description_checked, is_local_storage)
+        # The LLM call and the governor's waits block, so they run off the event loop.
+        result = await asyncio.to_thread(populate_graph_schema_from_text, input_text, model, is_schema_description_checked, is_local_storage)
         end = time.time()
         elapsed_time = end - start
         json_obj = {'api_name':'populate_graph_schema', 'model':model, 'is_schema_description_checked':is_schema_description_checked, 'input_text':input_text, 'logging_time': formatted_time(datetime.now(timezone.utc)), 'elapsed_api_time':f'{elapsed_time:.2f}','email':email}
@@ -1285,7 +1385,7 @@ async def backend_connection_configuration():
         password= os.getenv('NEO4J_PASSWORD')
         gcs_file_cache = os.environ.get('GCS_FILE_CACHE')
         if all([uri, username, database, password]):
-            graph = Neo4jGraph()
+            graph = create_graph_database_connection(uri, username, password, database)
             logging.info(f'login connection status of object: {graph}')
             if graph is not None:
                 graph_connection = True        
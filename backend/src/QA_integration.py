@@ -33,7 +33,8 @@ from langchain_aws import ChatBedrock
 from langchain_community.chat_models import ChatOllama
 
 # Local imports
-from src.llm import get_llm
+from src.llm import get_llm, get_governor
+from src.shared.llm_governor import estimate_tokens
 from src.shared.common_fn import load_embedding_model
 from src.shared.constants import *
 load_dotenv() 
@@ -273,11 +274,11 @@ def process_documents(docs, question, messages, llm, model,chat_mode_settings):
         
         rag_chain = get_rag_chain(llm=llm)
         
-        ai_response = rag_chain.invoke({
+        ai_response = get_governor(llm).run(rag_chain.invoke, {
             "messages": messages[:-1],
             "context": formatted_docs,
             "input": question
-        })
+        }, tokens=estimate_tokens(formatted_docs + question))
 
         result = {'sources': list(), 'nodedetails': dict(), 'entities': dict()}
         node_details = {"chunkdetails":list(),"entitydetails":list(),"communitydetails":list()}
@@ -554,7 +555,7 @@ def summarize_and_log(history, stored_messages, llm):
         )
         summarization_chain = summarization_prompt | llm
 
-        summary_message = summarization_chain.invoke({"chat_history": stored_messages})
+        summary_message = get_governor(llm).run(summarization_chain.invoke, {"chat_history": stored_messages}, tokens=estimate_tokens("".join(str(message.content) for message in stored_messages)))
 
         with threading.Lock():
             history.clear()
@@ -593,9 +594,12 @@ def create_graph_chain(model, graph):
     except Exception as e:
         logging.error(f"An error occurred while creating the GraphCypherQAChain instance. : {e}") 
 
-def get_graph_response(graph_chain, question):
+def get_graph_response(graph_chain, question, governor=None):
     try:
-        cypher_res = graph_chain.invoke({"query": question})
+        if governor is not None:
+            cypher_res = governor.run(graph_chain.invoke, {"query": question}, tokens=estimate_tokens(question))
+        else:
+            cypher_res = graph_chain.invoke({"query": question})
         
         response = cypher_res.get("result")
         cypher_query = ""
@@ -620,7 +624,7 @@ def process_graph_response(model, graph, question, messages, history):
     try:
         graph_chain, qa_llm, model_version = create_graph_chain(model, graph)
         
-        graph_response = get_graph_response(graph_chain, question)
+        graph_response = get_graph_response(graph_chain, question, governor=get_governor(qa_llm))
         
         ai_response_content = graph_response.get("response", "Something went wrong")
         ai_response = AIMessage(content=ai_response_content)
@@ -1,11 +1,13 @@
 import logging
 from graphdatascience import GraphDataScience
 from src.llm import get_llm
+from src.shared.llm_governor import estimate_tokens, get_llm_governor
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser 
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 from src.shared.common_fn import load_embedding_model
+from src.shared.embedding_cache import embed_texts_with_cache
 
 
 COMMUNITY_PROJECTION_NAME = "communities"
@@ -290,13 +292,16 @@ def prepare_string(community_data):
         logging.error(f"Failed to prepare string from community data: {e}")
         raise
 
-def process_community_info(community, chain, is_parent=False):
+def process_community_info(community, chain, is_parent=False, governor=None):
     try:
         if is_parent:
             combined_text = " ".join(f"Summary {i+1}: {summary}" for i, summary in enumerate(community.get("texts", [])))
         else:
             combined_text = prepare_string(community)
-        summary_response = chain.invoke({'community_info': combined_text})
+        if governor is not None:
+            summary_response = governor.run(chain.invoke, {'community_info': combined_text}, tokens=estimate_tokens(combined_text))
+        else:
+            summary_response = chain.invoke({'community_info': combined_text})
         lines = summary_response.splitlines()
         title = "Untitled Community"
         summary = ""
@@ -315,10 +320,11 @@ def create_community_summaries(gds, model):
     try:
         community_info_list = gds.run_cypher(GET_COMMUNITY_INFO)
         community_chain = get_community_chain(model)
+        governor = get_llm_governor(model)
 
         summaries = []
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(process_community_info, community, community_chain) for community in community_info_list.to_dict(orient="records")]
+        with ThreadPoolExecutor(max_workers=governor.max_concurrency) as executor:
+            futures = [executor.submit(process_community_info, community, community_chain, governor=governor) for community in community_info_list.to_dict(orient="records")]
    
             for future in as_completed(futures):
                 result = future.result()
@@ -333,8 +339,8 @@ def create_community_summaries(gds, model):
         parent_community_chain = get_community_chain(model, is_parent=True)
 
         parent_summaries = []
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(process_community_info, community, parent_community_chain, is_parent=True) for community in parent_community_info.to_dict(orient="records")]
+        with ThreadPoolExecutor(max_workers=governor.max_concurrency) as executor:
+            futures = [executor.submit(process_community_info, community, parent_community_chain, is_parent=True, governor=governor) for community in parent_community_info.to_dict(orient="records")]
             
             for future in as_completed(futures):
                 result = future.result()
@@ -363,12 +369,13 @@ def create_community_embeddings(gds):
         batch_size = 100
         for i in range(0, len(rows), batch_size):
             batch_rows = rows[i:i+batch_size]            
-            for row in batch_rows:
-                try:
-                    row['embedding'] = embeddings.embed_query(row['text'])
-                except Exception as e:
-                    logging.error(f"Failed to embed text for community ID {row['communityId']}: {e}")
-                    row['embedding'] = None
+            try:
+                vectors = embed_texts_with_cache(embeddings, [row['text'] for row in batch_rows], dimension, embedding_model)
+            except Exception as e:
+                logging.error(f"Failed to embed text for community IDs {[row['communityId'] for row in batch_rows]}: {e}")
+                vectors = [None] * len(batch_rows)
+            for row, vector in zip(batch_rows, vectors):
+                row['embedding'] = vector
             
             try:
                 logging.info("Writing embeddings to the database.")
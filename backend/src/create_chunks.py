@@ -1,16 +1,73 @@
-from langchain_text_splitters import TokenTextSplitter
 from langchain.docstore.document import Document
 from langchain_neo4j import Neo4jGraph
 import logging
 from src.document_sources.youtube import get_chunks_with_timestamps, get_calculated_timestamps
+import functools
+import itertools
 import re
 import os
+from typing import AbstractSet, Collection, Iterable, Literal, Union
+import tiktoken
 
 logging.basicConfig(format="%(asctime)s - %(message)s", level="INFO")
 
+# Drops double and single quotes and turns newlines into spaces in one pass.
+CLEAN_TEXT_TABLE = str.maketrans({'"': None, "'": None, "\n": " "})
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_encoding(encoding_name: str = "gpt2") -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process; gpt2 is the TokenTextSplitter default."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+def clean_text(text: str) -> str:
+    return text.translate(CLEAN_TEXT_TABLE)
+
+
+class TokenWindowSplitter:
+    """
+    Token splitter equivalent to langchain's TokenTextSplitter. Each text is
+    encoded once and chunks are decoded from fixed windows of the token list,
+    ``chunk_size`` tokens long and ``chunk_size - chunk_overlap`` apart.
+    Special tokens are handled like TokenTextSplitter: by default a text
+    containing one raises a ValueError.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, encoding: tiktoken.Encoding = None,
+                 allowed_special: Union[Literal["all"], AbstractSet[str]] = frozenset(),
+                 disallowed_special: Union[Literal["all"], Collection[str]] = "all"):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap {chunk_overlap} must be smaller than chunk_size {chunk_size}")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding = encoding or get_token_encoding()
+        self.allowed_special = allowed_special
+        self.disallowed_special = disallowed_special
+
+    def split_text(self, text: str) -> list[str]:
+        tokens = self.encoding.encode(text, allowed_special=self.allowed_special, disallowed_special=self.disallowed_special)
+        chunks = []
+        step = self.chunk_size - self.chunk_overlap
+        for start in range(0, len(tokens), step):
+            end = min(start + self.chunk_size, len(tokens))
+            chunk_text = self.encoding.decode(tokens[start:end])
+            if chunk_text:
+                chunks.append(chunk_text)
+            if end == len(tokens):
+                break
+        return chunks
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        return [
+            Document(page_content=chunk_text, metadata=dict(document.metadata))
+            for document in documents
+            for chunk_text in self.split_text(document.page_content)
+        ]
+
 
 class CreateChunksofDocument:
-    def __init__(self, pages: list[Document], graph: Neo4jGraph):
+    def __init__(self, pages: Iterable[Document], graph: Neo4jGraph):
         self.pages = pages
         self.graph = graph
 
@@ -18,8 +75,12 @@ class CreateChunksofDocument:
         """
         Split a list of documents(file pages) into chunks of fixed size.
 
+        Pages are consumed one at a time and no page is read once the chunk
+        budget of MAX_TOKEN_CHUNK_SIZE // token_chunk_size is reached, so a
+        lazy page iterator never parses the rest of a large file.
+
         Args:
-            pages: A list of pages to split. Each page is a list of text strings.
+            pages: A list or iterator of pages to split.
 
         Returns:
             A list of chunks each of which is a langchain Document.
@@ -62,32 +123,64 @@ class CreateChunksofDocument:
             )
             max_token_chunk_size = 10000
 
-        text_splitter = TokenTextSplitter(
+        text_splitter = TokenWindowSplitter(
             chunk_size=token_chunk_size, chunk_overlap=chunk_overlap
         )
         chunk_to_be_created = max(max_token_chunk_size // token_chunk_size, 1)
 
-        if 'page' in self.pages[0].metadata:
-            chunks = []
-            for i, document in enumerate(self.pages):
-                page_number = i + 1
-                if len(chunks) >= chunk_to_be_created:
-                    break
-                else:
-                    for chunk in text_splitter.split_documents([document]):
-                        chunks.append(Document(page_content=chunk.page_content, metadata={'page_number':page_number}))    
-        
-        elif 'length' in self.pages[0].metadata:
-            if len(self.pages) == 1  or (len(self.pages) > 1 and self.pages[1].page_content.strip() == ''): 
-                match = re.search(r'(?:v=)([0-9A-Za-z_-]{11})\s*',self.pages[0].metadata['source'])
+        pages = iter(self.pages)
+        first_page = next(pages, None)
+        if first_page is None:
+            return []
+        pages = itertools.chain([first_page], pages)
+
+        if 'length' in first_page.metadata:
+            pages = list(pages)
+            if len(pages) == 1  or (len(pages) > 1 and pages[1].page_content.strip() == ''): 
+                match = re.search(r'(?:v=)([0-9A-Za-z_-]{11})\s*',pages[0].metadata['source'])
                 youtube_id=match.group(1)   
-                chunks_without_time_range = text_splitter.split_documents([self.pages[0]])
+                chunks_without_time_range = text_splitter.split_documents([pages[0]])
                 chunks = get_calculated_timestamps(chunks_without_time_range[:chunk_to_be_created], youtube_id)
             else: 
-                chunks_without_time_range = text_splitter.split_documents(self.pages)
+                chunks_without_time_range = text_splitter.split_documents(pages)
                 chunks = get_chunks_with_timestamps(chunks_without_time_range[:chunk_to_be_created])
         else:
-            chunks = text_splitter.split_documents(self.pages)
+            has_page_numbers = 'page' in first_page.metadata
+            chunks = []
+            for i, document in enumerate(pages):
+                for chunk in text_splitter.split_documents([document]):
+                    if has_page_numbers:
+                        chunks.append(Document(page_content=chunk.page_content, metadata={'page_number':i + 1}))
+                    else:
+                        chunks.append(chunk)
+                if len(chunks) >= chunk_to_be_created:
+                    break
             
         chunks = chunks[:chunk_to_be_created]
-        return chunks
\ No newline at end of file
+        return chunks
+
+
+def clean_page(page: Document) -> Document:
+    return Document(page_content=clean_text(str(page.page_content)), metadata=page.metadata)
+
+
+def split_pages_into_chunks(pages: Iterable[Document], token_chunk_size, chunk_overlap):
+    """
+    Clean the page texts and split them into chunks, one page at a time.
+    Module level so that it can run in the extraction process pool.
+    """
+    return CreateChunksofDocument((clean_page(page) for page in pages), None).split_file_into_chunks(token_chunk_size, chunk_overlap)
+
+
+def split_file_by_path_into_chunks(file_path, file_name, token_chunk_size, chunk_overlap):
+    """
+    Parse, clean and chunk a local file as one streaming pipeline; parsing
+    stops at the page that fills the chunk budget. Returns the file name and
+    its chunks.
+    """
+    from src.document_sources.local_file import iter_documents_from_file_by_path
+    pages = iter_documents_from_file_by_path(file_path, file_name)
+    try:
+        return file_name, split_pages_into_chunks(pages, token_chunk_size, chunk_overlap)
+    finally:
+        pages.close()
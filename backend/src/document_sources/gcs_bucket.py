@@ -3,58 +3,75 @@ import logging
 from google.cloud import storage
 from langchain_community.document_loaders import GCSFileLoader
 from langchain_core.documents import Document
-from PyPDF2 import PdfReader
-import io
+import tempfile
 from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
 from google.oauth2.credentials import Credentials
+from google.api_core.exceptions import NotFound
 import time
 import nltk
 from .local_file import load_document_content
+from src.shared.chunk_storage import ChunkStorage, compose_parts
 
-def get_gcs_bucket_files_info(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, creds):
+# Only the blob properties the scan reads are requested from the list API.
+GCS_LIST_FIELDS = "items(name,size,contentType,mediaLink),nextPageToken"
+GCS_LIST_PAGE_SIZE = 1000
+
+def iter_gcs_bucket_files_info(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, creds):
+    """Yield the PDF files under the bucket folder while the list pages are fetched."""
     storage_client = storage.Client(project=gcs_project_id, credentials=creds)
     file_name=''
     try:
-      bucket = storage_client.bucket(gcs_bucket_name.strip())
-      buckets_list = [bkt.name for bkt in storage_client.list_buckets()]
-      if bucket.name in buckets_list:
-        blobs = storage_client.list_blobs(gcs_bucket_name.strip(), prefix=gcs_bucket_folder if gcs_bucket_folder else '')
-        lst_file_metadata=[]
-        for blob in blobs:
-          if blob.content_type == 'application/pdf':
-            folder_name, file_name = os.path.split(blob.name)
-            file_size = blob.size
-            source_url= blob.media_link
-            gcs_bucket = gcs_bucket_name
-            lst_file_metadata.append({'fileName':file_name,'fileSize':file_size,'url':source_url, 
-                                      'gcsBucket': gcs_bucket, 'gcsBucketFolder':folder_name if folder_name else '',
-                                      'gcsProjectId': gcs_project_id}) 
-        return lst_file_metadata
-      else:
-        file_name=''
-        message=f" Bucket:{gcs_bucket_name} does not exist in Project:{gcs_project_id}. Please provide valid GCS bucket name"
-        logging.info(f"Bucket : {gcs_bucket_name} does not exist in project : {gcs_project_id}")
-        raise LLMGraphBuilderException(message)
+      blobs = storage_client.list_blobs(gcs_bucket_name.strip(), prefix=gcs_bucket_folder if gcs_bucket_folder else '',
+                                        fields=GCS_LIST_FIELDS, page_size=GCS_LIST_PAGE_SIZE)
+      for blob in blobs:
+        if blob.content_type == 'application/pdf':
+          folder_name, file_name = os.path.split(blob.name)
+          yield {'fileName':file_name,'fileSize':blob.size,'url':blob.media_link, 
+                 'gcsBucket': gcs_bucket_name, 'gcsBucketFolder':folder_name if folder_name else '',
+                 'gcsProjectId': gcs_project_id}
+    except NotFound:
+      message=f" Bucket:{gcs_bucket_name} does not exist in Project:{gcs_project_id}. Please provide valid GCS bucket name"
+      logging.info(f"Bucket : {gcs_bucket_name} does not exist in project : {gcs_project_id}")
+      raise LLMGraphBuilderException(message)
     except Exception as e:
       error_message = str(e)
       logging.error(f"Unable to create source node for gcs bucket file {file_name}")
       logging.exception(f'Exception Stack trace: {error_message}')
       raise LLMGraphBuilderException(error_message)
 
+def get_gcs_bucket_files_info(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, creds):
+    return list(iter_gcs_bucket_files_info(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, creds))
+
 def gcs_loader_func(file_path):
    loader, _ = load_document_content(file_path)
    return loader
 
+def get_gcs_blob_name(gcs_bucket_folder, gcs_blob_filename):
+  if gcs_bucket_folder is not None and gcs_bucket_folder.strip()!="":
+    if gcs_bucket_folder.endswith('/'):
+      return gcs_bucket_folder+gcs_blob_filename
+    return gcs_bucket_folder+'/'+gcs_blob_filename
+  return gcs_blob_filename
+
+def download_gcs_file(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, access_token, directory):
+  """
+  Stream a blob read with an access token to a file in ``directory`` and
+  return its path, so it is parsed page by page like a local file instead of
+  being held in memory.
+  """
+  blob_name = get_gcs_blob_name(gcs_bucket_folder, gcs_blob_filename)
+  storage_client = storage.Client(project=gcs_project_id, credentials=Credentials(access_token))
+  blob = storage_client.bucket(gcs_bucket_name).blob(blob_name)
+  if not blob.exists():
+    raise LLMGraphBuilderException(f'File Not Found in GCS bucket - {gcs_bucket_name}')
+  file_path = os.path.join(directory, os.path.basename(blob_name))
+  blob.download_to_filename(file_path)
+  return file_path
+
 def get_documents_from_gcs(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, access_token=None):
   nltk.download('punkt')
   nltk.download('averaged_perceptron_tagger')
-  if gcs_bucket_folder is not None and gcs_bucket_folder.strip()!="":
-    if gcs_bucket_folder.endswith('/'):
-      blob_name = gcs_bucket_folder+gcs_blob_filename
-    else:
-      blob_name = gcs_bucket_folder+'/'+gcs_blob_filename 
-  else:
-      blob_name = gcs_blob_filename  
+  blob_name = get_gcs_blob_name(gcs_bucket_folder, gcs_blob_filename)
   
   logging.info(f"GCS project_id : {gcs_project_id}")  
  
@@ -69,64 +86,62 @@ def get_documents_from_gcs(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, g
     else :
       raise LLMGraphBuilderException('File does not exist, Please re-upload the file and try again.')
   else:
-    creds= Credentials(access_token)
-    storage_client = storage.Client(project=gcs_project_id, credentials=creds)
-  
-    bucket = storage_client.bucket(gcs_bucket_name)
-    blob = bucket.blob(blob_name) 
-    if blob.exists():
-      content = blob.download_as_bytes()
-      pdf_file = io.BytesIO(content)
-      pdf_reader = PdfReader(pdf_file)
-      # Extract text from all pages
-      text = ""
-      for page in pdf_reader.pages:
-            text += page.extract_text()
-      pages = [Document(page_content = text)]
-    else:
-      raise LLMGraphBuilderException(f'File Not Found in GCS bucket - {gcs_bucket_name}')
+    with tempfile.TemporaryDirectory() as temp_dir:
+      file_path = download_gcs_file(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, access_token, temp_dir)
+      pages = gcs_loader_func(file_path).load()
   return gcs_blob_filename, pages
 
-def upload_file_to_gcs(file_chunk, chunk_number, original_file_name, bucket_name, folder_name_sha1_hashed):
+class GCSChunkStorage(ChunkStorage):
+  """Chunk storage backed by a GCS bucket; parts are joined with server-side compose."""
+
+  def __init__(self, bucket_name, storage_client=None):
+    self.bucket = (storage_client or storage.Client()).bucket(bucket_name)
+
+  def write(self, name, stream):
+    self.bucket.blob(name).upload_from_file(stream, rewind=True)
+
+  def open_read(self, name):
+    return self.bucket.blob(name).open("rb")
+
+  def compose(self, sources, destination):
+    self.bucket.blob(destination).compose([self.bucket.blob(source) for source in sources])
+
+  def exists(self, name):
+    return self.bucket.blob(name).exists()
+
+  def size(self, name):
+    blob = self.bucket.get_blob(name)
+    if blob is None:
+      raise LLMGraphBuilderException(f'File {name} not found in GCS bucket {self.bucket.name}')
+    return blob.size
+
+  def delete(self, name):
+    blob = self.bucket.blob(name)
+    if blob.exists():
+      blob.delete()
+
+def gcs_chunk_name(folder_name_sha1_hashed, original_file_name, chunk_number):
+  return folder_name_sha1_hashed + '/' + f"{original_file_name}_part_{chunk_number}"
+
+def upload_file_to_gcs(file_chunk, chunk_number, original_file_name, bucket_name, folder_name_sha1_hashed, chunk_storage=None):
   try:
-    storage_client = storage.Client()
-  
-    file_name = f'{original_file_name}_part_{chunk_number}'
-    bucket = storage_client.bucket(bucket_name)
-    file_data = file_chunk.file.read()
-    file_name_with__hashed_folder = folder_name_sha1_hashed +'/'+file_name
+    chunk_storage = chunk_storage or GCSChunkStorage(bucket_name)
+    file_name_with__hashed_folder = gcs_chunk_name(folder_name_sha1_hashed, original_file_name, chunk_number)
     logging.info(f'GCS folder pathin upload: {file_name_with__hashed_folder}')
-    blob = bucket.blob(file_name_with__hashed_folder)
-    file_io = io.BytesIO(file_data)
-    blob.upload_from_file(file_io)
-    time.sleep(1)
+    chunk_storage.write(file_name_with__hashed_folder, file_chunk.file)
     logging.info('Chunk uploaded successfully in gcs')
   except Exception as e:
     raise Exception('Error in while uploading the file chunks on GCS')
   
-def merge_file_gcs(bucket_name, original_file_name: str, folder_name_sha1_hashed, total_chunks):
+def merge_file_gcs(bucket_name, original_file_name: str, folder_name_sha1_hashed, total_chunks, chunk_storage=None):
   try:
-      storage_client = storage.Client()
-      bucket = storage_client.bucket(bucket_name)
-      chunks = []
-      for i in range(1,total_chunks+1):
-        blob_name = folder_name_sha1_hashed + '/' + f"{original_file_name}_part_{i}"
-        blob = bucket.blob(blob_name) 
-        if blob.exists():
-          logging.info(f'Blob Name: {blob.name}')
-          chunks.append(blob.download_as_bytes())
-          blob.delete()
-      
-      merged_file = b"".join(chunks)
+      chunk_storage = chunk_storage or GCSChunkStorage(bucket_name)
+      part_names = [gcs_chunk_name(folder_name_sha1_hashed, original_file_name, i) for i in range(1, total_chunks+1)]
       file_name_with__hashed_folder = folder_name_sha1_hashed +'/'+original_file_name
       logging.info(f'GCS folder path in merge: {file_name_with__hashed_folder}')
-      blob = storage_client.bucket(bucket_name).blob(file_name_with__hashed_folder)
-      logging.info('save the merged file from chunks in gcs')
-      file_io = io.BytesIO(merged_file)
-      blob.upload_from_file(file_io)
-      file_size = len(merged_file)
-      
-      return file_size
+      return compose_parts(chunk_storage, part_names, file_name_with__hashed_folder)
+  except LLMGraphBuilderException:
+    raise
   except Exception as e:
     raise Exception('Error in while merge the files chunks on GCS')
   
@@ -1,96 +1,150 @@
 import logging
 from pathlib import Path
-from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain_core.documents import Document
 import chardet
+import os
+import re
+from bs4 import BeautifulSoup
 from langchain_core.document_loaders import BaseLoader
+from src.document_sources.pdf_loader import ParallelPDFLoader
+
+# Extensions read directly instead of through Unstructured.
+TEXT_FILE_TYPES = {".md": "text/markdown", ".markdown": "text/markdown", ".txt": "text/plain", ".html": "text/html", ".htm": "text/html"}
+# Splitting on headings gives pages far smaller than a chunk, so a file is one page unless enabled.
+TEXT_FILE_SPLIT_PAGES = os.environ.get("TEXT_FILE_SPLIT_PAGES", "False").lower() in ("true", "1", "yes")
+MARKDOWN_SECTION_HEADING = re.compile(r"^ {0,3}#{1,2}(\s|$)")
 
-class ListLoader(BaseLoader):
-   """A wrapper to make a list of Documents compatible with BaseLoader."""
-   def __init__(self, documents):
-       self.documents = documents
-   def load(self):
-       return self.documents
-   
 def detect_encoding(file_path):
    """Detects the file encoding to avoid UnicodeDecodeError."""
    with open(file_path, 'rb') as f:
        raw_data = f.read(4096)
        result = chardet.detect(raw_data)
        return result['encoding'] or "utf-8"
-   
-def load_document_content(file_path):
-    file_extension = Path(file_path).suffix.lower()
-    encoding_flag = False
-    if file_extension == '.pdf':
-        loader = PyMuPDFLoader(file_path)
-        return loader,encoding_flag
-    elif file_extension == ".txt":
+
+def read_text_file(file_path):
+    """Read a text file as UTF-8, falling back to the detected encoding."""
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return f.read()
+    except UnicodeDecodeError:
         encoding = detect_encoding(file_path)
         logging.info(f"Detected encoding for {file_path}: {encoding}")
-        if encoding.lower() == "utf-8":
-            loader = UnstructuredFileLoader(file_path, mode="elements",autodetect_encoding=True)
-            return loader,encoding_flag
+        with open(file_path, encoding=encoding, errors="replace") as f:
+            return f.read()
+
+def split_markdown_sections(text):
+    """Split Markdown before every level 1 and 2 heading outside code fences, in one pass over the lines."""
+    sections = []
+    current = []
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        stripped = line.lstrip()
+        if stripped.startswith(("```", "~~~")):
+            in_fence = not in_fence
+        elif not in_fence and MARKDOWN_SECTION_HEADING.match(line) and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+def html_to_text(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(["script", "style", "noscript", "template"]):
+        element.decompose()
+    return soup.get_text("\n", strip=True)
+
+class TextFileLoader(BaseLoader):
+    """
+    Loads Markdown, plain text and HTML files without Unstructured. The file
+    is read once and loaded as one page, or, with ``split_pages``, split in
+    one pass: Markdown on level 1 and 2 headings, plain text on form feeds.
+    """
+    def __init__(self, file_path, split_pages=False):
+        self.file_path = str(file_path)
+        self.split_pages = split_pages
+
+    def lazy_load(self):
+        file_extension = Path(self.file_path).suffix.lower()
+        text = read_text_file(self.file_path)
+        if file_extension in (".html", ".htm"):
+            sections = [html_to_text(text)]
+        elif not self.split_pages:
+            sections = [text]
+        elif file_extension in (".md", ".markdown"):
+            sections = split_markdown_sections(text)
         else:
-            with open(file_path, encoding=encoding, errors="replace") as f:
-               content = f.read()
-            loader = ListLoader([Document(page_content=content, metadata={"source": file_path})])
-            encoding_flag =  True
-            return loader,encoding_flag
+            sections = text.split("\f")
+        metadata = {"source": self.file_path, "filename": Path(self.file_path).name, "filetype": TEXT_FILE_TYPES[file_extension]}
+        for page_number, section in enumerate(sections, start=1):
+            yield Document(page_content=section, metadata={**metadata, "page_number": page_number})
+
+def load_document_content(file_path):
+    """
+    Return the loader of a local file and whether it yields pages directly;
+    the elements of other loaders are grouped into pages by
+    get_pages_with_page_numbers.
+    """
+    file_extension = Path(file_path).suffix.lower()
+    if file_extension == '.pdf':
+        return ParallelPDFLoader(file_path), True
+    elif file_extension in TEXT_FILE_TYPES:
+        return TextFileLoader(file_path, split_pages=TEXT_FILE_SPLIT_PAGES), True
     else:
         loader = UnstructuredFileLoader(file_path, mode="elements",autodetect_encoding=True)
-        return loader,encoding_flag
+        return loader, False
     
-def get_documents_from_file_by_path(file_path,file_name):
+def iter_documents_from_file_by_path(file_path,file_name):
+    """
+    Yield the pages of a local file. PDF pages are parsed one at a time, so
+    a consumer that stops early never parses the rest of the file.
+    """
     file_path = Path(file_path)
     if not file_path.exists():
         logging.info(f'File {file_name} does not exist')
         raise Exception(f'File {file_name} does not exist')
     logging.info(f'file {file_name} processing')
     try:
-        loader, encoding_flag = load_document_content(file_path)
-        file_extension = file_path.suffix.lower()
-        if file_extension == ".pdf" or (file_extension == ".txt" and encoding_flag):
-            pages = loader.load()
+        loader, direct_pages = load_document_content(file_path)
+        if direct_pages:
+            yield from loader.lazy_load()
         else:
             unstructured_pages = loader.load()
-            pages = get_pages_with_page_numbers(unstructured_pages)
+            yield from get_pages_with_page_numbers(unstructured_pages)
     except Exception as e:
         raise Exception(f'Error while reading the file content or metadata, {e}')
-    return file_name, pages , file_extension
+
+def get_documents_from_file_by_path(file_path,file_name):
+    pages = list(iter_documents_from_file_by_path(file_path, file_name))
+    return file_name, pages , Path(file_path).suffix.lower()
 
 def get_pages_with_page_numbers(unstructured_pages):
+    """
+    Group Unstructured elements into pages in one pass. Elements carry their
+    page number when the format has pages; otherwise PageBreak elements
+    separate the pages.
+    """
     pages = []
     page_number = 1
-    page_content=''
-    metadata = {}
-    for page in unstructured_pages:
-        if  'page_number' in page.metadata:
-            if page.metadata['page_number']==page_number:
-                page_content += page.page_content
-                metadata = {'source':page.metadata['source'],'page_number':page_number, 'filename':page.metadata['filename'],
-                        'filetype':page.metadata['filetype']}
-                
-            if page.metadata['page_number']>page_number:
-                page_number+=1
-                pages.append(Document(page_content = page_content))
-                page_content='' 
-                
-            if page == unstructured_pages[-1]:
-                pages.append(Document(page_content = page_content))
-                    
-        elif page.metadata['category']=='PageBreak' and page!=unstructured_pages[0]:
-            page_number+=1
-            pages.append(Document(page_content = page_content, metadata=metadata))
-            page_content=''
-            metadata={}
-        
-        else:
-            page_content += page.page_content
-            metadata_with_custom_page_number = {'source':page.metadata['source'],
-                            'page_number':1, 'filename':page.metadata['filename'],
-                            'filetype':page.metadata['filetype']}
-            if page == unstructured_pages[-1]:
-                    pages.append(Document(page_content = page_content, metadata=metadata_with_custom_page_number))
-    return pages                
+    contents = []
+    base_metadata = None
+    for index, element in enumerate(unstructured_pages):
+        element_page_number = element.metadata.get('page_number')
+        is_page_break = element_page_number is None and element.metadata.get('category') == 'PageBreak'
+        if index > 0 and (is_page_break or (element_page_number is not None and element_page_number != page_number)):
+            if base_metadata is not None:
+                pages.append(Document(page_content=''.join(contents), metadata={**base_metadata, 'page_number': page_number}))
+            contents = []
+            page_number = element_page_number if element_page_number is not None else page_number + 1
+        elif element_page_number is not None:
+            page_number = element_page_number
+        if is_page_break:
+            continue
+        contents.append(element.page_content)
+        base_metadata = {'source': element.metadata.get('source'), 'filename': element.metadata.get('filename'),
+                         'filetype': element.metadata.get('filetype')}
+    if contents:
+        pages.append(Document(page_content=''.join(contents), metadata={**base_metadata, 'page_number': page_number}))
+    return pages
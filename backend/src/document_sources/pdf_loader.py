@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import os
+from typing import Iterator, List
+
+import fitz
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from src.shared.executors import get_cpu_executor
+
+# PDFs with at least this many pages are parsed by several processes.
+PARALLEL_PDF_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES") or 200)
+# Pages parsed by one process pool task.
+PDF_PAGES_PER_TASK = 32
+
+
+def pdf_page_document(page, source, total_pages) -> Document:
+    """One page of a PDF as a Document with the metadata PyMuPDFLoader sets."""
+    return Document(
+        page_content=page.get_text(),
+        metadata={"source": source, "file_path": source, "page": page.number, "total_pages": total_pages},
+    )
+
+
+def iter_pdf_pages(source, stream=None, file_path=None) -> Iterator[Document]:
+    """
+    Yield the pages of a PDF, parsing one page at a time with PyMuPDF. The
+    PDF is read from the in-memory ``stream`` (bytes, bytearray or
+    memoryview) when given, otherwise from ``file_path``, which defaults to
+    ``source``.
+    """
+    document = fitz.open(stream=stream, filetype="pdf") if stream is not None else fitz.open(file_path or source)
+    try:
+        total_pages = document.page_count
+        logging.info(f"Parsing {total_pages} pages of {source}")
+        for page in document:
+            yield pdf_page_document(page, source, total_pages)
+    finally:
+        document.close()
+
+
+def extract_pdf_page_range(file_path, source, start, stop) -> List[Document]:
+    """Parse pages ``start`` to ``stop - 1`` of a PDF file. Runs in the process pool."""
+    document = fitz.open(file_path)
+    try:
+        total_pages = document.page_count
+        return [pdf_page_document(document[number], source, total_pages) for number in range(start, min(stop, total_pages))]
+    finally:
+        document.close()
+
+
+def _pdf_page_count(file_path) -> int:
+    document = fitz.open(file_path)
+    try:
+        return document.page_count
+    finally:
+        document.close()
+
+
+def is_large_pdf(file_path) -> bool:
+    """True for a PDF with enough pages to be parsed in parallel."""
+    if not str(file_path).lower().endswith(".pdf") or not os.path.exists(file_path):
+        return False
+    try:
+        return _pdf_page_count(str(file_path)) >= PARALLEL_PDF_MIN_PAGES
+    except Exception:
+        # Unreadable files are reported by the loader.
+        return False
+
+
+def iter_pdf_pages_parallel(file_path, source=None, executor=None) -> Iterator[Document]:
+    """
+    Yield the pages of a PDF file in order, parsing page ranges of a large
+    file in the extraction process pool. Only a few ranges are in flight at a
+    time, so memory stays bounded whatever the page count. Small files, and
+    calls made inside a pool worker, are parsed in this process.
+    """
+    source = source or str(file_path)
+    file_path = str(file_path)
+    total_pages = _pdf_page_count(file_path)
+    if executor is None and total_pages >= PARALLEL_PDF_MIN_PAGES and multiprocessing.parent_process() is None:
+        executor = get_cpu_executor()
+    if executor is None or total_pages < PARALLEL_PDF_MIN_PAGES:
+        yield from iter_pdf_pages(source, file_path=file_path)
+        return
+
+    logging.info(f"Parsing {total_pages} pages of {source} in parallel")
+    window = 2 * getattr(executor, "_max_workers", os.cpu_count() or 1)
+    pending = []
+    try:
+        for start in range(0, total_pages, PDF_PAGES_PER_TASK):
+            pending.append(executor.submit(extract_pdf_page_range, file_path, source, start, start + PDF_PAGES_PER_TASK))
+            if len(pending) >= window:
+                yield from pending.pop(0).result()
+        while pending:
+            yield from pending.pop(0).result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class ParallelPDFLoader(BaseLoader):
+    """Loader of a local PDF file that parses large files with :func:`iter_pdf_pages_parallel`."""
+
+    def __init__(self, file_path):
+        self.file_path = str(file_path)
+
+    def lazy_load(self) -> Iterator[Document]:
+        yield from iter_pdf_pages_parallel(self.file_path)
@@ -1,46 +1,83 @@
-from langchain_community.document_loaders import S3DirectoryLoader
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
+from src.document_sources.pdf_loader import iter_pdf_pages
 import boto3
 import os
 from urllib.parse import urlparse
 
-def get_s3_files_info(s3_url,aws_access_key_id=None,aws_secret_access_key=None):
-  try:
-      # Extract bucket name and directory from the S3 URL
-      parsed_url = urlparse(s3_url)
-      bucket_name = parsed_url.netloc
-      directory = parsed_url.path.lstrip('/')
-      try:
-        # Connect to S3
-        s3 = boto3.client('s3',aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
+# Objects are fetched with parallel GETs of this many bytes each.
+S3_RANGE_PART_SIZE = 8 * 1024 * 1024
+S3_RANGE_FETCH_WORKERS = 8
+S3_READ_CHUNK_SIZE = 1024 * 1024
 
-        # List objects in the specified directory
-        response = s3.list_objects_v2(Bucket=bucket_name, Prefix=directory)
-      except Exception as e:
-         raise Exception("Invalid AWS credentials")
-      
-      files_info = []
-
-      # Check each object for file size and type
-      for obj in response.get('Contents', []):
-          file_key = obj['Key']
-          file_name = os.path.basename(file_key)
-          logging.info(f'file_name : {file_name}  and file key : {file_key}')
-          file_size = obj['Size']
+def iter_s3_files_info(s3_url,aws_access_key_id=None,aws_secret_access_key=None):
+  """Yield the PDF files under ``s3_url`` page by page, following list continuation tokens past 1,000 keys."""
+  # Extract bucket name and directory from the S3 URL
+  parsed_url = urlparse(s3_url)
+  bucket_name = parsed_url.netloc
+  directory = parsed_url.path.lstrip('/')
+  try:
+    # Connect to S3
+    s3 = boto3.client('s3',aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
+    # A single iterator: iterating the PageIterator again would restart the listing.
+    pages = iter(s3.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix=directory))
+    first_page = next(pages, {})
+  except Exception as e:
+    logging.error(f"Error while reading files from s3: {e}")
+    raise Exception("Invalid AWS credentials")
 
-          # Check if file is a PDF
-          if file_name.endswith('.pdf'):
-            files_info.append({'file_key': file_key, 'file_size_bytes': file_size})
-            
-      return files_info
+  yield from _pdf_files_of_page(first_page)
+  try:
+    for page in pages:
+      yield from _pdf_files_of_page(page)
   except Exception as e:
     error_message = str(e)
     logging.error(f"Error while reading files from s3: {error_message}")
     raise Exception(error_message)
 
+def _pdf_files_of_page(page):
+  for obj in page.get('Contents', []):
+    file_key = obj['Key']
+    # Check if file is a PDF
+    if file_key.endswith('.pdf'):
+      yield {'file_key': file_key, 'file_size_bytes': obj['Size']}
+
+def get_s3_files_info(s3_url,aws_access_key_id=None,aws_secret_access_key=None):
+  return list(iter_s3_files_info(s3_url,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key))
+
+
+def fetch_s3_object(s3, bucket, key, size=None, part_size=S3_RANGE_PART_SIZE, max_workers=S3_RANGE_FETCH_WORKERS) -> bytearray:
+    """
+    Download an object into one preallocated buffer with parallel byte-range
+    GETs, so a large file is fetched at full bandwidth instead of at the speed
+    of a single stream.
+    """
+    if size is None:
+      size = s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+
+    def fetch_range(start):
+      end = min(start + part_size, size) - 1
+      body = s3.get_object(Bucket=bucket, Key=key, Range=f'bytes={start}-{end}')['Body']
+      offset = start
+      for data in body.iter_chunks(S3_READ_CHUNK_SIZE):
+        view[offset:offset + len(data)] = data
+        offset += len(data)
+      if offset != end + 1:
+        raise LLMGraphBuilderException(f'Incomplete read of s3://{bucket}/{key} bytes {start}-{end}')
+
+    starts = range(0, size, part_size)
+    if len(starts) > 1:
+      with ThreadPoolExecutor(max_workers=min(max_workers, len(starts))) as executor:
+        list(executor.map(fetch_range, starts))
+    elif size:
+      fetch_range(0)
+    return buffer
+
 
-def get_s3_pdf_content(s3_url,aws_access_key_id=None,aws_secret_access_key=None):
+def get_s3_pdf_content(s3_url,aws_access_key_id=None,aws_secret_access_key=None, s3=None, size=None):
     try:
       # Extract bucket name and directory from the S3 URL
         parsed_url = urlparse(s3_url)
@@ -48,9 +85,9 @@ def get_s3_pdf_content(s3_url,aws_access_key_id=None,aws_secret_access_key=None)
         logging.info(f'bucket name : {bucket_name}')
         directory = parsed_url.path.lstrip('/')
         if directory.endswith('.pdf'):
-          loader=S3DirectoryLoader(bucket_name, prefix=directory,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
-          pages = loader.load_and_split()
-          return pages
+          s3 = s3 or boto3.client('s3',aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
+          content = fetch_s3_object(s3, bucket_name, directory, size)
+          return list(iter_pdf_pages(s3_url, stream=content))
         else:
           return None
     
@@ -59,20 +96,20 @@ def get_s3_pdf_content(s3_url,aws_access_key_id=None,aws_secret_access_key=None)
         raise Exception(e)
 
 
-def get_documents_from_s3(s3_url, aws_access_key_id, aws_secret_access_key):
+def get_documents_from_s3(s3_url, aws_access_key_id, aws_secret_access_key, s3=None):
     try:
       parsed_url = urlparse(s3_url)
       bucket = parsed_url.netloc
       file_key = parsed_url.path.lstrip('/')
       file_name=file_key.split('/')[-1]
-      s3=boto3.client('s3',aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
+      s3 = s3 or boto3.client('s3',aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
       response=s3.head_object(Bucket=bucket,Key=file_key)
       file_size=response['ContentLength']
       
       logging.info(f'bucket : {bucket},file_name:{file_name},  file key : {file_key},  file size : {file_size}')
-      pages=get_s3_pdf_content(s3_url,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
+      pages=get_s3_pdf_content(s3_url, s3=s3, size=file_size)
       return file_name,pages
     except Exception as e:
       error_message = str(e)
       logging.exception(f'Exception in reading content from S3:{error_message}')
-      raise LLMGraphBuilderException(error_message)    
\ No newline at end of file
+      raise LLMGraphBuilderException(error_message)    
@@ -1,10 +1,36 @@
+from bs4 import BeautifulSoup
 from langchain_community.document_loaders import WebBaseLoader
+from langchain_community.document_loaders.web_base import _build_metadata
+from langchain_core.documents import Document
 from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
 from src.shared.common_fn import last_url_segment
+from src.shared.source_cache import documents_from_json, documents_to_json, fetch_with_cache, normalize_url
+
+def _scrape_web_page(loader: WebBaseLoader, source_url: str, headers: dict):
+  """Fetch and parse the page like WebBaseLoader.load; returns None on 304 Not Modified."""
+  response = loader.session.get(source_url, headers=headers, **loader.requests_kwargs)
+  if response.status_code == 304:
+    return None
+  response.raise_for_status()
+  response.encoding = response.apparent_encoding
+  parser = "xml" if source_url.endswith(".xml") else loader.default_parser
+  soup = BeautifulSoup(response.text, parser, **loader.bs_kwargs)
+  pages = [Document(page_content=soup.get_text(**loader.bs_get_text_kwargs), metadata=_build_metadata(soup, source_url))]
+  return documents_to_json(pages), response.headers.get("ETag"), response.headers.get("Last-Modified")
 
 def get_documents_from_web_page(source_url:str):
   try:
-    pages = WebBaseLoader(source_url, verify_ssl=False).load()
-    return pages
+    loader = WebBaseLoader(source_url, verify_ssl=False)
+
+    def revalidate(etag, last_modified):
+      headers = {}
+      if etag:
+        headers["If-None-Match"] = etag
+      if last_modified:
+        headers["If-Modified-Since"] = last_modified
+      return _scrape_web_page(loader, source_url, headers)
+
+    payload = fetch_with_cache(f"web:{normalize_url(source_url)}", lambda: _scrape_web_page(loader, source_url, {}), revalidate)
+    return documents_from_json(payload)
   except Exception as e:
     raise LLMGraphBuilderException(str(e))
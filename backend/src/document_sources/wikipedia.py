@@ -1,10 +1,16 @@
 import logging
 from langchain_community.document_loaders import WikipediaLoader
 from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
+from src.shared.source_cache import documents_from_json, documents_to_json, fetch_with_cache
 
 def get_documents_from_Wikipedia(wiki_query:str, language:str):
   try:
-    pages = WikipediaLoader(query=wiki_query.strip(), lang=language, load_all_available_meta=False,doc_content_chars_max=100000,load_max_docs=1).load()
+    # Wikipedia responses carry no validators, so cached pages are reused until their TTL expires.
+    payload = fetch_with_cache(
+      f"wikipedia:{language}:{wiki_query.strip()}",
+      lambda: (documents_to_json(WikipediaLoader(query=wiki_query.strip(), lang=language, load_all_available_meta=False,doc_content_chars_max=100000,load_max_docs=1).load()), None, None),
+    )
+    pages = documents_from_json(payload)
     file_name = wiki_query.strip()
     logging.info(f"Total Pages from Wikipedia = {len(pages)}") 
     return file_name, pages
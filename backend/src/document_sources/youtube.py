@@ -1,12 +1,14 @@
 from langchain.docstore.document import Document
 from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
+from src.shared.source_cache import fetch_with_cache
 from youtube_transcript_api import YouTubeTranscriptApi 
 from youtube_transcript_api.proxies import GenericProxyConfig
 import logging
 from urllib.parse import urlparse,parse_qs
-from difflib import SequenceMatcher
 from datetime import timedelta
 from src.shared.constants import YOUTUBE_CHUNK_SIZE_SECONDS
+import bisect
+import json
 import os
 import re
 
@@ -15,9 +17,12 @@ def get_youtube_transcript(youtube_id):
     proxy = os.environ.get("YOUTUBE_TRANSCRIPT_PROXY") 
     proxy_config = GenericProxyConfig(http_url=proxy, https_url=proxy) if proxy else None
     youtube_api = YouTubeTranscriptApi(proxy_config=proxy_config)
-    transcript_pieces = youtube_api.fetch(youtube_id, preserve_formatting=True)
-    transcript_pieces = transcript_pieces.to_raw_data()
-    return transcript_pieces
+    # Scanning, loading and timestamp alignment all read the transcript; it is downloaded once per TTL.
+    payload = fetch_with_cache(
+      f"youtube:{youtube_id}",
+      lambda: (json.dumps(youtube_api.fetch(youtube_id, preserve_formatting=True).to_raw_data()), None, None),
+    )
+    return json.loads(payload)
   except Exception as e:
     message = f"Youtube transcript is not available for youtube Id: {youtube_id}"
     raise LLMGraphBuilderException(message)
@@ -69,31 +74,56 @@ def get_documents_from_youtube(url):
       logging.exception(f'Exception in reading transcript from youtube:{error_message}')
       raise LLMGraphBuilderException(error_message)  
 
-def get_calculated_timestamps(chunks, youtube_id):
+# Quotes are dropped from chunk text before splitting; whitespace is collapsed separately.
+_QUOTES_TABLE = str.maketrans('', '', '"\'')
+
+def _normalize_transcript_text(text):
+  return ' '.join(text.translate(_QUOTES_TABLE).split())
+
+def build_transcript_index(transcript):
+  """
+  Concatenate the normalized transcript segments and return the text with
+  the character offset where each segment starts, in segment order.
+  """
+  parts = []
+  starts = []
+  offset = 0
+  for segment in transcript:
+    text = _normalize_transcript_text(segment['text'])
+    starts.append(offset)
+    parts.append(text)
+    offset += len(text) + 1
+  return ' '.join(parts), starts
+
+def get_calculated_timestamps(chunks, youtube_id, transcript=None):
+  """
+  Set start and end timestamps on transcript chunks. Each chunk is located in
+  the concatenated transcript, searching forward from the previous chunk, and
+  the segments containing its first and last characters are found by binary
+  search over the segment offsets.
+  """
   logging.info('Calculating timestamps for chunks')
-  max_start_similarity=0
-  max_end_similarity=0
-  transcript = get_youtube_transcript(youtube_id)
+  if transcript is None:
+    transcript = get_youtube_transcript(youtube_id)
+  if not transcript:
+    return chunks
+  combined, starts = build_transcript_index(transcript)
+  cursor = 0
   for chunk in chunks:
-    start_content = chunk.page_content[:40].strip().replace('\n', ' ')
-    end_content = chunk.page_content[-40:].strip().replace('\n', ' ')
-    for segment in transcript:
-        segment['text'] = segment['text'].replace('\n', ' ')
-        start_similarity = SequenceMatcher(None, start_content, segment['text'])
-        end_similarity = SequenceMatcher(None, end_content, segment['text'])
-        
-        if start_similarity.ratio() > max_start_similarity:
-            max_start_similarity = start_similarity.ratio()
-            start_time = segment['start']
-            
-        if end_similarity.ratio() > max_end_similarity:
-            max_end_similarity = end_similarity.ratio()
-            end_time = segment['start']+segment['duration'] 
-                   
-    chunk.metadata['start_timestamp'] = str(timedelta(seconds = start_time)).split('.')[0]
-    chunk.metadata['end_timestamp'] = str(timedelta(seconds = end_time)).split('.')[0]
-    max_start_similarity=0
-    max_end_similarity=0
+    content = _normalize_transcript_text(chunk.page_content)
+    position = combined.find(content, cursor)
+    if position < 0:
+      # The chunk boundary may cut a character in two; fall back to its beginning, then to the expected position.
+      position = combined.find(content[:40], cursor)
+    if position < 0:
+      position = min(cursor, len(combined))
+    else:
+      cursor = position + 1
+    end_position = max(position + len(content) - 1, position)
+    start_segment = transcript[max(bisect.bisect_right(starts, position) - 1, 0)]
+    end_segment = transcript[max(bisect.bisect_right(starts, end_position) - 1, 0)]
+    chunk.metadata['start_timestamp'] = str(timedelta(seconds = start_segment['start'])).split('.')[0]
+    chunk.metadata['end_timestamp'] = str(timedelta(seconds = end_segment['start']+end_segment['duration'])).split('.')[0]
   return chunks
 
 def get_chunks_with_timestamps(chunks):
@@ -40,38 +40,44 @@ class graphDBdataAccess:
         
     def create_source_node(self, obj_source_node:sourceNode):
         try:
-            job_status = "New"
             logging.info(f"creating source node if does not exist in database {self.graph._database}")
-            self.graph.query("""MERGE(d:Document {fileName :$fn}) SET d.fileSize = $fs, d.fileType = $ft ,
-                            d.status = $st, d.url = $url, d.awsAccessKeyId = $awsacc_key_id,
-                            d.fileSource = $f_source, d.project = $project, d.createdAt = $c_at, d.updatedAt = $u_at,
-                            d.processingTime = $pt, d.errorMessage = $e_message, d.nodeCount= $n_count, 
-                            d.relationshipCount = $r_count, d.model= $model, d.gcsBucket=$gcs_bucket, 
-                            d.gcsBucketFolder= $gcs_bucket_folder, d.language= $language,d.gcsProjectId= $gcs_project_id,
-                            d.is_cancelled=False, d.total_chunks=0, d.processed_chunk=0,
-                            d.access_token=$access_token,
-                            d.chunkNodeCount=$chunkNodeCount,d.chunkRelCount=$chunkRelCount,
-                            d.entityNodeCount=$entityNodeCount,d.entityEntityRelCount=$entityEntityRelCount,
-                            d.communityNodeCount=$communityNodeCount,d.communityRelCount=$communityRelCount""",
-                            {"fn":obj_source_node.file_name, "fs":obj_source_node.file_size, "ft":obj_source_node.file_type, "st":job_status,
-                            "url":obj_source_node.url,
-                            "awsacc_key_id":obj_source_node.awsAccessKeyId, "f_source":obj_source_node.file_source, "project":obj_source_node.project, "c_at":obj_source_node.created_at,
-                            "u_at":obj_source_node.created_at, "pt":0, "e_message":'', "n_count":0, "r_count":0, "model":obj_source_node.model,
-                            "gcs_bucket": obj_source_node.gcsBucket, "gcs_bucket_folder": obj_source_node.gcsBucketFolder, 
-                            "language":obj_source_node.language, "gcs_project_id":obj_source_node.gcsProjectId,
-                            "access_token":obj_source_node.access_token,
-                            "chunkNodeCount":obj_source_node.chunkNodeCount,
-                            "chunkRelCount":obj_source_node.chunkRelCount,
-                            "entityNodeCount":obj_source_node.entityNodeCount,
-                            "entityEntityRelCount":obj_source_node.entityEntityRelCount,
-                            "communityNodeCount":obj_source_node.communityNodeCount,
-                            "communityRelCount":obj_source_node.communityRelCount
-                            },session_params={"database":self.graph._database})
+            self.create_source_nodes([obj_source_node])
         except Exception as e:
             error_message = str(e)
             logging.info(f"error_message = {error_message}")
-            self.update_exception_db(self, obj_source_node.file_name, error_message)
+            self.update_exception_db(obj_source_node.file_name, error_message)
             raise Exception(error_message)
+
+    def create_source_nodes(self, obj_source_nodes):
+        """Create or reset the Document nodes of ``obj_source_nodes`` in one UNWIND query."""
+        job_status = "New"
+        rows = [{"fn":obj_source_node.file_name, "fs":obj_source_node.file_size, "ft":obj_source_node.file_type, "st":job_status,
+                 "url":obj_source_node.url,
+                 "awsacc_key_id":obj_source_node.awsAccessKeyId, "f_source":obj_source_node.file_source, "project":obj_source_node.project, "c_at":obj_source_node.created_at,
+                 "u_at":obj_source_node.created_at, "model":obj_source_node.model,
+                 "gcs_bucket": obj_source_node.gcsBucket, "gcs_bucket_folder": obj_source_node.gcsBucketFolder,
+                 "language":obj_source_node.language, "gcs_project_id":obj_source_node.gcsProjectId,
+                 "access_token":obj_source_node.access_token,
+                 "chunkNodeCount":obj_source_node.chunkNodeCount,
+                 "chunkRelCount":obj_source_node.chunkRelCount,
+                 "entityNodeCount":obj_source_node.entityNodeCount,
+                 "entityEntityRelCount":obj_source_node.entityEntityRelCount,
+                 "communityNodeCount":obj_source_node.communityNodeCount,
+                 "communityRelCount":obj_source_node.communityRelCount
+                 } for obj_source_node in obj_source_nodes]
+        self.graph.query("""UNWIND $rows AS row
+                        MERGE(d:Document {fileName :row.fn}) SET d.fileSize = row.fs, d.fileType = row.ft ,
+                        d.status = row.st, d.url = row.url, d.awsAccessKeyId = row.awsacc_key_id,
+                        d.fileSource = row.f_source, d.project = row.project, d.createdAt = row.c_at, d.updatedAt = row.u_at,
+                        d.processingTime = 0, d.errorMessage = '', d.nodeCount= 0, 
+                        d.relationshipCount = 0, d.model= row.model, d.gcsBucket=row.gcs_bucket, 
+                        d.gcsBucketFolder= row.gcs_bucket_folder, d.language= row.language,d.gcsProjectId= row.gcs_project_id,
+                        d.is_cancelled=False, d.total_chunks=0, d.processed_chunk=0,
+                        d.access_token=row.access_token,
+                        d.chunkNodeCount=row.chunkNodeCount,d.chunkRelCount=row.chunkRelCount,
+                        d.entityNodeCount=row.entityNodeCount,d.entityEntityRelCount=row.entityEntityRelCount,
+                        d.communityNodeCount=row.communityNodeCount,d.communityRelCount=row.communityRelCount""",
+                        {"rows": rows},session_params={"database":self.graph._database})
         
     def update_source_node(self, obj_source_node:sourceNode):
         try:
@@ -492,6 +498,13 @@ class graphDBdataAccess:
 
 
     def update_node_relationship_count(self,document_name):
+        """
+        Recount nodes and relationships of a document, or of every document when
+        document_name is empty, and store the counts on the Document nodes.
+        The write path keeps these counters up to date incrementally, so this
+        full recount only runs on demand (post processing) and after entities
+        or chunks of a document were deleted.
+        """
         logging.info("updating node and relationship count")
         label_query = """CALL db.labels"""
         community_flag = {'label': '__Community__'} in self.execute_query(label_query)
@@ -518,29 +531,6 @@ class graphDBdataAccess:
                     communityRelCount = 0
                 nodeCount = int(chunkNodeCount) + int(entityNodeCount) + int(communityNodeCount)
                 relationshipCount = int(chunkRelCount) + int(entityEntityRelCount) + int(communityRelCount)
-                update_query = """
-                MATCH (d:Document {fileName: $filename})
-                SET d.chunkNodeCount = $chunkNodeCount,
-                    d.chunkRelCount = $chunkRelCount,
-                    d.entityNodeCount = $entityNodeCount,
-                    d.entityEntityRelCount = $entityEntityRelCount,
-                    d.communityNodeCount = $communityNodeCount,
-                    d.communityRelCount = $communityRelCount,
-                    d.nodeCount = $nodeCount,
-                    d.relationshipCount = $relationshipCount
-                """
-                self.execute_query(update_query,{
-                    "filename": filename,
-                    "chunkNodeCount": chunkNodeCount,
-                    "chunkRelCount": chunkRelCount,
-                    "entityNodeCount": entityNodeCount,
-                    "entityEntityRelCount": entityEntityRelCount,
-                    "communityNodeCount": communityNodeCount,
-                    "communityRelCount": communityRelCount,
-                    "nodeCount" : nodeCount,
-                    "relationshipCount" : relationshipCount
-                    })
-                
                 response[filename] = {"chunkNodeCount": chunkNodeCount,
                     "chunkRelCount": chunkRelCount,
                     "entityNodeCount": entityNodeCount,
@@ -550,9 +540,39 @@ class graphDBdataAccess:
                     "nodeCount" : nodeCount,
                     "relationshipCount" : relationshipCount
                     }
+            update_query = """
+            UNWIND $rows AS row
+            MATCH (d:Document {fileName: row.filename})
+            SET d.chunkNodeCount = row.chunkNodeCount,
+                d.chunkRelCount = row.chunkRelCount,
+                d.entityNodeCount = row.entityNodeCount,
+                d.entityEntityRelCount = row.entityEntityRelCount,
+                d.communityNodeCount = row.communityNodeCount,
+                d.communityRelCount = row.communityRelCount,
+                d.nodeCount = row.nodeCount,
+                d.relationshipCount = row.relationshipCount
+            """
+            self.execute_query(update_query, {"rows": [{"filename": filename, **counts} for filename, counts in response.items()]})
 
         return response
-    
+
+    def get_node_relationship_count(self, document_name):
+        """Return the node and relationship counters stored on the Document node, without recounting."""
+        query = """
+        MATCH (d:Document {fileName: $document_name})
+        RETURN d.fileName AS filename,
+               coalesce(d.chunkNodeCount, 0) AS chunkNodeCount,
+               coalesce(d.chunkRelCount, 0) AS chunkRelCount,
+               coalesce(d.entityNodeCount, 0) AS entityNodeCount,
+               coalesce(d.entityEntityRelCount, 0) AS entityEntityRelCount,
+               coalesce(d.communityNodeCount, 0) AS communityNodeCount,
+               coalesce(d.communityRelCount, 0) AS communityRelCount,
+               coalesce(d.nodeCount, 0) AS nodeCount,
+               coalesce(d.relationshipCount, 0) AS relationshipCount
+        """
+        result = self.execute_query(query, {"document_name": document_name})
+        return {record["filename"]: {key: value for key, value in record.items() if key != "filename"} for record in result}
+
     def get_nodelabels_relationships(self):
         node_query = """
                     CALL db.labels() YIELD label
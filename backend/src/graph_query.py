@@ -4,30 +4,37 @@ from neo4j import GraphDatabase
 import os
 import json
 
+from src.shared.neo4j_pool import Neo4jConnectionPool, connection_key
 from src.shared.constants import GRAPH_CHUNK_LIMIT,GRAPH_QUERY,CHUNK_TEXT_QUERY,COUNT_CHUNKS_QUERY,SCHEMA_VISUALIZATION_QUERY
 
+driver_pool = Neo4jConnectionPool("GraphDatabase.driver")
+
 def get_graphDB_driver(uri, username, password,database="neo4j"):
     """
-    Creates and returns a Neo4j database driver instance configured with the provided credentials.
+    Returns a Neo4j database driver instance configured with the provided credentials.
+    Drivers are pooled per set of credentials and must not be closed by the caller.
 
     Returns:
     Neo4j.Driver: A driver object for interacting with the Neo4j database.
 
     """
     try:
-        logging.info(f"Attempting to connect to the Neo4j database at {uri}")
         if all(v is None for v in [username, password]):
             username= os.getenv('NEO4J_USERNAME')
             database= os.getenv('NEO4J_DATABASE')
             password= os.getenv('NEO4J_PASSWORD')
 
-        enable_user_agent = os.environ.get("ENABLE_USER_AGENT", "False").lower() in ("true", "1", "yes")
-        if enable_user_agent:
-            driver = GraphDatabase.driver(uri, auth=(username, password),database=database, user_agent=os.environ.get('NEO4J_USER_AGENT'))
-        else:
-            driver = GraphDatabase.driver(uri, auth=(username, password),database=database)
-        logging.info("Connection successful")
-        return driver
+        def connect():
+            logging.info(f"Attempting to connect to the Neo4j database at {uri}")
+            enable_user_agent = os.environ.get("ENABLE_USER_AGENT", "False").lower() in ("true", "1", "yes")
+            if enable_user_agent:
+                driver = GraphDatabase.driver(uri, auth=(username, password),database=database, user_agent=os.environ.get('NEO4J_USER_AGENT'))
+            else:
+                driver = GraphDatabase.driver(uri, auth=(username, password),database=database)
+            logging.info("Connection successful")
+            return driver
+
+        return driver_pool.get(connection_key(uri, username, password, database), connect)
     except Exception as e:
         error_message = f"graph_query module: Failed to connect to the database at {uri}."
         logging.error(error_message, exc_info=True)
@@ -221,14 +228,10 @@ def get_graph_results(uri, username, password,database,document_names):
     except Exception as e:
         logging.error(f"graph_query module: An error occurred in get_graph_results. Error: {str(e)}")
         raise Exception(f"graph_query module: An error occurred in get_graph_results. Please check the logs for more details.") from e
-    finally:
-        logging.info("Closing connection for graph_query api")
-        driver.close()
 
 
 def get_chunktext_results(uri, username, password, database, document_name, page_no):
    """Retrieves chunk text, position, and page number from graph data with pagination."""
-   driver = None
    try:
        logging.info("Starting chunk text query process")
        offset = 10
@@ -256,14 +259,10 @@ def get_chunktext_results(uri, username, password, database, document_name, page
    except Exception as e:
        logging.error(f"An error occurred in get_chunktext_results. Error: {str(e)}")
        raise Exception("An error occurred in get_chunktext_results. Please check the logs for more details.") from e
-   finally:
-       if driver:
-           driver.close()
 
 
 def visualize_schema(uri, userName, password, database):
    """Retrieves graph schema"""
-   driver = None
    try:
        logging.info("Starting visualizing graph schema")
        driver = get_graphDB_driver(uri, userName, password,database)  
@@ -275,6 +274,3 @@ def visualize_schema(uri, userName, password, database):
    except Exception as e:
        logging.error(f"An error occurred schema retrieval. Error: {str(e)}")
        raise Exception(f"An error occurred schema retrieval. Error: {str(e)}")
-   finally:
-       if driver:
-           driver.close()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+import time
+
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 2))
+
+
+class PipelineBatch:
+    """A batch of chunks moving through the embedding, extraction and write stages."""
+
+    def __init__(self, index, start, end, chunks):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.chunks = chunks
+        self.created_at = time.time()
+        loop = asyncio.get_running_loop()
+        self.embedding = loop.create_future()
+        self.extraction = loop.create_future()
+
+
+async def _run_stage(queue: asyncio.Queue, stage, attribute):
+    """Drain ``queue`` in order, resolving ``attribute`` of every batch with the stage output."""
+    while True:
+        batch = await queue.get()
+        if batch is None:
+            return
+        future = getattr(batch, attribute)
+        try:
+            result = await stage(batch)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+
+async def run_ingestion_pipeline(batches, embed_stage, extract_stage, write_stage, should_stop=None, queue_size=PIPELINE_QUEUE_SIZE):
+    """
+    Run batches of chunks through a three stage pipeline.
+
+    Embedding and extraction for a batch run at the same time, and while batch N is
+    being written to the graph, batch N+1 is already being embedded and extracted.
+    Bounded queues between the stages keep at most ``queue_size`` batches in flight.
+
+    Args:
+        batches: Iterable of (start, end, chunks) tuples.
+        embed_stage: Coroutine function called with a PipelineBatch.
+        extract_stage: Coroutine function called with a PipelineBatch, its result is passed to the writer.
+        write_stage: Coroutine function called with (batch, embedding_result, extraction_result).
+        should_stop: Optional coroutine function checked before a batch enters the pipeline.
+        queue_size: Maximum number of batches waiting between two stages.
+
+    Returns:
+        A tuple of (number of batches written, True if the pipeline was stopped early).
+    """
+    queue_size = max(int(queue_size), 1)
+    embed_queue = asyncio.Queue(maxsize=queue_size)
+    extract_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    state = {'written': 0, 'stopped': False}
+
+    async def feed():
+        for index, (start, end, chunks) in enumerate(batches):
+            if should_stop is not None and await should_stop():
+                logging.info('Ingestion pipeline stopped before batch %d', index)
+                state['stopped'] = True
+                break
+            batch = PipelineBatch(index, start, end, chunks)
+            await embed_queue.put(batch)
+            await extract_queue.put(batch)
+            await write_queue.put(batch)
+        for queue in (embed_queue, extract_queue, write_queue):
+            await queue.put(None)
+
+    async def write():
+        while True:
+            batch = await write_queue.get()
+            if batch is None:
+                return
+            embedding_result = await batch.embedding
+            extraction_result = await batch.extraction
+            await write_stage(batch, embedding_result, extraction_result)
+            state['written'] += 1
+
+    tasks = [
+        asyncio.ensure_future(feed()),
+        asyncio.ensure_future(_run_stage(embed_queue, embed_stage, 'embedding')),
+        asyncio.ensure_future(_run_stage(extract_queue, extract_stage, 'extraction')),
+        asyncio.ensure_future(write()),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return state['written'], state['stopped']
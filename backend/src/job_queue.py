@@ -0,0 +1,407 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+DEFAULT_EXTRACT_JOB_QUEUE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "extract_jobs.db")
+
+# Parameters kept in memory only and never written to the queue database.
+SECRET_FIELDS = ("password", "aws_secret_access_key", "access_token")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# Seconds an idle worker waits before polling the queue again.
+WORKER_POLL_INTERVAL = 5.0
+# Seconds a waiting /extract request sleeps between checks of its job row,
+# which another server process may finish or cancel.
+WAIT_POLL_INTERVAL = 2.0
+# Server processes share the queue file and record a heartbeat; the jobs of
+# a process silent for longer than this are recovered by the others.
+PROCESS_STALE_SECONDS = 60.0
+HEARTBEAT_INTERVAL = 15.0
+
+CREDENTIALS_LOST_ERROR = "Job credentials were lost when the server restarted. Please resubmit the file."
+
+
+def tenant_key(uri, userName, database) -> str:
+    """Jobs are shared fairly between tenants, one tenant per database user."""
+    return f"{uri or ''}|{database or ''}|{userName or ''}"
+
+
+def job_response(job: dict) -> dict:
+    """API response of a finished job read from the queue."""
+    if job["result"]:
+        return job["result"]
+    if job["status"] == JOB_CANCELLED:
+        return {"status": "Cancelled", "message": f"Extraction of {job['file_name']} was cancelled before it started", "file_name": job["file_name"]}
+    message = job["error"] or f"Job {job['status']}"
+    return {"status": "Failed", "message": message, "error": message, "file_name": job["file_name"]}
+
+
+class ExtractJobQueue:
+    """
+    Persistent queue of extraction jobs stored in SQLite and shared by all
+    server processes.
+
+    Jobs are claimed highest priority first. Among the oldest queued jobs of
+    that priority, the tenant with the fewest running jobs goes first, and
+    ties go to the tenant that waited longest since its last job started, so
+    one tenant submitting hundreds of files does not starve the others.
+    Claims run in an immediate transaction, so a job is claimed by exactly
+    one process.
+
+    Credentials listed in SECRET_FIELDS are held in memory only, so a job
+    that needs them can only be claimed by the process it was submitted to.
+    When a process stops sending heartbeats, its running jobs are requeued,
+    and its jobs that need credentials fail and must be resubmitted.
+    """
+
+    def __init__(self, path: str = DEFAULT_EXTRACT_JOB_QUEUE_PATH, stale_after: float = PROCESS_STALE_SECONDS):
+        self.path = path
+        self.stale_after = stale_after
+        self.process_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._secrets = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; multi statement updates use explicit BEGIN IMMEDIATE transactions.
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS extract_jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT UNIQUE NOT NULL,
+                tenant TEXT NOT NULL,
+                file_name TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                has_secrets INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                submitter TEXT
+            )"""
+        )
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(extract_jobs)")}
+        for column in ("owner", "submitter"):
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE extract_jobs ADD COLUMN {column} TEXT")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS extract_jobs_status ON extract_jobs (status, priority, seq)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS extract_jobs_tenant_started ON extract_jobs (tenant, started_at)")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS queue_processes (process_id TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)"
+        )
+        self.heartbeat()
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the process lock and an immediate write transaction, which serializes writers across processes."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def heartbeat(self):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO queue_processes (process_id, heartbeat_at) VALUES (?, ?)", (self.process_id, time.time())
+            )
+
+    def requeue_interrupted(self) -> int:
+        """
+        Recover the jobs of processes whose heartbeat stopped: their running
+        jobs go back in the queue, and the jobs whose credentials died with
+        them fail. Returns the number of requeued jobs.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO queue_processes (process_id, heartbeat_at) VALUES (?, ?)", (self.process_id, now)
+            )
+            live = {row[0] for row in connection.execute(
+                "SELECT process_id FROM queue_processes WHERE heartbeat_at >= ?", (now - self.stale_after,)
+            )}
+            running = connection.execute(
+                "SELECT job_id, owner, has_secrets FROM extract_jobs WHERE status = ?", (JOB_RUNNING,)
+            ).fetchall()
+            requeued = [(job_id,) for job_id, owner, has_secrets in running if owner not in live and not has_secrets]
+            failed = [(job_id,) for job_id, owner, has_secrets in running if owner not in live and has_secrets]
+            failed += [(job_id,) for job_id, submitter in connection.execute(
+                "SELECT job_id, submitter FROM extract_jobs WHERE status = ? AND has_secrets = 1", (JOB_QUEUED,)
+            ) if submitter not in live]
+            connection.executemany(
+                "UPDATE extract_jobs SET status = ?, started_at = NULL, owner = NULL WHERE job_id = ?",
+                [(JOB_QUEUED, job_id) for (job_id,) in requeued],
+            )
+            connection.executemany(
+                "UPDATE extract_jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                [(JOB_FAILED, CREDENTIALS_LOST_ERROR, now, job_id) for (job_id,) in failed],
+            )
+            connection.execute("DELETE FROM queue_processes WHERE heartbeat_at < ?", (now - self.stale_after,))
+        if requeued or failed:
+            logging.info(f"Recovered extraction jobs of stopped server processes: {len(requeued)} requeued, {len(failed)} failed")
+        return len(requeued)
+
+    def submit(self, params: dict, priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        secrets = {field: params[field] for field in SECRET_FIELDS if params.get(field)}
+        stored_params = {key: value for key, value in params.items() if key not in SECRET_FIELDS}
+        with self._lock:
+            if secrets:
+                self._secrets[job_id] = secrets
+            self._connection.execute(
+                """INSERT INTO extract_jobs (job_id, tenant, file_name, priority, status, params, has_secrets, created_at, submitter)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, tenant_key(params.get("uri"), params.get("userName"), params.get("database")), params.get("file_name"),
+                 int(priority or 0), JOB_QUEUED, json.dumps(stored_params, default=str), int(bool(secrets)), time.time(),
+                 self.process_id if secrets else None),
+            )
+        return job_id
+
+    def claim_next(self) -> Optional[tuple]:
+        """Mark the next job running and return ``(job_id, params)``, or None when the queue is empty."""
+        # Jobs needing credentials are only visible to the process holding them.
+        claimable = "status = ? AND (has_secrets = 0 OR submitter = ?)"
+        with self._transaction() as connection:
+            top = connection.execute(
+                f"SELECT MAX(priority) FROM extract_jobs WHERE {claimable}", (JOB_QUEUED, self.process_id)
+            ).fetchone()[0]
+            if top is None:
+                return None
+            candidates = connection.execute(
+                f"SELECT tenant, MIN(seq) FROM extract_jobs WHERE {claimable} AND priority = ? GROUP BY tenant",
+                (JOB_QUEUED, self.process_id, top),
+            ).fetchall()
+            tenants = [tenant for tenant, _ in candidates]
+            placeholders = ",".join("?" * len(tenants))
+            running = dict(connection.execute(
+                f"SELECT tenant, COUNT(*) FROM extract_jobs WHERE status = ? AND tenant IN ({placeholders}) GROUP BY tenant",
+                (JOB_RUNNING, *tenants),
+            ).fetchall())
+            last_started = dict(connection.execute(
+                f"SELECT tenant, MAX(started_at) FROM extract_jobs WHERE tenant IN ({placeholders}) GROUP BY tenant", tenants
+            ).fetchall())
+            tenant, seq = min(
+                candidates,
+                key=lambda row: (running.get(row[0], 0), last_started.get(row[0]) or 0.0, row[1]),
+            )
+            job_id, params, has_secrets = connection.execute(
+                "SELECT job_id, params, has_secrets FROM extract_jobs WHERE seq = ?", (seq,)
+            ).fetchone()
+            cursor = connection.execute(
+                "UPDATE extract_jobs SET status = ?, started_at = ?, owner = ? WHERE seq = ? AND status = ?",
+                (JOB_RUNNING, time.time(), self.process_id, seq, JOB_QUEUED),
+            )
+            if cursor.rowcount != 1:
+                return None
+            secrets = self._secrets.pop(job_id, None)
+        params = json.loads(params)
+        if has_secrets and secrets is None:
+            self.finish(job_id, JOB_FAILED, error=CREDENTIALS_LOST_ERROR)
+            return self.claim_next()
+        params.update(secrets or {})
+        return job_id, params
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._secrets.pop(job_id, None)
+            self._connection.execute(
+                "UPDATE extract_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def cancel_queued(self, uri, userName, database, file_name) -> list:
+        """Cancel the queued jobs of ``file_name`` and return their ids; running jobs are stopped through the job registry."""
+        with self._transaction() as connection:
+            job_ids = [job_id for (job_id,) in connection.execute(
+                "SELECT job_id FROM extract_jobs WHERE status = ? AND tenant = ? AND file_name = ?",
+                (JOB_QUEUED, tenant_key(uri, userName, database), file_name),
+            )]
+            for job_id in job_ids:
+                self._secrets.pop(job_id, None)
+            connection.executemany(
+                "UPDATE extract_jobs SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                [(JOB_CANCELLED, time.time(), job_id, JOB_QUEUED) for job_id in job_ids],
+            )
+        return job_ids
+
+    def get(self, job_id) -> Optional[dict]:
+        with self._lock:
+            row = self._connection.execute(
+                """SELECT job_id, tenant, file_name, priority, status, result, error, created_at, started_at, finished_at, seq
+                   FROM extract_jobs WHERE job_id = ?""",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            position = None
+            if row[4] == JOB_QUEUED:
+                position = self._connection.execute(
+                    "SELECT COUNT(*) FROM extract_jobs WHERE status = ? AND (priority > ? OR (priority = ? AND seq < ?))",
+                    (JOB_QUEUED, row[3], row[3], row[10]),
+                ).fetchone()[0]
+        return {
+            "job_id": row[0],
+            "file_name": row[2],
+            "priority": row[3],
+            "status": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+            "created_at": row[7],
+            "started_at": row[8],
+            "finished_at": row[9],
+            "queue_position": position,
+        }
+
+    def close(self):
+        with self._lock:
+            # Without a heartbeat row, the jobs left running by this process are recovered by the others at once.
+            self._connection.execute("DELETE FROM queue_processes WHERE process_id = ?", (self.process_id,))
+            self._connection.close()
+
+
+class ExtractWorkerPool:
+    """
+    Fixed number of asyncio workers draining an :class:`ExtractJobQueue`.
+
+    ``handler`` is awaited with the job parameters and returns the API
+    response dict of the job; a response whose status is not "Success" marks
+    the job failed. Callers that want the response in-band await
+    :meth:`wait` with the job id. The pool also keeps the heartbeat of its
+    process and recovers the jobs of stopped sibling processes.
+    """
+
+    def __init__(self, queue: ExtractJobQueue, handler, worker_count: int):
+        self.queue = queue
+        self.handler = handler
+        self.worker_count = max(int(worker_count), 1)
+        self._wakeup = None
+        self._workers = []
+        self._waiters = {}
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self.queue.requeue_interrupted()
+        self._workers = [asyncio.create_task(self._work(), name=f"extract-worker-{i}") for i in range(self.worker_count)]
+        self._workers.append(asyncio.create_task(self._beat(), name="extract-queue-heartbeat"))
+        logging.info(f"Started {self.worker_count} extraction workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, params: dict, priority: int = 0) -> str:
+        job_id = self.queue.submit(params, priority)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def cancel_queued(self, uri, userName, database, file_name) -> int:
+        """Cancel the queued jobs of ``file_name`` and answer the requests waiting for them."""
+        job_ids = self.queue.cancel_queued(uri, userName, database, file_name)
+        for job_id in job_ids:
+            job = self.queue.get(job_id)
+            if job is not None:
+                self._resolve(job_id, job_response(job))
+        return len(job_ids)
+
+    async def wait(self, job_id) -> dict:
+        """
+        Wait for ``job_id`` to finish and return its response. Jobs run by
+        this process resolve the wait directly; the job row is polled for
+        jobs finished or cancelled by another process.
+        """
+        future = self._waiters.setdefault(job_id, asyncio.get_running_loop().create_future())
+        try:
+            while True:
+                if future.done():
+                    return future.result()
+                job = await asyncio.to_thread(self.queue.get, job_id)
+                if job is None:
+                    return {"status": "Failed", "message": f"Extraction job {job_id} not found"}
+                if job["status"] in (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED):
+                    return job_response(job)
+                try:
+                    return await asyncio.wait_for(asyncio.shield(future), WAIT_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters.pop(job_id, None)
+
+    def _resolve(self, job_id, response):
+        future = self._waiters.get(job_id)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await asyncio.to_thread(self.queue.heartbeat)
+                if await asyncio.to_thread(self.queue.requeue_interrupted) and self._wakeup is not None:
+                    self._wakeup.set()
+            except Exception as e:
+                logging.error(f"Extraction queue heartbeat failed: {e}")
+
+    async def _work(self):
+        while True:
+            claimed = await asyncio.to_thread(self.queue.claim_next)
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id, params = claimed
+            try:
+                response = await self.handler(params)
+            except asyncio.CancelledError:
+                # Shutdown; the job stays running in the database and is recovered once this process is gone.
+                raise
+            except Exception as e:
+                logging.exception(f"Extraction job {job_id} failed: {e}")
+                response = {"status": "Failed", "message": str(e), "error": str(e)}
+            status = JOB_COMPLETED if response.get("status") == "Success" else JOB_FAILED
+            await asyncio.to_thread(self.queue.finish, job_id, status, response, response.get("error"))
+            self._resolve(job_id, response)
+
+
+_extract_worker_pool = None
+_extract_worker_pool_lock = threading.Lock()
+
+
+def get_extract_worker_pool(handler) -> ExtractWorkerPool:
+    """Return the process wide worker pool, sized by EXTRACT_WORKER_COUNT."""
+    global _extract_worker_pool
+    with _extract_worker_pool_lock:
+        if _extract_worker_pool is None:
+            path = os.environ.get("EXTRACT_JOB_QUEUE_PATH") or DEFAULT_EXTRACT_JOB_QUEUE_PATH
+            _extract_worker_pool = ExtractWorkerPool(
+                ExtractJobQueue(path), handler, int(os.environ.get("EXTRACT_WORKER_COUNT", 4))
+            )
+            logging.info(f"Extraction job queue opened at {path}")
+        return _extract_worker_pool
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import os
+import threading
+
+# Seconds between checks of the Document is_cancelled flag set by other processes.
+CANCELLATION_DB_CHECK_INTERVAL = int(os.environ.get('CANCELLATION_DB_CHECK_INTERVAL', 10))
+
+
+class RunningJob:
+    """Extraction job running in this process, with the asyncio tasks to stop when it is cancelled."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.cancelled = False
+        self._tasks = set()
+
+    def add_task(self, task: asyncio.Task):
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self.cancelled:
+            task.cancel()
+
+    def _cancel_tasks(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    def cancel(self):
+        """Mark the job cancelled and cancel its tasks; safe to call from any thread."""
+        self.cancelled = True
+        if self.loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            self._cancel_tasks()
+        else:
+            self.loop.call_soon_threadsafe(self._cancel_tasks)
+
+
+class JobRegistry:
+    """
+    Registry of extraction jobs running in this process, keyed by the
+    database user and the file name, like the queue's tenants.
+
+    /cancelled_job signals a job here so its in-flight LLM calls stop at once.
+    The is_cancelled flag on the Document node remains the fallback for jobs
+    running in another process.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def register(self, uri, userName, database, file_name) -> RunningJob:
+        job = RunningJob(asyncio.get_running_loop())
+        with self._lock:
+            self._jobs[(uri, userName, database, file_name)] = job
+        return job
+
+    def unregister(self, uri, userName, database, file_name, job: RunningJob):
+        key = (uri, userName, database, file_name)
+        with self._lock:
+            if self._jobs.get(key) is job:
+                del self._jobs[key]
+
+    def cancel(self, uri, userName, database, file_name) -> bool:
+        """Cancel the job for ``file_name``; returns False when it is not running in this process."""
+        with self._lock:
+            job = self._jobs.get((uri, userName, database, file_name))
+        if job is None:
+            return False
+        logging.info(f"Cancelling running extraction job for {file_name}")
+        job.cancel()
+        return True
+
+    def is_cancelled(self, uri, userName, database, file_name) -> bool:
+        with self._lock:
+            job = self._jobs.get((uri, userName, database, file_name))
+        return job is not None and job.cancelled
+
+
+job_registry = JobRegistry()
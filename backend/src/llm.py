@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from langchain.docstore.document import Document
 import os
@@ -15,12 +16,55 @@ import boto3
 import google.auth
 from src.shared.constants import ADDITIONAL_INSTRUCTIONS
 from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
+from src.shared.executors import run_io
+from src.shared.llm_governor import estimate_tokens, get_llm_governor
+from src.shared.extraction_cache import deserialize_graph_document, extraction_cache_key, get_extraction_cache, serialize_graph_document
 import re
+import threading
 from typing import List
 import json
 
+# model name -> (env config the client was built from, llm, model_name)
+_llm_registry = {}
+_llm_registry_locks = {}
+_llm_registry_lock = threading.Lock()
+
 def get_llm(model: str):
-    """Retrieve the specified language model based on the model name."""
+    """
+    Retrieve the specified language model based on the model name.
+
+    Clients are built once per model and reused by every caller, so their
+    HTTP connection pools stay warm. A client is rebuilt when its
+    LLM_MODEL_CONFIG_ value changes.
+    """
+    model = model.lower().strip()
+    env_value = os.environ.get(f"LLM_MODEL_CONFIG_{model}")
+    with _llm_registry_lock:
+        model_lock = _llm_registry_locks.setdefault(model, threading.Lock())
+    with model_lock:
+        registered = _llm_registry.get(model)
+        if registered is not None and registered[0] == env_value:
+            return registered[1], registered[2]
+        llm, model_name = create_llm(model)
+        _llm_registry[model] = (env_value, llm, model_name)
+        return llm, model_name
+
+def get_governor(llm):
+    """Return the LLMGovernor shared by every call made with ``llm``."""
+    with _llm_registry_lock:
+        registered = list(_llm_registry.items())
+    for model, (_, registered_llm, _) in registered:
+        if registered_llm is llm:
+            return get_llm_governor(model)
+    return get_llm_governor(get_llm_model_name(llm) or type(llm).__name__)
+
+def clear_llm_registry():
+    """Drop every registered LLM client; the next get_llm call builds a new one."""
+    with _llm_registry_lock:
+        _llm_registry.clear()
+
+def create_llm(model: str):
+    """Build a new language model client from its LLM_MODEL_CONFIG_ environment variable."""
     model = model.lower().strip()
     env_key = f"LLM_MODEL_CONFIG_{model}"
     env_value = os.environ.get(env_key)
@@ -263,12 +307,80 @@ async def get_graph_document_list(
             additional_instructions=ADDITIONAL_INSTRUCTIONS+ (additional_instructions if additional_instructions else "")
         )
     
-    if isinstance(llm,DiffbotGraphTransformer):
-        graph_document_list = llm_transformer.convert_to_graph_documents(combined_chunk_document_list)
+    extraction_cache = get_extraction_cache()
+    if extraction_cache is None:
+        return await convert_to_graph_documents(llm, llm_transformer, combined_chunk_document_list)
+
+    if isinstance(llm, DiffbotGraphTransformer):
+        cache_model_name = "diffbot"
     else:
-        graph_document_list = await llm_transformer.aconvert_to_graph_documents(combined_chunk_document_list)
+        cache_model_name = f"{type(llm).__name__}:{get_llm_model_name(llm)}"
+    cache_keys = [
+        extraction_cache_key(cache_model_name, document.page_content, allowedNodes, allowedRelationship, additional_instructions)
+        for document in combined_chunk_document_list
+    ]
+    cached_payloads = extraction_cache.get_many(cache_keys)
+    missing_indexes = [i for i, key in enumerate(cache_keys) if key not in cached_payloads]
+    logging.info(f"Extraction cache hits: {len(cache_keys) - len(missing_indexes)} of {len(cache_keys)}")
+
+    extracted = {}
+    if missing_indexes:
+        missing_documents = [combined_chunk_document_list[i] for i in missing_indexes]
+        new_graph_documents = await convert_to_graph_documents(llm, llm_transformer, missing_documents)
+        if len(new_graph_documents) != len(missing_documents):
+            logging.warning("Graph transformer returned %s documents for %s inputs. Skipping extraction cache update.", len(new_graph_documents), len(missing_documents))
+            return merge_in_chunk_order(combined_chunk_document_list, cache_keys, cached_payloads, new_graph_documents)
+        extracted = dict(zip(missing_indexes, new_graph_documents))
+        try:
+            # An empty result may be a failed or truncated response, so it is extracted again next time.
+            extraction_cache.put_many({
+                cache_keys[i]: serialize_graph_document(graph_document)
+                for i, graph_document in extracted.items()
+                if graph_document.nodes or graph_document.relationships
+            })
+        except Exception as e:
+            logging.error(f"Unable to store graph documents in extraction cache: {e}")
+
+    for i, document in enumerate(combined_chunk_document_list):
+        if i in extracted:
+            graph_document_list.append(extracted[i])
+        else:
+            graph_document_list.append(deserialize_graph_document(cached_payloads[cache_keys[i]], document))
     return graph_document_list
 
+def merge_in_chunk_order(documents, cache_keys, cached_payloads, new_graph_documents):
+    """
+    Combine cached and newly extracted graph documents in the order of
+    ``documents``, matching new ones to their chunk by source. New documents
+    whose source is not one of the chunks are kept at the end.
+    """
+    new_by_source = {}
+    for graph_document in new_graph_documents:
+        new_by_source.setdefault(id(graph_document.source), []).append(graph_document)
+    graph_document_list = []
+    for key, document in zip(cache_keys, documents):
+        if key in cached_payloads:
+            graph_document_list.append(deserialize_graph_document(cached_payloads[key], document))
+        else:
+            graph_document_list.extend(new_by_source.pop(id(document), []))
+    for graph_documents in new_by_source.values():
+        graph_document_list.extend(graph_documents)
+    return graph_document_list
+
+async def convert_to_graph_documents(llm, llm_transformer, combined_chunk_document_list):
+    governor = get_governor(llm)
+    if isinstance(llm,DiffbotGraphTransformer):
+        # The Diffbot client blocks, so each document is sent from the I/O thread pool.
+        results = await asyncio.gather(*(
+            governor.arun(run_io, llm_transformer.convert_to_graph_documents, [document], tokens=estimate_tokens(document.page_content))
+            for document in combined_chunk_document_list
+        ))
+        return [graph_document for graph_documents in results for graph_document in graph_documents]
+    return list(await asyncio.gather(*(
+        governor.arun(llm_transformer.aprocess_response, document, tokens=estimate_tokens(document.page_content))
+        for document in combined_chunk_document_list
+    )))
+
 async def get_graph_from_llm(model, chunkId_chunkDoc_list, allowedNodes, allowedRelationship, chunks_to_combine, additional_instructions=None):
    try:
        llm, model_name = get_llm(model)
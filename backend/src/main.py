@@ -6,14 +6,14 @@ from src.shared.constants import (BUCKET_UPLOAD,BUCKET_FAILED_FILE, PROJECT_ID,
                                   START_FROM_BEGINNING,
                                   START_FROM_LAST_PROCESSED_POSITION,
                                   DELETE_ENTITIES_AND_START_FROM_BEGINNING,
-                                  QUERY_TO_GET_NODES_AND_RELATIONS_OF_A_DOCUMENT)
+                                  UPDATE_CHANGED_CHUNKS, SOURCE_NODE_BATCH_SIZE)
 from src.shared.schema_extraction import schema_extraction_from_text
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
-from src.create_chunks import CreateChunksofDocument
+from src.create_chunks import split_file_by_path_into_chunks, split_pages_into_chunks
+from src.document_sources.pdf_loader import is_large_pdf
 from src.graphDB_dataAccess import graphDBdataAccess
-from src.document_sources.local_file import get_documents_from_file_by_path
 from src.entities.source_node import sourceNode
 from src.llm import get_graph_from_llm
 from src.document_sources.gcs_bucket import *
@@ -24,12 +24,19 @@ from src.shared.common_fn import *
 from src.make_relationships import *
 from src.document_sources.web_pages import *
 from src.graph_query import get_graphDB_driver
+from src.ingestion_pipeline import run_ingestion_pipeline
+from src.job_registry import CANCELLATION_DB_CHECK_INTERVAL, job_registry
+from src.shared.executors import run_cpu, run_io
+from src.shared.chunked_upload import write_upload_part
+import asyncio
 import re
-from langchain_community.document_loaders import WikipediaLoader, WebBaseLoader
 import warnings
 import sys
 import shutil
+import tempfile
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import json
 from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
 
@@ -37,17 +44,40 @@ warnings.filterwarnings("ignore")
 load_dotenv()
 logging.basicConfig(format='%(asctime)s - %(message)s',level='INFO')
 
-def create_source_node_graph_url_s3(graph, model, source_url, aws_access_key_id, aws_secret_access_key, source_type):
-    
+def create_source_nodes_in_batches(graph, obj_source_nodes, to_file_info):
+    """
+    Write the Document nodes of ``obj_source_nodes``, an iterable that may still be listing a bucket,
+    with one UNWIND query per SOURCE_NODE_BATCH_SIZE files. A batch is written while the next one is
+    listed. ``to_file_info`` turns a source node into its entry of the returned file list.
+    """
+    graphDb_data_Access = graphDBdataAccess(graph)
     lst_file_name = []
-    files_info = get_s3_files_info(source_url,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key)
-    if len(files_info)==0:
-      raise LLMGraphBuilderException('No pdf files found.')
-    logging.info(f'files info : {files_info}')
-    success_count=0
-    failed_count=0
+
+    def write_batch(batch):
+      try:
+        graphDb_data_Access.create_source_nodes(batch)
+        status = 'Success'
+      except Exception as e:
+        logging.exception(f'Unable to create {len(batch)} source nodes: {e}')
+        status = 'Failed'
+      return [{**to_file_info(obj_source_node), 'status': status} for obj_source_node in batch]
+
+    obj_source_nodes = iter(obj_source_nodes)
+    with ThreadPoolExecutor(max_workers=1) as writer:
+      pending = None
+      while batch := list(islice(obj_source_nodes, SOURCE_NODE_BATCH_SIZE)):
+        if pending is not None:
+          lst_file_name.extend(pending.result())
+        pending = writer.submit(write_batch, batch)
+      if pending is not None:
+        lst_file_name.extend(pending.result())
+    success_count = sum(1 for file_info in lst_file_name if file_info['status'] == 'Success')
+    return lst_file_name, success_count, len(lst_file_name) - success_count
+
+def create_source_node_graph_url_s3(graph, model, source_url, aws_access_key_id, aws_secret_access_key, source_type):
     
-    for file_info in files_info:
+    def source_nodes():
+      for file_info in iter_s3_files_info(source_url,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key):
         file_name=file_info['file_key'] 
         obj_source_node = sourceNode()
         obj_source_node.file_name = file_name.split('/')[-1].strip() if isinstance(file_name.split('/')[-1], str) else file_name.split('/')[-1]
@@ -64,61 +94,48 @@ def create_source_node_graph_url_s3(graph, model, source_url, aws_access_key_id,
         obj_source_node.entityEntityRelCount=0
         obj_source_node.communityNodeCount=0
         obj_source_node.communityRelCount=0
-        try:
-          graphDb_data_Access = graphDBdataAccess(graph)
-          graphDb_data_Access.create_source_node(obj_source_node)
-          success_count+=1
-          lst_file_name.append({'fileName':obj_source_node.file_name,'fileSize':obj_source_node.file_size,'url':obj_source_node.url,'status':'Success'})
-
-        except Exception as e:
-          failed_count+=1
-          lst_file_name.append({'fileName':obj_source_node.file_name,'fileSize':obj_source_node.file_size,'url':obj_source_node.url,'status':'Failed'})
+        yield obj_source_node
+
+    lst_file_name,success_count,failed_count = create_source_nodes_in_batches(graph, source_nodes(),
+        lambda obj_source_node: {'fileName':obj_source_node.file_name,'fileSize':obj_source_node.file_size,'url':obj_source_node.url})
+    if len(lst_file_name)==0:
+      raise LLMGraphBuilderException('No pdf files found.')
+    logging.info(f'Created {success_count} source nodes for {source_url}, {failed_count} failed')
     return lst_file_name,success_count,failed_count
 
 def create_source_node_graph_url_gcs(graph, model, gcs_project_id, gcs_bucket_name, gcs_bucket_folder, source_type, credentials):
 
-    success_count=0
-    failed_count=0
-    lst_file_name = []
-    
-    lst_file_metadata= get_gcs_bucket_files_info(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, credentials)
-    for file_metadata in lst_file_metadata :
-      obj_source_node = sourceNode()
-      obj_source_node.file_name = file_metadata['fileName'].strip() if isinstance(file_metadata['fileName'], str) else file_metadata['fileName']
-      obj_source_node.file_size = file_metadata['fileSize']
-      obj_source_node.url = file_metadata['url']
-      obj_source_node.file_source = source_type
-      obj_source_node.model = model
-      obj_source_node.file_type = 'pdf'
-      obj_source_node.gcsBucket = gcs_bucket_name
-      obj_source_node.gcsBucketFolder = file_metadata['gcsBucketFolder']
-      obj_source_node.gcsProjectId = file_metadata['gcsProjectId']
-      obj_source_node.created_at = datetime.now()
-      obj_source_node.access_token = credentials.token
-      obj_source_node.chunkNodeCount=0
-      obj_source_node.chunkRelCount=0
-      obj_source_node.entityNodeCount=0
-      obj_source_node.entityEntityRelCount=0
-      obj_source_node.communityNodeCount=0
-      obj_source_node.communityRelCount=0
-    
-      try:
-          graphDb_data_Access = graphDBdataAccess(graph)
-          graphDb_data_Access.create_source_node(obj_source_node)
-          success_count+=1
-          lst_file_name.append({'fileName':obj_source_node.file_name,'fileSize':obj_source_node.file_size,'url':obj_source_node.url,'status':'Success', 
-                                'gcsBucketName': gcs_bucket_name, 'gcsBucketFolder':obj_source_node.gcsBucketFolder, 'gcsProjectId':obj_source_node.gcsProjectId})
-      except Exception as e:
-        failed_count+=1
-        lst_file_name.append({'fileName':obj_source_node.file_name,'fileSize':obj_source_node.file_size,'url':obj_source_node.url,'status':'Failed', 
-                              'gcsBucketName': gcs_bucket_name, 'gcsBucketFolder':obj_source_node.gcsBucketFolder, 'gcsProjectId':obj_source_node.gcsProjectId})
-    return lst_file_name,success_count,failed_count
+    def source_nodes():
+      for file_metadata in iter_gcs_bucket_files_info(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, credentials):
+        obj_source_node = sourceNode()
+        obj_source_node.file_name = file_metadata['fileName'].strip() if isinstance(file_metadata['fileName'], str) else file_metadata['fileName']
+        obj_source_node.file_size = file_metadata['fileSize']
+        obj_source_node.url = file_metadata['url']
+        obj_source_node.file_source = source_type
+        obj_source_node.model = model
+        obj_source_node.file_type = 'pdf'
+        obj_source_node.gcsBucket = gcs_bucket_name
+        obj_source_node.gcsBucketFolder = file_metadata['gcsBucketFolder']
+        obj_source_node.gcsProjectId = file_metadata['gcsProjectId']
+        obj_source_node.created_at = datetime.now()
+        obj_source_node.access_token = credentials.token
+        obj_source_node.chunkNodeCount=0
+        obj_source_node.chunkRelCount=0
+        obj_source_node.entityNodeCount=0
+        obj_source_node.entityEntityRelCount=0
+        obj_source_node.communityNodeCount=0
+        obj_source_node.communityRelCount=0
+        yield obj_source_node
+
+    return create_source_nodes_in_batches(graph, source_nodes(),
+        lambda obj_source_node: {'fileName':obj_source_node.file_name,'fileSize':obj_source_node.file_size,'url':obj_source_node.url,
+                                 'gcsBucketName': gcs_bucket_name, 'gcsBucketFolder':obj_source_node.gcsBucketFolder, 'gcsProjectId':obj_source_node.gcsProjectId})
 
 def create_source_node_graph_web_url(graph, model, source_url, source_type):
     success_count=0
     failed_count=0
     lst_file_name = []
-    pages = WebBaseLoader(source_url, verify_ssl=False).load()
+    pages = get_documents_from_web_page(source_url)
     if pages==None or len(pages)==0:
       failed_count+=1
       message = f"Unable to read data for given url : {source_url}"
@@ -200,7 +217,7 @@ def create_source_node_graph_url_wikipedia(graph, model, wiki_query, source_type
     lst_file_name=[]
     wiki_query_id, language = check_url_source(source_type=source_type, wiki_query=wiki_query)
     logging.info(f"Creating source node for {wiki_query_id.strip()}, {language}")
-    pages = WikipediaLoader(query=wiki_query_id.strip(), lang=language, load_max_docs=1, load_all_available_meta=True).load()
+    _, pages = get_documents_from_Wikipedia(wiki_query_id, language)
     if pages==None or len(pages)==0:
       failed_count+=1
       message = f"Unable to read data for given Wikipedia url : {wiki_query}"
@@ -227,74 +244,97 @@ def create_source_node_graph_url_wikipedia(graph, model, wiki_query, source_type
       lst_file_name.append({'fileName':obj_source_node.file_name,'fileSize':obj_source_node.file_size,'url':obj_source_node.url, 'language':obj_source_node.language, 'status':'Success'})
     return lst_file_name,success_count,failed_count
     
+def reloads_source(retry_condition):
+  """A first run and an incremental update read the source again; the other retries reuse the stored chunks."""
+  return not retry_condition or retry_condition == UPDATE_CHANGED_CHUNKS
+
+async def split_local_file_into_chunks(file_path, file_name, token_chunk_size, chunk_overlap):
+  """Parse and chunk a local file page by page; parsing stops at the chunk budget."""
+  if await run_io(is_large_pdf, file_path):
+    # Runs here rather than in a pool worker, so that page ranges are parsed across the process pool.
+    return await run_io(split_file_by_path_into_chunks, file_path, file_name, token_chunk_size, chunk_overlap)
+  return await run_cpu(split_file_by_path_into_chunks, file_path, file_name, token_chunk_size, chunk_overlap)
+
 async def extract_graph_from_file_local_file(uri, userName, password, database, model, merged_file_path, fileName, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition, additional_instructions):
 
   logging.info(f'Process file name :{fileName}')
-  if not retry_condition:
+  if reloads_source(retry_condition):
     gcs_file_cache = os.environ.get('GCS_FILE_CACHE')
     if gcs_file_cache == 'True':
       folder_name = create_gcs_bucket_folder_name_hashed(uri, fileName)
-      file_name, pages = get_documents_from_gcs( PROJECT_ID, BUCKET_UPLOAD, folder_name, fileName)
+      file_name, pages = await run_io(get_documents_from_gcs, PROJECT_ID, BUCKET_UPLOAD, folder_name, fileName)
+      chunks = None
+      content = pages
     else:
-      file_name, pages, file_extension = get_documents_from_file_by_path(merged_file_path,fileName)
-    if pages==None or len(pages)==0:
+      file_name, chunks = await split_local_file_into_chunks(merged_file_path, fileName, token_chunk_size, chunk_overlap)
+      pages = []
+      content = chunks
+    if content==None or len(content)==0:
       raise LLMGraphBuilderException(f'File content is not available for file : {file_name}')
-    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, True, merged_file_path, additional_instructions=additional_instructions)
+    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, True, merged_file_path, retry_condition, additional_instructions=additional_instructions, chunks=chunks)
   else:
     return await processing_source(uri, userName, password, database, model, fileName, [], allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, True, merged_file_path, retry_condition, additional_instructions=additional_instructions)
   
 async def extract_graph_from_file_s3(uri, userName, password, database, model, source_url, aws_access_key_id, aws_secret_access_key, file_name, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition, additional_instructions):
-  if not retry_condition:
+  if reloads_source(retry_condition):
     if(aws_access_key_id==None or aws_secret_access_key==None):
       raise LLMGraphBuilderException('Please provide AWS access and secret keys')
     else:
       logging.info("Insert in S3 Block")
-      file_name, pages = get_documents_from_s3(source_url, aws_access_key_id, aws_secret_access_key)
+      file_name, pages = await run_io(get_documents_from_s3, source_url, aws_access_key_id, aws_secret_access_key)
 
     if pages==None or len(pages)==0:
       raise LLMGraphBuilderException(f'File content is not available for file : {file_name}')
-    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, additional_instructions=additional_instructions)
+    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   else:
     return await processing_source(uri, userName, password, database, model, file_name, [], allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   
 async def extract_graph_from_web_page(uri, userName, password, database, model, source_url, file_name, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition, additional_instructions):
-  if not retry_condition:
-    pages = get_documents_from_web_page(source_url)
+  if reloads_source(retry_condition):
+    pages = await run_io(get_documents_from_web_page, source_url)
     if pages==None or len(pages)==0:
       raise LLMGraphBuilderException(f'Content is not available for given URL : {file_name}')
-    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, additional_instructions=additional_instructions)
+    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   else:
     return await processing_source(uri, userName, password, database, model, file_name, [], allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   
 async def extract_graph_from_file_youtube(uri, userName, password, database, model, source_url, file_name, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition, additional_instructions):
-  if not retry_condition:
-    file_name, pages = get_documents_from_youtube(source_url)
+  if reloads_source(retry_condition):
+    file_name, pages = await run_io(get_documents_from_youtube, source_url)
 
     if pages==None or len(pages)==0:
       raise LLMGraphBuilderException(f'Youtube transcript is not available for file : {file_name}')
-    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, additional_instructions=additional_instructions)
+    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   else:
      return await processing_source(uri, userName, password, database, model, file_name, [], allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
     
 async def extract_graph_from_file_Wikipedia(uri, userName, password, database, model, wiki_query, language, file_name, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition, additional_instructions):
-  if not retry_condition:
-    file_name, pages = get_documents_from_Wikipedia(wiki_query, language)
+  if reloads_source(retry_condition):
+    file_name, pages = await run_io(get_documents_from_Wikipedia, wiki_query, language)
     if pages==None or len(pages)==0:
       raise LLMGraphBuilderException(f'Wikipedia page is not available for file : {file_name}')
-    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, additional_instructions=additional_instructions)
+    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   else:
     return await processing_source(uri, userName, password, database, model, file_name,[], allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
 
 async def extract_graph_from_file_gcs(uri, userName, password, database, model, gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, access_token, file_name, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition, additional_instructions):
-  if not retry_condition:
-    file_name, pages = get_documents_from_gcs(gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, access_token)
+  if reloads_source(retry_condition) and access_token:
+    # The file is downloaded and chunked like a local one, so parsing stops at the chunk budget.
+    with tempfile.TemporaryDirectory() as temp_dir:
+      file_path = await run_io(download_gcs_file, gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, access_token, temp_dir)
+      file_name, chunks = await split_local_file_into_chunks(file_path, gcs_blob_filename, token_chunk_size, chunk_overlap)
+    if not chunks:
+      raise LLMGraphBuilderException(f'File content is not available for file : {file_name}')
+    return await processing_source(uri, userName, password, database, model, file_name, [], allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions, chunks=chunks)
+  elif reloads_source(retry_condition):
+    file_name, pages = await run_io(get_documents_from_gcs, gcs_project_id, gcs_bucket_name, gcs_bucket_folder, gcs_blob_filename, access_token)
     if pages==None or len(pages)==0:
       raise LLMGraphBuilderException(f'File content is not available for file : {file_name}')
-    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, additional_instructions=additional_instructions)
+    return await processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   else:
     return await processing_source(uri, userName, password, database, model, file_name, [], allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, retry_condition=retry_condition, additional_instructions=additional_instructions)
   
-async def processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, is_uploaded_from_local=None, merged_file_path=None, retry_condition=None, additional_instructions=None):
+async def processing_source(uri, userName, password, database, model, file_name, pages, allowedNodes, allowedRelationship, token_chunk_size, chunk_overlap, chunks_to_combine, is_uploaded_from_local=None, merged_file_path=None, retry_condition=None, additional_instructions=None, chunks=None):
   """
    Extracts a Neo4jGraph from a PDF file based on the model.
    
@@ -315,15 +355,15 @@ async def processing_source(uri, userName, password, database, model, file_name,
   start_time = datetime.now()
   processing_source_start_time = time.time()
   start_create_connection = time.time()
-  graph = create_graph_database_connection(uri, userName, password, database)
+  graph = await run_io(create_graph_database_connection, uri, userName, password, database)
   end_create_connection = time.time()
   elapsed_create_connection = end_create_connection - start_create_connection
   logging.info(f'Time taken database connection: {elapsed_create_connection:.2f} seconds')
   uri_latency["create_connection"] = f'{elapsed_create_connection:.2f}'
   graphDb_data_Access = graphDBdataAccess(graph)
-  create_chunk_vector_index(graph)
+  await run_io(create_chunk_vector_index, graph)
   start_get_chunkId_chunkDoc_list = time.time()
-  total_chunks, chunkId_chunkDoc_list = get_chunkId_chunkDoc_list(graph, file_name, pages, token_chunk_size, chunk_overlap, retry_condition)
+  total_chunks, chunkId_chunkDoc_list = await get_chunkId_chunkDoc_list(graph, file_name, pages, token_chunk_size, chunk_overlap, retry_condition, chunks)
   end_get_chunkId_chunkDoc_list = time.time()
   elapsed_get_chunkId_chunkDoc_list = end_get_chunkId_chunkDoc_list - start_get_chunkId_chunkDoc_list
   logging.info(f'Time taken to create list chunkids with chunk document: {elapsed_get_chunkId_chunkDoc_list:.2f} seconds')
@@ -331,7 +371,7 @@ async def processing_source(uri, userName, password, database, model, file_name,
   uri_latency["total_chunks"] = total_chunks
 
   start_status_document_node = time.time()
-  result = graphDb_data_Access.get_current_status_document_node(file_name)
+  result = await run_io(graphDb_data_Access.get_current_status_document_node, file_name)
   end_status_document_node = time.time()
   elapsed_status_document_node = end_status_document_node - start_status_document_node
   logging.info(f'Time taken to get the current status of document node: {elapsed_status_document_node:.2f} seconds')
@@ -352,14 +392,15 @@ async def processing_source(uri, userName, password, database, model, file_name,
       if retry_condition == START_FROM_LAST_PROCESSED_POSITION:
           node_count = result[0]['nodeCount']
           rel_count = result[0]['relationshipCount']
-          select_chunks_with_retry = result[0]['processed_chunk']
+      if retry_condition in (START_FROM_LAST_PROCESSED_POSITION, UPDATE_CHANGED_CHUNKS):
+          # Only the chunks after the resume position, or the changed ones, are in chunkId_chunkDoc_list.
+          select_chunks_with_retry = total_chunks - len(chunkId_chunkDoc_list)
       obj_source_node.processed_chunk = 0+select_chunks_with_retry
       logging.info(file_name)
       logging.info(obj_source_node)
       
       start_update_source_node = time.time()
-      graphDb_data_Access.update_source_node(obj_source_node)
-      graphDb_data_Access.update_node_relationship_count(file_name)
+      await run_io(graphDb_data_Access.update_source_node, obj_source_node)
       end_update_source_node = time.time()
       elapsed_update_source_node = end_update_source_node - start_update_source_node
       logging.info(f'Time taken to update the document source node: {elapsed_update_source_node:.2f} seconds')
@@ -367,50 +408,87 @@ async def processing_source(uri, userName, password, database, model, file_name,
 
       logging.info('Update the status as Processing')
       update_graph_chunk_processed = int(os.environ.get('UPDATE_GRAPH_CHUNKS_PROCESSED'))
-      # selected_chunks = []
-      is_cancelled_status = False
+      # Chunks repeated from other documents already have an embedding and entities; they only needed the links written above.
+      processed_chunk_ids = await run_io(get_already_processed_chunk_ids, graph, file_name, [chunk['chunk_id'] for chunk in chunkId_chunkDoc_list])
+      deduplicated_chunks = 0
+      selected_chunks = len(chunkId_chunkDoc_list)
+      # 1-based position of every chunk to process among the selected ones, so progress counts the skipped chunks it has passed.
+      chunk_positions = list(range(1, selected_chunks + 1))
+      if processed_chunk_ids:
+        chunk_positions = [position for position, chunk in enumerate(chunkId_chunkDoc_list, start=1) if chunk['chunk_id'] not in processed_chunk_ids]
+        chunks_to_process = [chunkId_chunkDoc_list[position - 1] for position in chunk_positions]
+        deduplicated_chunks = len(chunkId_chunkDoc_list) - len(chunks_to_process)
+        chunkId_chunkDoc_list = chunks_to_process
+        logging.info(f'Skipping embedding and extraction of {deduplicated_chunks} chunks already processed for other documents in file {file_name}')
+      uri_latency["deduplicated_chunks"] = deduplicated_chunks
       job_status = "Completed"
+      batches = []
       for i in range(0, len(chunkId_chunkDoc_list), update_graph_chunk_processed):
-        select_chunks_upto = i+update_graph_chunk_processed
-        logging.info(f'Selected Chunks upto: {select_chunks_upto}')
-        if len(chunkId_chunkDoc_list) <= select_chunks_upto:
-          select_chunks_upto = len(chunkId_chunkDoc_list)
-        selected_chunks = chunkId_chunkDoc_list[i:select_chunks_upto]
-        
-        result = graphDb_data_Access.get_current_status_document_node(file_name)
-        is_cancelled_status = result[0]['is_cancelled']
+        select_chunks_upto = min(i+update_graph_chunk_processed, len(chunkId_chunkDoc_list))
+        batches.append((i, select_chunks_upto, chunkId_chunkDoc_list[i:select_chunks_upto]))
+      counts = {'node_count': node_count, 'rel_count': rel_count}
+
+      running_job = job_registry.register(uri, userName, database, file_name)
+      last_cancel_check = {'time': time.monotonic()}
+
+      async def is_cancelled():
+        if running_job.cancelled:
+          return True
+        # The Document flag only matters when the job was cancelled from another process.
+        if time.monotonic() - last_cancel_check['time'] < CANCELLATION_DB_CHECK_INTERVAL:
+          return False
+        last_cancel_check['time'] = time.monotonic()
+        result = await run_io(graphDb_data_Access.get_current_status_document_node, file_name)
         logging.info(f"Value of is_cancelled : {result[0]['is_cancelled']}")
-        if bool(is_cancelled_status) == True:
-          job_status = "Cancelled"
-          logging.info('Exit from running loop of processing file')
-          break
-        else:
-          processing_chunks_start_time = time.time()
-          node_count,rel_count,latency_processed_chunk = await processing_chunks(selected_chunks,graph,uri, userName, password, database,file_name,model,allowedNodes,allowedRelationship,chunks_to_combine,node_count, rel_count, additional_instructions)
-          processing_chunks_end_time = time.time()
-          processing_chunks_elapsed_end_time = processing_chunks_end_time - processing_chunks_start_time
-          logging.info(f"Time taken {update_graph_chunk_processed} chunks processed upto {select_chunks_upto} completed in {processing_chunks_elapsed_end_time:.2f} seconds for file name {file_name}")
-          uri_latency[f'processed_combine_chunk_{i}-{select_chunks_upto}'] = f'{processing_chunks_elapsed_end_time:.2f}'
-          uri_latency[f'processed_chunk_detail_{i}-{select_chunks_upto}'] = latency_processed_chunk
-          end_time = datetime.now()
-          processed_time = end_time - start_time
-          
-          obj_source_node = sourceNode()
-          obj_source_node.file_name = file_name
-          obj_source_node.updated_at = end_time
-          obj_source_node.processing_time = processed_time
-          obj_source_node.processed_chunk = select_chunks_upto+select_chunks_with_retry
-          if retry_condition == START_FROM_BEGINNING:
-            result = execute_graph_query(graph,QUERY_TO_GET_NODES_AND_RELATIONS_OF_A_DOCUMENT, params={"filename":file_name})
-            obj_source_node.node_count = result[0]['nodes']
-            obj_source_node.relationship_count = result[0]['rels']
-          else:  
-            obj_source_node.node_count = node_count
-            obj_source_node.relationship_count = rel_count
-          graphDb_data_Access.update_source_node(obj_source_node)
-          graphDb_data_Access.update_node_relationship_count(file_name)
+        return bool(result[0]['is_cancelled'])
+
+      async def embed_stage(batch):
+        return await run_io(embed_chunks, batch.chunks)
+
+      async def extract_stage(batch):
+        return await extract_graph_documents(model, batch.chunks, allowedNodes, allowedRelationship, chunks_to_combine, additional_instructions)
+
+      async def write_stage(batch, embedding, extraction):
+        chunk_embeddings, latency_embedding = embedding
+        graph_documents, latency_extraction = extraction
+        node_count, rel_count, latency_processed_chunk = await run_io(processing_chunks, graph_documents, batch.chunks, graph, uri, userName, password, database, file_name, chunk_embeddings)
+        latency_processed_chunk = {**latency_embedding, **latency_extraction, **latency_processed_chunk}
+        processing_chunks_elapsed_end_time = time.time() - batch.created_at
+        logging.info(f"Time taken {update_graph_chunk_processed} chunks processed upto {batch.end} completed in {processing_chunks_elapsed_end_time:.2f} seconds for file name {file_name}")
+        uri_latency[f'processed_combine_chunk_{batch.start}-{batch.end}'] = f'{processing_chunks_elapsed_end_time:.2f}'
+        uri_latency[f'processed_chunk_detail_{batch.start}-{batch.end}'] = latency_processed_chunk
+        end_time = datetime.now()
+        processed_time = end_time - start_time
+
+        obj_source_node = sourceNode()
+        obj_source_node.file_name = file_name
+        obj_source_node.updated_at = end_time
+        obj_source_node.processing_time = processed_time
+        obj_source_node.processed_chunk = min(select_chunks_with_retry + chunk_positions[batch.end - 1], total_chunks)
+        obj_source_node.node_count = node_count
+        obj_source_node.relationship_count = rel_count
+        await run_io(graphDb_data_Access.update_source_node, obj_source_node)
+        counts['node_count'] = node_count
+        counts['rel_count'] = rel_count
+
+      pipeline = asyncio.ensure_future(run_ingestion_pipeline(batches, embed_stage, extract_stage, write_stage, should_stop=is_cancelled))
+      running_job.add_task(pipeline)
+      try:
+        _, is_stopped = await pipeline
+      except asyncio.CancelledError:
+        if not running_job.cancelled:
+          raise
+        logging.info(f'Extraction of {file_name} cancelled while batches were in flight')
+        is_stopped = True
+      finally:
+        job_registry.unregister(uri, userName, database, file_name, running_job)
+      if is_stopped:
+        job_status = "Cancelled"
+        logging.info('Exit from running loop of processing file')
+      node_count = counts['node_count']
+      rel_count = counts['rel_count']
       
-      result = graphDb_data_Access.get_current_status_document_node(file_name)
+      result = await run_io(graphDb_data_Access.get_current_status_document_node, file_name)
       is_cancelled_status = result[0]['is_cancelled']
       if bool(is_cancelled_status) == True:
         logging.info(f'Is_cancelled True at the end extraction')
@@ -422,10 +500,11 @@ async def processing_source(uri, userName, password, database, model, file_name,
       obj_source_node.file_name = file_name.strip() if isinstance(file_name, str) else file_name
       obj_source_node.status = job_status
       obj_source_node.processing_time = processed_time
+      if job_status == "Completed":
+        # Covers the skipped chunks after the last processed one.
+        obj_source_node.processed_chunk = min(select_chunks_with_retry + selected_chunks, total_chunks)
 
-      graphDb_data_Access.update_source_node(obj_source_node)
-      graphDb_data_Access.update_node_relationship_count(file_name)
-      logging.info('Updated the nodeCount and relCount properties in Document node')
+      await run_io(graphDb_data_Access.update_source_node, obj_source_node)
       logging.info(f'file:{file_name} extraction has been completed')
 
 
@@ -435,7 +514,7 @@ async def processing_source(uri, userName, password, database, model, file_name,
         gcs_file_cache = os.environ.get('GCS_FILE_CACHE')
         if gcs_file_cache == 'True':
           folder_name = create_gcs_bucket_folder_name_hashed(uri, file_name)
-          delete_file_from_gcs(BUCKET_UPLOAD,folder_name,file_name)
+          await run_io(delete_file_from_gcs, BUCKET_UPLOAD, folder_name, file_name)
         else:
           delete_uploaded_local_file(merged_file_path, file_name)
       processing_source_func = time.time() - processing_source_start_time
@@ -463,32 +542,33 @@ async def processing_source(uri, userName, password, database, model, file_name,
     logging.error(error_message)
     raise LLMGraphBuilderException(error_message)
 
-async def processing_chunks(chunkId_chunkDoc_list,graph,uri, userName, password, database,file_name,model,allowedNodes,allowedRelationship, chunks_to_combine, node_count, rel_count, additional_instructions=None):
-  #create vector index and update chunk node with embedding
+def embed_chunks(chunkId_chunkDoc_list):
+  start_update_embedding = time.time()
+  chunk_embeddings = get_chunk_embeddings(chunkId_chunkDoc_list)
+  elapsed_update_embedding = time.time() - start_update_embedding
+  logging.info(f'Time taken to create embedding of chunks: {elapsed_update_embedding:.2f} seconds')
+  return chunk_embeddings, {"update_embedding": f'{elapsed_update_embedding:.2f}'}
+
+async def extract_graph_documents(model, chunkId_chunkDoc_list, allowedNodes, allowedRelationship, chunks_to_combine, additional_instructions=None):
+  logging.info("Get graph document list from models")
+  start_entity_extraction = time.time()
+  graph_documents =  await get_graph_from_llm(model, chunkId_chunkDoc_list, allowedNodes, allowedRelationship, chunks_to_combine, additional_instructions)
+  elapsed_entity_extraction = time.time() - start_entity_extraction
+  logging.info(f'Time taken to extract enitities from LLM Graph Builder: {elapsed_entity_extraction:.2f} seconds')
+  return graph_documents, {"entity_extraction": f'{elapsed_entity_extraction:.2f}'}
+
+def processing_chunks(graph_documents, chunkId_chunkDoc_list, graph, uri, userName, password, database, file_name, chunk_embeddings=None):
   latency_processing_chunk = {}
   if graph is not None:
     if graph._driver._closed:
       graph = create_graph_database_connection(uri, userName, password, database)
   else:
     graph = create_graph_database_connection(uri, userName, password, database)
-  
-  start_update_embedding = time.time()
-  create_chunk_embeddings( graph, chunkId_chunkDoc_list, file_name)
-  end_update_embedding = time.time()
-  elapsed_update_embedding = end_update_embedding - start_update_embedding
-  logging.info(f'Time taken to update embedding in chunk node: {elapsed_update_embedding:.2f} seconds')
-  latency_processing_chunk["update_embedding"] = f'{elapsed_update_embedding:.2f}'
-  logging.info("Get graph document list from models")
-  
-  start_entity_extraction = time.time()
-  graph_documents =  await get_graph_from_llm(model, chunkId_chunkDoc_list, allowedNodes, allowedRelationship, chunks_to_combine, additional_instructions)
-  end_entity_extraction = time.time()
-  elapsed_entity_extraction = end_entity_extraction - start_entity_extraction
-  logging.info(f'Time taken to extract enitities from LLM Graph Builder: {elapsed_entity_extraction:.2f} seconds')
-  latency_processing_chunk["entity_extraction"] = f'{elapsed_entity_extraction:.2f}'
+
   cleaned_graph_documents = handle_backticks_nodes_relationship_id_type(graph_documents)
   
   start_save_graphDocuments = time.time()
+  entity_relationships_created = count_new_entity_relationships(graph, file_name, cleaned_graph_documents)
   save_graphDocuments_in_neo4j(graph, cleaned_graph_documents)
   end_save_graphDocuments = time.time()
   elapsed_save_graphDocuments = end_save_graphDocuments - start_save_graphDocuments
@@ -498,38 +578,32 @@ async def processing_chunks(chunkId_chunkDoc_list,graph,uri, userName, password,
   chunks_and_graphDocuments_list = get_chunk_and_graphDocument(cleaned_graph_documents, chunkId_chunkDoc_list)
 
   start_relationship = time.time()
-  merge_relationship_between_chunk_and_entites(graph, chunks_and_graphDocuments_list)
+  count_response = merge_chunk_embeddings_and_entities(graph, file_name, chunk_embeddings or {}, chunks_and_graphDocuments_list, entity_relationships_created)
   end_relationship = time.time()
   elapsed_relationship = end_relationship - start_relationship
-  logging.info(f'Time taken to create relationship between chunk and entities: {elapsed_relationship:.2f} seconds')
+  logging.info(f'Time taken to store chunk embeddings and relationship between chunk and entities: {elapsed_relationship:.2f} seconds')
   latency_processing_chunk["relationship_between_chunk_entity"] = f'{elapsed_relationship:.2f}'
   
-  graphDb_data_Access = graphDBdataAccess(graph)
-  count_response = graphDb_data_Access.update_node_relationship_count(file_name)
-  node_count = count_response[file_name].get('nodeCount',"0")
-  rel_count = count_response[file_name].get('relationshipCount',"0")
+  if not count_response:
+    count_response = graphDBdataAccess(graph).get_node_relationship_count(file_name).get(file_name, {})
+  node_count = count_response.get('nodeCount',"0")
+  rel_count = count_response.get('relationshipCount',"0")
   return node_count,rel_count,latency_processing_chunk
 
-def get_chunkId_chunkDoc_list(graph, file_name, pages, token_chunk_size, chunk_overlap, retry_condition):
-  if not retry_condition:
-    logging.info("Break down file into chunks")
-    bad_chars = ['"', "\n", "'"]
-    for i in range(0,len(pages)):
-      text = pages[i].page_content
-      for j in bad_chars:
-        if j == '\n':
-          text = text.replace(j, ' ')
-        else:
-          text = text.replace(j, '')
-      pages[i]=Document(page_content=str(text), metadata=pages[i].metadata)
-    create_chunks_obj = CreateChunksofDocument(pages, graph)
-    chunks = create_chunks_obj.split_file_into_chunks(token_chunk_size, chunk_overlap)
-    chunkId_chunkDoc_list = create_relation_between_chunks(graph,file_name,chunks)
+async def get_chunkId_chunkDoc_list(graph, file_name, pages, token_chunk_size, chunk_overlap, retry_condition, chunks=None):
+  if reloads_source(retry_condition):
+    if chunks is None:
+      logging.info("Break down file into chunks")
+      chunks = await run_cpu(split_pages_into_chunks, pages, token_chunk_size, chunk_overlap)
+    if retry_condition == UPDATE_CHANGED_CHUNKS:
+      chunkId_chunkDoc_list = await run_io(update_chunks_of_document, graph, file_name, chunks)
+    else:
+      chunkId_chunkDoc_list = await run_io(create_relation_between_chunks, graph, file_name, chunks)
     return len(chunks), chunkId_chunkDoc_list
   
   else:  
     chunkId_chunkDoc_list=[]
-    chunks =  execute_graph_query(graph,QUERY_TO_GET_CHUNKS, params={"filename":file_name})
+    chunks = await run_io(execute_graph_query, graph, QUERY_TO_GET_CHUNKS, params={"filename":file_name})
     
     if chunks[0]['text'] is None or chunks[0]['text']=="" or not chunks :
       raise LLMGraphBuilderException(f"Chunks are not created for {file_name}. Please re-upload file and try again.")    
@@ -540,13 +614,13 @@ def get_chunkId_chunkDoc_list(graph, file_name, pages, token_chunk_size, chunk_o
       
       if retry_condition ==  START_FROM_LAST_PROCESSED_POSITION:
         logging.info(f"Retry : start_from_last_processed_position")
-        starting_chunk = execute_graph_query(graph,QUERY_TO_GET_LAST_PROCESSED_CHUNK_POSITION, params={"filename":file_name})
+        starting_chunk = await run_io(execute_graph_query, graph, QUERY_TO_GET_LAST_PROCESSED_CHUNK_POSITION, params={"filename":file_name})
         
         if starting_chunk and starting_chunk[0]["position"] < len(chunkId_chunkDoc_list):
           return len(chunks), chunkId_chunkDoc_list[starting_chunk[0]["position"] - 1:]
         
         elif starting_chunk and starting_chunk[0]["position"] == len(chunkId_chunkDoc_list):
-          starting_chunk =  execute_graph_query(graph,QUERY_TO_GET_LAST_PROCESSED_CHUNK_WITHOUT_ENTITY, params={"filename":file_name})
+          starting_chunk = await run_io(execute_graph_query, graph, QUERY_TO_GET_LAST_PROCESSED_CHUNK_WITHOUT_ENTITY, params={"filename":file_name})
           return len(chunks), chunkId_chunkDoc_list[starting_chunk[0]["position"] - 1:]
         
         else:
@@ -570,11 +644,8 @@ def get_source_list_from_graph(uri,userName,password,db_name=None):
    sorting the list by the last updated date. 
  """
   logging.info("Get existing files list from graph")
-  graph = Neo4jGraph(url=uri, database=db_name, username=userName, password=password)
+  graph = create_graph_database_connection(uri, userName, password, db_name)
   graph_DB_dataAccess = graphDBdataAccess(graph)
-  if not graph._driver._closed:
-      logging.info(f"closing connection for sources_list api")
-      graph._driver.close()
   return graph_DB_dataAccess.get_source_list()
 
 def update_graph(graph):
@@ -598,51 +669,25 @@ def connection_check_and_get_vector_dimensions(graph,database):
   graph_DB_dataAccess = graphDBdataAccess(graph)
   return graph_DB_dataAccess.connection_check_and_get_vector_dimensions(database)
 
-def merge_chunks_local(file_name, total_chunks, chunk_dir, merged_dir):
-
-  if not os.path.exists(merged_dir):
-      os.mkdir(merged_dir)
-  logging.info(f'Merged File Path: {merged_dir}')
-  merged_file_path = os.path.join(merged_dir, file_name)
-  with open(merged_file_path, "wb") as write_stream:
-      for i in range(1,total_chunks+1):
-          chunk_file_path = os.path.join(chunk_dir, f"{file_name}_part_{i}")
-          logging.info(f'Chunk File Path While Merging Parts:{chunk_file_path}')
-          with open(chunk_file_path, "rb") as chunk_file:
-              shutil.copyfileobj(chunk_file, write_stream)
-          os.unlink(chunk_file_path)  # Delete the individual chunk file after merging
-  logging.info("Chunks merged successfully and return file size")
-  
-  file_size = os.path.getsize(merged_file_path)
-  return file_size
-  
-
-
-def upload_file(graph, model, chunk, chunk_number:int, total_chunks:int, originalname, uri, chunk_dir, merged_dir, project=None):
-  
+def upload_file(graph, model, chunk, chunk_number:int, total_chunks:int, originalname, uri, merged_dir, project=None, chunk_size=None):
+  """
+  Store one part of a chunked upload. Locally each part is written straight to its offset in the
+  merged file, so parts may arrive in any order; the source node is created once every part is in.
+  Returns the file details when the upload is complete, otherwise a progress message.
+  """
   gcs_file_cache = os.environ.get('GCS_FILE_CACHE')
   logging.info(f'gcs file cache: {gcs_file_cache}')
   
+  file_size = None
   if gcs_file_cache == 'True':
     folder_name = create_gcs_bucket_folder_name_hashed(uri,originalname)
     upload_file_to_gcs(chunk, chunk_number, originalname, BUCKET_UPLOAD, folder_name)
+    if int(chunk_number) == int(total_chunks):
+      file_size = merge_file_gcs(BUCKET_UPLOAD, originalname, folder_name, int(total_chunks))
   else:
-    if not os.path.exists(chunk_dir):
-      os.mkdir(chunk_dir)
-    
-    chunk_file_path = os.path.join(chunk_dir, f"{originalname}_part_{chunk_number}")
-    logging.info(f'Chunk File Path: {chunk_file_path}')
-    
-    with open(chunk_file_path, "wb") as chunk_file:
-      chunk_file.write(chunk.file.read())
+    file_size = write_upload_part(merged_dir, originalname, chunk_number, total_chunks, chunk.file.read(), chunk_size)
 
-  if int(chunk_number) == int(total_chunks):
-      # If this is the last chunk, merge all chunks into a single file
-      if gcs_file_cache == 'True':
-        file_size = merge_file_gcs(BUCKET_UPLOAD, originalname, folder_name, int(total_chunks))
-      else:
-        file_size = merge_chunks_local(originalname, int(total_chunks), chunk_dir, merged_dir)
-      
+  if file_size is not None:
       logging.info("File merged successfully")
       file_extension = originalname.split('.')[-1]
       obj_source_node = sourceNode()
@@ -701,13 +746,14 @@ def get_labels_and_relationtypes(uri, userName, password, database):
       triples.add(f"{from_label}-{rel_type}->{to_label}")
   return {"triplets": list(triples)}
 
-def manually_cancelled_job(graph, filenames, source_types, merged_dir, uri):
+def manually_cancelled_job(graph, filenames, source_types, merged_dir, uri, userName=None, database=None):
   
   filename_list= list(map(str.strip, json.loads(filenames)))
   source_types_list= list(map(str.strip, json.loads(source_types)))
   gcs_file_cache = os.environ.get('GCS_FILE_CACHE')
   
   for (file_name,source_type) in zip(filename_list, source_types_list):
+      job_registry.cancel(uri, userName, database, file_name)
       obj_source_node = sourceNode()
       obj_source_node.file_name = file_name.strip() if isinstance(file_name, str) else file_name
       obj_source_node.is_cancelled = True
@@ -715,7 +761,6 @@ def manually_cancelled_job(graph, filenames, source_types, merged_dir, uri):
       obj_source_node.updated_at = datetime.now()
       graphDb_data_Access = graphDBdataAccess(graph)
       graphDb_data_Access.update_source_node(obj_source_node)
-      count_response = graphDb_data_Access.update_node_relationship_count(file_name)
       obj_source_node = None
       merged_file_path = os.path.join(merged_dir, file_name)
       if source_type == 'local file' and gcs_file_cache == 'True':
@@ -756,6 +801,9 @@ def set_status_retry(graph, file_name, retry_condition):
         obj_source_node.relationship_count=0
     logging.info(obj_source_node)
     graphDb_data_Access.update_source_node(obj_source_node)
+    if retry_condition == DELETE_ENTITIES_AND_START_FROM_BEGINNING:
+        # Deletions are not tracked by the incremental counters, so the document is recounted once here.
+        graphDb_data_Access.update_node_relationship_count(file_name)
 
 def failed_file_process(uri,file_name, merged_file_path):
   gcs_file_cache = os.environ.get('GCS_FILE_CACHE')
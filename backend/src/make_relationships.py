@@ -1,7 +1,10 @@
 from langchain_neo4j import Neo4jGraph
 from langchain.docstore.document import Document
 from src.shared.common_fn import load_embedding_model,execute_graph_query
-from src.shared.common_fn import load_embedding_model,execute_graph_query
+from src.graphDB_dataAccess import graphDBdataAccess
+from src.shared.embedding_cache import embed_texts_with_cache
+from src.shared.constants import (QUERY_TO_GET_DOCUMENT_CHUNK_LINKS, QUERY_TO_DELETE_NEXT_CHUNK_LINKS,
+                                  QUERY_TO_DELETE_STALE_FIRST_CHUNK, QUERY_TO_REMOVE_CHUNKS_FROM_DOCUMENT)
 import logging
 from typing import List
 import os
@@ -14,62 +17,201 @@ logging.basicConfig(format='%(asctime)s - %(message)s',level='INFO')
 EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL')
 EMBEDDING_FUNCTION , EMBEDDING_DIMENSION = load_embedding_model(EMBEDDING_MODEL)
 
-def merge_relationship_between_chunk_and_entites(graph: Neo4jGraph, graph_documents_chunk_chunk_Id : list):
-    batch_data = []
-    logging.info("Create HAS_ENTITY relationship between chunks and entities")
-    
+CHUNK_WRITE_TRANSACTION_BYTES = int(os.environ.get('CHUNK_WRITE_TRANSACTION_BYTES', 4 * 1024 * 1024))
+CHUNK_DEDUP_ENABLED = os.environ.get('CHUNK_DEDUP_ENABLED', 'True').lower() in ('true', '1', 'yes')
+CHUNK_DEDUP_LOOKUP_BATCH_SIZE = 1000
+
+# Creates or updates chunks together with PART_OF, FIRST_CHUNK, NEXT_CHUNK,
+# their embedding and HAS_ENTITY relationships. Every key of a row except
+# id is optional so the same query serves chunk creation and batch updates.
+# The Document node counters are incremented by what the query created, so
+# they never need a recount of the whole document on the write path.
+QUERY_TO_WRITE_CHUNK_GRAPH = """
+    UNWIND $rows AS row
+    MATCH (d:Document {fileName: $fileName})
+    MERGE (c:Chunk {id: row.id})
+    FOREACH (_ IN CASE WHEN row.text IS NOT NULL THEN [1] ELSE [] END |
+        SET c.text = row.text, c.position = row.position, c.length = row.length, c.fileName = $fileName,
+            c.content_offset = row.content_offset, c.page_number = row.page_number,
+            c.start_time = row.start_time, c.end_time = row.end_time)
+    FOREACH (_ IN CASE WHEN row.embedding IS NOT NULL THEN [1] ELSE [] END |
+        SET c.embedding = row.embedding)
+    WITH d, row, c, NOT EXISTS { (c)-[:PART_OF]->(d) } AS partOfCreated
+    MERGE (c)-[:PART_OF]->(d)
+    FOREACH (_ IN CASE WHEN row.position = 1 THEN [1] ELSE [] END |
+        MERGE (d)-[:FIRST_CHUNK]->(c))
+    WITH d, row, c, partOfCreated
+    OPTIONAL MATCH (pc:Chunk {id: row.previous_id})
+    WITH d, row, c, pc, partOfCreated,
+         CASE WHEN pc IS NULL THEN false ELSE NOT EXISTS { (pc)-[:NEXT_CHUNK]->(c) } END AS nextChunkCreated
+    FOREACH (_ IN CASE WHEN pc IS NOT NULL THEN [1] ELSE [] END |
+        MERGE (c)<-[:NEXT_CHUNK]-(pc))
+    WITH d, row, c, partOfCreated, nextChunkCreated
+    CALL { WITH d, c, row
+        UNWIND coalesce(row.entities, []) AS entity
+        CALL apoc.merge.node([entity.type], {id: entity.id}) YIELD node AS n
+        WITH d, c, n, NOT EXISTS { (c)-[:HAS_ENTITY]->(n) } AS hasEntityCreated,
+             NOT EXISTS { (d)<-[:PART_OF]-(:Chunk)-[:HAS_ENTITY]->(n) } AS entityLinked
+        MERGE (c)-[:HAS_ENTITY]->(n)
+        RETURN sum(CASE WHEN hasEntityCreated THEN 1 ELSE 0 END) AS hasEntityCreated,
+               collect(CASE WHEN entityLinked THEN elementId(n) END) AS linkedEntities
+    }
+    WITH d,
+         apoc.coll.toSet(collect(CASE WHEN partOfCreated THEN row.id END)) AS linkedChunks,
+         sum(CASE WHEN partOfCreated THEN 1 ELSE 0 END) + sum(CASE WHEN nextChunkCreated THEN 1 ELSE 0 END) + sum(hasEntityCreated) AS chunkRelsCreated,
+         apoc.coll.toSet(apoc.coll.flatten(collect(linkedEntities))) AS linkedEntities
+    SET d.chunkNodeCount = coalesce(d.chunkNodeCount, 0) + size(linkedChunks),
+        d.chunkRelCount = coalesce(d.chunkRelCount, 0) + chunkRelsCreated,
+        d.entityNodeCount = coalesce(d.entityNodeCount, 0) + size(linkedEntities),
+        d.entityEntityRelCount = coalesce(d.entityEntityRelCount, 0) + $entityEntityRelsCreated
+    SET d.nodeCount = d.chunkNodeCount + d.entityNodeCount + coalesce(d.communityNodeCount, 0),
+        d.relationshipCount = d.chunkRelCount + d.entityEntityRelCount + coalesce(d.communityRelCount, 0)
+    RETURN d.chunkNodeCount AS chunkNodeCount, d.chunkRelCount AS chunkRelCount,
+           d.entityNodeCount AS entityNodeCount, d.entityEntityRelCount AS entityEntityRelCount,
+           d.nodeCount AS nodeCount, d.relationshipCount AS relationshipCount
+"""
+
+# Number of the given entity relationships the document already counts: the
+# relationship exists and both of its entities are linked to the document.
+QUERY_TO_COUNT_EXISTING_ENTITY_RELATIONSHIPS = """
+    MATCH (d:Document {fileName: $fileName})
+    UNWIND $relationships AS rel
+    MATCH (s:__Entity__ {id: rel.source})-[r]->(t:__Entity__ {id: rel.target})
+    WHERE type(r) = rel.type
+      AND EXISTS { (d)<-[:PART_OF]-(:Chunk)-[:HAS_ENTITY]->(s) }
+      AND EXISTS { (d)<-[:PART_OF]-(:Chunk)-[:HAS_ENTITY]->(t) }
+    RETURN count(DISTINCT r) AS existing
+"""
+
+# Chunks already extracted for another document: chunk ids are the SHA1 of
+# the text, so a repeated chunk is the same node and only needs the PART_OF
+# and NEXT_CHUNK links of the new document.
+QUERY_TO_GET_ALREADY_PROCESSED_CHUNK_IDS = """
+    UNWIND $ids AS id
+    MATCH (c:Chunk {id: id})
+    WHERE (NOT $requireEmbedding OR c.embedding IS NOT NULL)
+      AND EXISTS { (c)-[:HAS_ENTITY]->() }
+      AND EXISTS { (c)-[:PART_OF]->(other:Document) WHERE other.fileName <> $fileName }
+    RETURN collect(c.id) AS ids
+"""
+
+def estimate_payload_size(value) -> int:
+    """Rough size in bytes of ``value`` once sent as a query parameter."""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(key) + estimate_payload_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (int, float)):
+            return 8 * len(value)
+        return sum(estimate_payload_size(item) for item in value)
+    return 8
+
+def split_rows_by_payload_size(rows: list, max_bytes: int = CHUNK_WRITE_TRANSACTION_BYTES) -> List[list]:
+    """Split ``rows`` into consecutive slices whose estimated payload stays under ``max_bytes``."""
+    slices = []
+    current = []
+    current_size = 0
+    for row in rows:
+        row_size = estimate_payload_size(row)
+        if current and current_size + row_size > max_bytes:
+            slices.append(current)
+            current = []
+            current_size = 0
+        current.append(row)
+        current_size += row_size
+    if current:
+        slices.append(current)
+    return slices
+
+def write_chunk_graph(graph: Neo4jGraph, file_name, rows: list, entity_relationships_created=0) -> dict:
+    """
+    Write chunk rows with QUERY_TO_WRITE_CHUNK_GRAPH, one transaction per
+    CHUNK_WRITE_TRANSACTION_BYTES of payload. Rows must be in chunk order so
+    NEXT_CHUNK can find the previous chunk written by an earlier slice.
+
+    Returns the node and relationship counters of the Document after the write.
+    """
+    slices = split_rows_by_payload_size(rows)
+    counts = {}
+    for rows_slice in slices:
+        result = execute_graph_query(graph, QUERY_TO_WRITE_CHUNK_GRAPH, params={"fileName": file_name, "rows": rows_slice, "entityEntityRelsCreated": entity_relationships_created})
+        entity_relationships_created = 0
+        if result:
+            counts = result[0]
+    logging.info(f"Wrote {len(rows)} chunk rows for {file_name} in {len(slices)} transactions")
+    return counts
+
+def count_new_entity_relationships(graph: Neo4jGraph, file_name, graph_documents) -> int:
+    """
+    Number of distinct relationships in ``graph_documents`` that the document
+    does not count yet. Must run before the relationships and HAS_ENTITY
+    links of ``graph_documents`` are written.
+    """
+    relationships = {
+        (rel.source.id, rel.type.replace(" ", "_").upper(), rel.target.id)
+        for graph_document in graph_documents
+        for rel in graph_document.relationships
+    }
+    if not relationships:
+        return 0
+    result = execute_graph_query(graph, QUERY_TO_COUNT_EXISTING_ENTITY_RELATIONSHIPS, params={
+        "fileName": file_name,
+        "relationships": [{"source": source, "type": rel_type, "target": target} for source, rel_type, target in relationships]
+    })
+    existing = result[0]["existing"] if result else 0
+    return max(len(relationships) - existing, 0)
+
+def merge_chunk_embeddings_and_entities(graph: Neo4jGraph, file_name, chunk_embeddings: dict, graph_documents_chunk_chunk_Id : list, entity_relationships_created=0) -> dict:
+    """
+    Store the embeddings of a batch of chunks and their HAS_ENTITY relationships in one write.
+
+    Returns the node and relationship counters of the Document, or an empty dict when there was nothing to write.
+    """
+    logging.info("Update chunk embeddings and create HAS_ENTITY relationship between chunks and entities")
+    rows = {}
+    for chunk_id, embedding in chunk_embeddings.items():
+        rows.setdefault(chunk_id, {"id": chunk_id})["embedding"] = embedding
     for graph_doc_chunk_id in graph_documents_chunk_chunk_Id:
-        for node in graph_doc_chunk_id['graph_doc'].nodes:
-            query_data={
-                'chunk_id': graph_doc_chunk_id['chunk_id'],
-                'node_type': node.type,
-                'node_id': node.id
-            }
-            batch_data.append(query_data)
-          
-    if batch_data:
-        unwind_query = """
-                    UNWIND $batch_data AS data
-                    MATCH (c:Chunk {id: data.chunk_id})
-                    CALL apoc.merge.node([data.node_type], {id: data.node_id}) YIELD node AS n
-                    MERGE (c)-[:HAS_ENTITY]->(n)
-                """
-        execute_graph_query(graph,unwind_query, params={"batch_data": batch_data})
-        execute_graph_query(graph,unwind_query, params={"batch_data": batch_data})
+        row = rows.setdefault(graph_doc_chunk_id['chunk_id'], {"id": graph_doc_chunk_id['chunk_id']})
+        row.setdefault("entities", []).extend(
+            {"type": node.type, "id": node.id} for node in graph_doc_chunk_id['graph_doc'].nodes
+        )
+    if not rows:
+        return {}
+    return write_chunk_graph(graph, file_name, list(rows.values()), entity_relationships_created)
 
-    
-def create_chunk_embeddings(graph, chunkId_chunkDoc_list, file_name):
+def get_already_processed_chunk_ids(graph: Neo4jGraph, file_name, chunk_ids: list) -> set:
+    """Ids of the chunks that other documents already embedded and extracted entities from."""
+    if not CHUNK_DEDUP_ENABLED or not chunk_ids:
+        return set()
+    is_embedding = (os.getenv('IS_EMBEDDING') or '').upper() == "TRUE"
+    processed_ids = set()
+    for i in range(0, len(chunk_ids), CHUNK_DEDUP_LOOKUP_BATCH_SIZE):
+        result = execute_graph_query(graph, QUERY_TO_GET_ALREADY_PROCESSED_CHUNK_IDS, params={
+            "ids": chunk_ids[i:i + CHUNK_DEDUP_LOOKUP_BATCH_SIZE], "fileName": file_name, "requireEmbedding": is_embedding})
+        if result:
+            processed_ids.update(result[0]['ids'])
+    return processed_ids
+
+def get_chunk_embeddings(chunkId_chunkDoc_list) -> dict:
+    """Return chunk id -> embedding for the chunks, or an empty dict when IS_EMBEDDING is off."""
     isEmbedding = os.getenv('IS_EMBEDDING')
     
     embeddings, dimension = EMBEDDING_FUNCTION , EMBEDDING_DIMENSION
     logging.info(f'embedding model:{embeddings} and dimesion:{dimension}')
-    data_for_query = []
-    logging.info(f"update embedding and vector index for chunks")
-    for row in chunkId_chunkDoc_list:
-        if isEmbedding.upper() == "TRUE":
-            embeddings_arr = embeddings.embed_query(row['chunk_doc'].page_content)
-                                    
-            data_for_query.append({
-                "chunkId": row['chunk_id'],
-                "embeddings": embeddings_arr
-            })
-    
-    query_to_create_embedding = """
-        UNWIND $data AS row
-        MATCH (d:Document {fileName: $fileName})
-        MERGE (c:Chunk {id: row.chunkId})
-        SET c.embedding = row.embeddings
-        MERGE (c)-[:PART_OF]->(d)
-    """       
-    execute_graph_query(graph,query_to_create_embedding, params={"fileName":file_name, "data":data_for_query})
-    execute_graph_query(graph,query_to_create_embedding, params={"fileName":file_name, "data":data_for_query})
+    if not isEmbedding or isEmbedding.upper() != "TRUE":
+        return {}
+    texts = [row['chunk_doc'].page_content for row in chunkId_chunkDoc_list]
+    chunk_ids = [row['chunk_id'] for row in chunkId_chunkDoc_list]
+    embeddings_list = embed_texts_with_cache(embeddings, texts, dimension, EMBEDDING_MODEL, hashes=chunk_ids)
+    return dict(zip(chunk_ids, embeddings_list))
     
 def create_relation_between_chunks(graph, file_name, chunks: List[Document])->list:
-    logging.info("creating FIRST_CHUNK and NEXT_CHUNK relationships between chunks")
+    logging.info("creating chunks with FIRST_CHUNK and NEXT_CHUNK relationships between chunks")
     current_chunk_id = ""
     lst_chunks_including_hash = []
     batch_data = []
-    relationships = []
     offset=0
     for i, chunk in enumerate(chunks):
         page_content_sha1 = hashlib.sha1(chunk.page_content.encode())
@@ -78,21 +220,12 @@ def create_relation_between_chunks(graph, file_name, chunks: List[Document])->li
         position = i + 1 
         if i>0:
             offset += len(chunks[i-1].page_content)
-        if i == 0:
-            firstChunk = True
-        else:
-            firstChunk = False  
-        metadata = {"position": position,"length": len(chunk.page_content), "content_offset":offset}
-        chunk_document = Document(
-            page_content=chunk.page_content, metadata=metadata
-        )
         
         chunk_data = {
             "id": current_chunk_id,
-            "pg_content": chunk_document.page_content,
+            "text": chunk.page_content,
             "position": position,
-            "length": chunk_document.metadata["length"],
-            "f_name": file_name,
+            "length": len(chunk.page_content),
             "previous_id" : previous_chunk_id,
             "content_offset" : offset
         }
@@ -107,54 +240,50 @@ def create_relation_between_chunks(graph, file_name, chunks: List[Document])->li
         batch_data.append(chunk_data)
         
         lst_chunks_including_hash.append({'chunk_id': current_chunk_id, 'chunk_doc': chunk})
-        
-        # create relationships between chunks
-        if firstChunk:
-            relationships.append({"type": "FIRST_CHUNK", "chunk_id": current_chunk_id})
-        else:
-            relationships.append({
-                "type": "NEXT_CHUNK",
-                "previous_chunk_id": previous_chunk_id,  # ID of previous chunk
-                "current_chunk_id": current_chunk_id
-            })
           
-    query_to_create_chunk_and_PART_OF_relation = """
-        UNWIND $batch_data AS data
-        MERGE (c:Chunk {id: data.id})
-        SET c.text = data.pg_content, c.position = data.position, c.length = data.length, c.fileName=data.f_name, c.content_offset=data.content_offset
-        WITH data, c
-        SET c.page_number = CASE WHEN data.page_number IS NOT NULL THEN data.page_number END,
-            c.start_time = CASE WHEN data.start_time IS NOT NULL THEN data.start_time END,
-            c.end_time = CASE WHEN data.end_time IS NOT NULL THEN data.end_time END
-        WITH data, c
-        MATCH (d:Document {fileName: data.f_name})
-        MERGE (c)-[:PART_OF]->(d)
-    """
-    execute_graph_query(graph,query_to_create_chunk_and_PART_OF_relation, params={"batch_data": batch_data})
-    execute_graph_query(graph,query_to_create_chunk_and_PART_OF_relation, params={"batch_data": batch_data})
-    
-    query_to_create_FIRST_relation = """ 
-        UNWIND $relationships AS relationship
-        MATCH (d:Document {fileName: $f_name})
-        MATCH (c:Chunk {id: relationship.chunk_id})
-        FOREACH(r IN CASE WHEN relationship.type = 'FIRST_CHUNK' THEN [1] ELSE [] END |
-                MERGE (d)-[:FIRST_CHUNK]->(c))
-        """
-    execute_graph_query(graph,query_to_create_FIRST_relation, params={"f_name": file_name, "relationships": relationships})
-    execute_graph_query(graph,query_to_create_FIRST_relation, params={"f_name": file_name, "relationships": relationships})
-    
-    query_to_create_NEXT_CHUNK_relation = """ 
-        UNWIND $relationships AS relationship
-        MATCH (c:Chunk {id: relationship.current_chunk_id})
-        WITH c, relationship
-        MATCH (pc:Chunk {id: relationship.previous_chunk_id})
-        FOREACH(r IN CASE WHEN relationship.type = 'NEXT_CHUNK' THEN [1] ELSE [] END |
-                MERGE (c)<-[:NEXT_CHUNK]-(pc))
-        """  
-    execute_graph_query(graph,query_to_create_NEXT_CHUNK_relation, params={"relationships": relationships})
+    write_chunk_graph(graph, file_name, batch_data)
     return lst_chunks_including_hash
 
 
+def update_chunks_of_document(graph, file_name, chunks: List[Document]) -> list:
+    """
+    Bring the chunks of an already processed document in line with ``chunks``,
+    the chunks of its new version. Chunk ids are content hashes, so unchanged
+    chunks keep their embedding and entities. A chunk only counts as unchanged
+    when it has both, so one left half-processed by an interrupted run is
+    processed again. Removed chunks are detached, and deleted with their
+    orphaned entities when no other document uses them; only NEXT_CHUNK and
+    FIRST_CHUNK links that changed are replaced.
+
+    Returns the chunk id / chunk document list of the chunks that still need
+    embedding and entity extraction.
+    """
+    new_ids = [hashlib.sha1(chunk.page_content.encode()).hexdigest() for chunk in chunks]
+    is_embedding = (os.getenv('IS_EMBEDDING') or '').upper() == "TRUE"
+    existing = execute_graph_query(graph, QUERY_TO_GET_DOCUMENT_CHUNK_LINKS, params={"filename": file_name, "requireEmbedding": is_embedding})
+    existing_ids = {row['id'] for row in existing}
+    processed_ids = {row['id'] for row in existing if row['processed']}
+    new_links = set(zip(new_ids, new_ids[1:]))
+    stale_links = [
+        {"source": row['id'], "target": next_id}
+        for row in existing for next_id in row['next_ids']
+        if (row['id'], next_id) not in new_links
+    ]
+    removed_ids = list(existing_ids.difference(new_ids))
+    logging.info(f"Updating {file_name}: {len(processed_ids & set(new_ids))} unchanged chunks, {len(set(new_ids) - existing_ids)} new, {len(removed_ids)} removed, {len(stale_links)} stale NEXT_CHUNK links")
+    if stale_links:
+        execute_graph_query(graph, QUERY_TO_DELETE_NEXT_CHUNK_LINKS, params={"links": stale_links})
+    if new_ids:
+        execute_graph_query(graph, QUERY_TO_DELETE_STALE_FIRST_CHUNK, params={"filename": file_name, "first_chunk_id": new_ids[0]})
+    if removed_ids:
+        execute_graph_query(graph, QUERY_TO_REMOVE_CHUNKS_FROM_DOCUMENT, params={"filename": file_name, "ids": removed_ids})
+        # Deletions are not tracked by the incremental counters, so the document is recounted once here.
+        graphDBdataAccess(graph).update_node_relationship_count(file_name)
+    # Rewriting every row refreshes positions and offsets; the MERGEs only create the links that are missing.
+    chunkId_chunkDoc_list = create_relation_between_chunks(graph, file_name, chunks)
+    return [chunk for chunk in chunkId_chunkDoc_list if chunk['chunk_id'] not in processed_ids]
+
+
 def create_chunk_vector_index(graph):
     start_time = time.time()
     try:
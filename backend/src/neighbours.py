@@ -38,13 +38,9 @@ RETURN
 
 
 def get_neighbour_nodes(uri, username, password, database, element_id, query=NEIGHBOURS_FROM_ELEMENT_ID_QUERY):
-    driver = None
-
     try:
         logging.info(f"Querying neighbours for element_id: {element_id}")
         driver = get_graphDB_driver(uri, username, password, database)
-        driver.verify_connectivity()
-        logging.info("Database connectivity verified.")
 
         records, summary, keys = driver.execute_query(query,element_id=element_id)
         nodes = records[0].get("nodes", [])
@@ -57,8 +53,3 @@ def get_neighbour_nodes(uri, username, password, database, element_id, query=NEI
     except Exception as e:
         logging.error(f"Error retrieving neighbours for element_id: {element_id}: {e}")
         return {"nodes": [], "relationships": []}
-    
-    finally:
-        if driver is not None:
-            driver.close()
-            logging.info("Database driver closed.")
\ No newline at end of file
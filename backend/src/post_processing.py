@@ -5,6 +5,7 @@ from langchain_neo4j import Neo4jGraph
 import os
 from src.graph_query import get_graphDB_driver
 from src.shared.common_fn import load_embedding_model,execute_graph_query
+from src.shared.embedding_cache import embed_texts_with_cache
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from src.shared.constants import GRAPH_CLEANUP_PROMPT
@@ -160,12 +161,6 @@ def create_vector_fulltext_indexes(uri, username, password, database):
     except Exception as e:
         logging.error(f"Failed to create vector index for '{CHUNK_VECTOR_INDEX_NAME}': {e}")
 
-    try:
-        driver.close()
-        logging.info("Driver closed successfully.")
-    except Exception as e:
-        logging.error(f"Error closing the driver: {e}")
-
     logging.info("Full-text and vector index creation process completed.")
 
 
@@ -187,8 +182,9 @@ def update_embeddings(rows, graph):
     embedding_model = os.getenv('EMBEDDING_MODEL')
     embeddings, dimension = load_embedding_model(embedding_model)
     logging.info(f"update embedding for entities")
-    for row in rows:
-        row['embedding'] = embeddings.embed_query(row['text'])                        
+    vectors = embed_texts_with_cache(embeddings, [row['text'] for row in rows], dimension, embedding_model)
+    for row, vector in zip(rows, vectors):
+        row['embedding'] = vector
     query = """
       UNWIND $rows AS row
       MATCH (e) WHERE elementId(e) = row.elementId
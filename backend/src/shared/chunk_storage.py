@@ -0,0 +1,119 @@
+import logging
+import os
+import shutil
+from abc import ABC, abstractmethod
+from typing import BinaryIO, List
+
+from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
+
+# Largest number of source objects a single GCS compose request accepts.
+MAX_COMPOSE_SOURCES = 32
+
+
+class ChunkStorage(ABC):
+    """
+    Object store holding the parts of a chunked upload. Implementations stream
+    data in and out and join parts on the storage side, so no method holds
+    the content of an object in memory.
+    """
+
+    max_compose_sources = MAX_COMPOSE_SOURCES
+
+    @abstractmethod
+    def write(self, name: str, stream: BinaryIO):
+        pass
+
+    @abstractmethod
+    def open_read(self, name: str) -> BinaryIO:
+        pass
+
+    @abstractmethod
+    def compose(self, sources: List[str], destination: str):
+        """Write the concatenation of ``sources`` to ``destination``."""
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        pass
+
+    @abstractmethod
+    def size(self, name: str) -> int:
+        pass
+
+    @abstractmethod
+    def delete(self, name: str):
+        pass
+
+
+class LocalChunkStorage(ChunkStorage):
+    """Filesystem stand-in for an object store, with object names as paths under ``root``."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def write(self, name, stream):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(stream, target)
+
+    def open_read(self, name):
+        return open(self._path(name), "rb")
+
+    def compose(self, sources, destination):
+        if len(sources) > self.max_compose_sources:
+            raise LLMGraphBuilderException(f"Cannot compose more than {self.max_compose_sources} objects at once")
+        path = self._path(destination)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".composing"
+        with open(temp_path, "wb") as target:
+            for source in sources:
+                with self.open_read(source) as stream:
+                    shutil.copyfileobj(stream, target)
+        os.replace(temp_path, path)
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def size(self, name):
+        return os.path.getsize(self._path(name))
+
+    def delete(self, name):
+        if self.exists(name):
+            os.unlink(self._path(name))
+
+
+def compose_parts(storage: ChunkStorage, part_names: List[str], destination: str) -> int:
+    """
+    Join ``part_names`` into ``destination`` on the storage side and delete the
+    parts. More parts than one compose request accepts are joined in groups
+    into intermediate objects, level by level, until one request is enough.
+    Returns the size of ``destination``.
+    """
+    missing = [name for name in part_names if not storage.exists(name)]
+    if missing:
+        raise LLMGraphBuilderException(f"{len(missing)} of {len(part_names)} chunks of {destination} were not uploaded. Please upload the file again.")
+    step = storage.max_compose_sources
+    names = list(part_names)
+    intermediates = []
+    level = 0
+    while len(names) > step:
+        grouped = []
+        for index in range(0, len(names), step):
+            group = names[index:index + step]
+            if len(group) == 1:
+                grouped.append(group[0])
+                continue
+            intermediate = f"{destination}.compose_{level}_{index // step}"
+            storage.compose(group, intermediate)
+            intermediates.append(intermediate)
+            grouped.append(intermediate)
+        names = grouped
+        level += 1
+    storage.compose(names, destination)
+    logging.info(f"Composed {len(part_names)} chunks into {destination} in {level + 1} steps")
+    for name in list(part_names) + intermediates:
+        storage.delete(name)
+    return storage.size(destination)
@@ -0,0 +1,208 @@
+import fcntl
+import json
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+
+from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
+
+# Suffixes of the file being assembled and of its received-parts state, both
+# kept next to the final file in the merged files directory.
+PARTIAL_SUFFIX = ".partial"
+STATE_SUFFIX = ".parts"
+PENDING_LAST_PART_SUFFIX = ".lastpart"
+
+
+@contextmanager
+def _locked_state_file(state_path, create=True):
+    """
+    Open the state file of an upload and hold an exclusive flock on it, so
+    parts of one file are written one at a time across threads and server
+    processes. Held only while the state is read and updated, not while part
+    data is written. Yields the file descriptor, or None when ``create`` is false
+    and there is no upload in progress.
+    """
+    while True:
+        try:
+            fd = os.open(state_path, os.O_RDWR | (os.O_CREAT if create else 0), 0o644)
+        except FileNotFoundError:
+            yield None
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # The upload that held the lock may have completed and removed the file.
+            if os.fstat(fd).st_ino == os.stat(state_path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def _new_state(total_parts):
+    return {"upload_id": uuid.uuid4().hex, "total_parts": total_parts, "part_size": None, "file_size": None, "received": bytearray((total_parts + 7) // 8)}
+
+
+def _load_state(state_fd, total_parts):
+    size = os.fstat(state_fd).st_size
+    try:
+        stored = json.loads(os.pread(state_fd, size, 0)) if size else None
+    except ValueError:
+        return None
+    if not stored or stored.get("total_parts") != total_parts:
+        return None
+    stored["received"] = bytearray.fromhex(stored["received"])
+    return stored
+
+
+def _save_state(state_fd, state):
+    data = json.dumps({**state, "received": state["received"].hex()}).encode()
+    # A torn write is read back as an unknown state, which restarts the upload.
+    os.ftruncate(state_fd, 0)
+    _pwrite_all(state_fd, data, 0)
+
+
+def _is_received(state, part_number) -> bool:
+    index = part_number - 1
+    return bool(state["received"][index // 8] & (1 << (index % 8)))
+
+
+def _mark_received(state, part_number):
+    index = part_number - 1
+    state["received"][index // 8] |= 1 << (index % 8)
+
+
+def _missing_parts(state) -> List[int]:
+    return [part for part in range(1, state["total_parts"] + 1) if not _is_received(state, part)]
+
+
+def _preallocate(fd, size):
+    """Reserve ``size`` bytes up front so parallel parts do not fragment the file."""
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except OSError as e:
+        # Some filesystems do not support it; pwrite grows the file anyway.
+        logging.debug(f"posix_fallocate is not available: {e}")
+
+
+def _pwrite_all(fd, data, offset):
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def write_upload_part(merged_dir, file_name, part_number, total_parts, data: bytes, part_size: Optional[int] = None) -> Optional[int]:
+    """
+    Write part ``part_number`` of ``total_parts`` of ``file_name`` straight to
+    its offset in the merged file and return the file size once every part
+    has been received, or None while parts are missing.
+
+    Parts may arrive in any order, in parallel, and again after a disconnect.
+    Every part but the last has ``part_size`` bytes; when the client does not
+    send it, it is taken from the first part that is not the last one. A
+    last part received before that is kept aside until its offset is known.
+    """
+    part_number, total_parts = int(part_number), int(total_parts)
+    if total_parts < 1 or not 1 <= part_number <= total_parts:
+        raise LLMGraphBuilderException(f"Invalid chunk {part_number}/{total_parts} for file {file_name}")
+    os.makedirs(merged_dir, exist_ok=True)
+    target_path = os.path.join(merged_dir, file_name)
+    partial_path = target_path + PARTIAL_SUFFIX
+    state_path = partial_path + STATE_SUFFIX
+    pending_path = partial_path + PENDING_LAST_PART_SUFFIX
+    is_last = part_number == total_parts
+
+    while True:
+        with _locked_state_file(state_path) as state_fd:
+            state = _load_state(state_fd, total_parts)
+            reset = state is None or not os.path.exists(partial_path)
+            if reset:
+                # A new upload, or one with a different number of parts, starts over.
+                state = _new_state(total_parts)
+                if os.path.exists(pending_path):
+                    os.unlink(pending_path)
+            if part_size:
+                part_size = int(part_size)
+            elif state["part_size"]:
+                part_size = state["part_size"]
+            elif not is_last:
+                part_size = len(data)
+            if not is_last and part_size and len(data) != part_size:
+                raise LLMGraphBuilderException(f"Chunk {part_number}/{total_parts} of {file_name} has {len(data)} bytes, expected {part_size}")
+            new_part_size = part_size and not state["part_size"]
+            state["part_size"] = part_size or None
+
+            fd = os.open(partial_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if reset:
+                    # Emptied in place rather than unlinked, so the file is never swapped under an open descriptor.
+                    os.ftruncate(fd, 0)
+                if new_part_size:
+                    _preallocate(fd, part_size * (total_parts - 1))
+                    if os.path.exists(pending_path):
+                        with open(pending_path, "rb") as pending_file:
+                            pending = pending_file.read()
+                        _pwrite_all(fd, pending, part_size * (total_parts - 1))
+                        state["file_size"] = part_size * (total_parts - 1) + len(pending)
+                        os.unlink(pending_path)
+                if is_last and not part_size and total_parts > 1:
+                    with open(pending_path, "wb") as pending_file:
+                        pending_file.write(data)
+                    offset = None
+                else:
+                    offset = (part_number - 1) * (part_size or 0)
+                _save_state(state_fd, state)
+            except BaseException:
+                os.close(fd)
+                raise
+            upload_id = state.get("upload_id")
+
+        try:
+            # The data is written without the lock, so parts of one file are written in parallel.
+            if offset is not None:
+                _pwrite_all(fd, data, offset)
+            with _locked_state_file(state_path) as state_fd:
+                state = _load_state(state_fd, total_parts)
+                if state is None or state.get("upload_id") != upload_id or not os.path.exists(partial_path):
+                    # The upload restarted while the part was written; write it again into the new one.
+                    continue
+                if is_last and offset is not None:
+                    state["file_size"] = offset + len(data)
+                _mark_received(state, part_number)
+                missing = _missing_parts(state)
+                if missing or state["file_size"] is None:
+                    _save_state(state_fd, state)
+                    return None
+                # A part rewritten on resume may have left the preallocated tail beyond the real size.
+                os.ftruncate(fd, state["file_size"])
+                # Still under the lock: parts waiting for it see the state file gone and start a new upload.
+                os.replace(partial_path, target_path)
+                os.unlink(state_path)
+        finally:
+            os.close(fd)
+        break
+    logging.info(f"All {total_parts} chunks of {file_name} received, file size {state['file_size']}")
+    return state["file_size"]
+
+
+def get_missing_upload_parts(merged_dir, file_name, total_parts) -> List[int]:
+    """Part numbers not received yet, so an interrupted upload resumes with only those."""
+    total_parts = int(total_parts)
+    state_path = os.path.join(merged_dir, file_name) + PARTIAL_SUFFIX + STATE_SUFFIX
+    with _locked_state_file(state_path, create=False) as state_fd:
+        state = _load_state(state_fd, total_parts) if state_fd is not None else None
+    if state is None:
+        return list(range(1, total_parts + 1))
+    return _missing_parts(state)
@@ -15,6 +15,7 @@ from pathlib import Path
 from urllib.parse import urlparse
 import boto3
 from langchain_community.embeddings import BedrockEmbeddings
+from src.shared.neo4j_pool import Neo4jConnectionPool, connection_key
 
 def check_url_source(source_type, yt_url:str=None, wiki_query:str=None):
     language=''
@@ -60,13 +61,16 @@ def get_chunk_and_graphDocument(graph_document_list, chunkId_chunkDoc_list):
                   
   return lst_chunk_chunkId_document  
                  
+graph_connection_pool = Neo4jConnectionPool("Neo4jGraph", get_driver=lambda graph: graph._driver)
+
 def create_graph_database_connection(uri, userName, password, database):
-  enable_user_agent = os.environ.get("ENABLE_USER_AGENT", "False").lower() in ("true", "1", "yes")
-  if enable_user_agent:
-    graph = Neo4jGraph(url=uri, database=database, username=userName, password=password, refresh_schema=False, sanitize=True,driver_config={'user_agent':os.environ.get('NEO4J_USER_AGENT')})  
-  else:
-    graph = Neo4jGraph(url=uri, database=database, username=userName, password=password, refresh_schema=False, sanitize=True)    
-  return graph
+  """Return a Neo4jGraph shared by every caller using the same credentials."""
+  def connect():
+    enable_user_agent = os.environ.get("ENABLE_USER_AGENT", "False").lower() in ("true", "1", "yes")
+    if enable_user_agent:
+      return Neo4jGraph(url=uri, database=database, username=userName, password=password, refresh_schema=False, sanitize=True,driver_config={'user_agent':os.environ.get('NEO4J_USER_AGENT')})  
+    return Neo4jGraph(url=uri, database=database, username=userName, password=password, refresh_schema=False, sanitize=True)    
+  return graph_connection_pool.get(connection_key(uri, userName, password, database), connect)
 
 
 def load_embedding_model(embedding_model_name: str):
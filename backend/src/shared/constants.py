@@ -5,6 +5,8 @@ BUCKET_UPLOAD = 'llm-graph-builder-upload'
 BUCKET_FAILED_FILE = 'llm-graph-builder-failed'
 PROJECT_ID = 'llm-experiments-387609' 
 GRAPH_CHUNK_LIMIT = 50 
+# Document nodes written per UNWIND query when a bucket is scanned.
+SOURCE_NODE_BATCH_SIZE = 2000
 
 
 #query 
@@ -860,6 +862,47 @@ QUERY_TO_GET_NODES_AND_RELATIONS_OF_A_DOCUMENT = """
 START_FROM_BEGINNING  = "start_from_beginning"     
 DELETE_ENTITIES_AND_START_FROM_BEGINNING = "delete_entities_and_start_from_beginning"
 START_FROM_LAST_PROCESSED_POSITION = "start_from_last_processed_position"                                                    
+UPDATE_CHANGED_CHUNKS = "update_changed_chunks"
+
+# Chunks of a document with the NEXT_CHUNK links between them, read before
+# an incremental update diffs them against the chunks of the new version.
+QUERY_TO_GET_DOCUMENT_CHUNK_LINKS = """
+            MATCH (d:Document {fileName: $filename})<-[:PART_OF]-(c:Chunk)
+            OPTIONAL MATCH (c)-[:NEXT_CHUNK]->(n:Chunk)-[:PART_OF]->(d)
+            RETURN c.id AS id, collect(n.id) AS next_ids,
+                   (NOT $requireEmbedding OR c.embedding IS NOT NULL) AND EXISTS { (c)-[:HAS_ENTITY]->() } AS processed
+            """
+
+QUERY_TO_DELETE_NEXT_CHUNK_LINKS = """
+            UNWIND $links AS link
+            MATCH (:Chunk {id: link.source})-[r:NEXT_CHUNK]->(:Chunk {id: link.target})
+            DELETE r
+            """
+
+QUERY_TO_DELETE_STALE_FIRST_CHUNK = """
+            MATCH (d:Document {fileName: $filename})-[r:FIRST_CHUNK]->(c:Chunk)
+            WHERE c.id <> $first_chunk_id
+            DELETE r
+            """
+
+# Detaches removed chunks from the document. Chunks no other document uses
+# are deleted, then the entities no remaining chunk refers to.
+QUERY_TO_REMOVE_CHUNKS_FROM_DOCUMENT = """
+            MATCH (d:Document {fileName: $filename})
+            UNWIND $ids AS id
+            MATCH (c:Chunk {id: id})-[p:PART_OF]->(d)
+            DELETE p
+            WITH c
+            WHERE NOT EXISTS { (c)-[:PART_OF]->(:Document) }
+            OPTIONAL MATCH (c)-[:HAS_ENTITY]->(e)
+            WITH c, collect(e) AS entities
+            DETACH DELETE c
+            WITH entities
+            UNWIND entities AS e
+            WITH DISTINCT e
+            WHERE NOT EXISTS { (:Chunk)-[:HAS_ENTITY]->(e) }
+            DETACH DELETE e
+            """
 
 GRAPH_CLEANUP_PROMPT = """
 You are tasked with organizing a list of types into semantic categories based on their meanings, including synonyms or morphological similarities. The input will include two separate lists: one for **Node Labels** and one for **Relationship Types**. Follow these rules strictly:
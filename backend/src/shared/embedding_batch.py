@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+# Largest batch each provider accepts in a single embed_documents call.
+EMBEDDING_BATCH_SIZES = {
+    "openai": 256,
+    "vertexai": 100,
+    "titan": 32,
+}
+DEFAULT_EMBEDDING_BATCH_SIZE = 64
+
+# Number of batches sent to a provider at the same time. The local
+# HuggingFace model already uses every core for a single forward pass.
+EMBEDDING_BATCH_CONCURRENCY = {
+    "openai": 4,
+    "vertexai": 4,
+    "titan": 4,
+}
+DEFAULT_EMBEDDING_BATCH_CONCURRENCY = 1
+
+EMBEDDING_MAX_RETRIES = 5
+EMBEDDING_RETRY_DELAY = 1
+
+# A throttled batch is retried whole after a backoff; splitting it would only send more requests.
+RATE_LIMIT_ERROR_PATTERNS = (
+    "rate limit", "ratelimit", "429", "too many requests", "throttl", "quota", "resource exhausted",
+)
+# A batch rejected for its size is split in half.
+SIZE_ERROR_PATTERNS = (
+    "too many inputs", "too many tokens", "too large", "maximum context", "max_tokens",
+    "batch size", "payload", "request entity", "413",
+)
+
+
+def _provider_setting(env_key, defaults, default, embedding_model_name):
+    value = os.environ.get(env_key)
+    if value:
+        try:
+            parsed = int(value)
+            if parsed > 0:
+                return parsed
+        except (TypeError, ValueError):
+            pass
+        logging.warning("%s value %r is invalid. Using provider default.", env_key, value)
+    return defaults.get((embedding_model_name or "").lower(), default)
+
+
+def get_embedding_batch_size(embedding_model_name=None):
+    """Return the batch size for ``embedding_model_name``, honouring EMBEDDING_BATCH_SIZE."""
+    return _provider_setting("EMBEDDING_BATCH_SIZE", EMBEDDING_BATCH_SIZES, DEFAULT_EMBEDDING_BATCH_SIZE, embedding_model_name)
+
+
+def get_embedding_batch_concurrency(embedding_model_name=None):
+    """Return how many batches run at once, honouring EMBEDDING_BATCH_CONCURRENCY."""
+    return _provider_setting("EMBEDDING_BATCH_CONCURRENCY", EMBEDDING_BATCH_CONCURRENCY, DEFAULT_EMBEDDING_BATCH_CONCURRENCY, embedding_model_name)
+
+
+def _error_matches(error: Exception, patterns) -> bool:
+    message = f"{type(error).__name__} {error}".lower()
+    return any(pattern in message for pattern in patterns)
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    return _error_matches(error, RATE_LIMIT_ERROR_PATTERNS)
+
+
+def _is_size_error(error: Exception) -> bool:
+    return _error_matches(error, SIZE_ERROR_PATTERNS)
+
+
+def _retry_delay(error, attempt, batch_size):
+    """Backoff before retrying a throttled batch, or None once the retries are exhausted."""
+    if attempt >= EMBEDDING_MAX_RETRIES:
+        return None
+    delay = EMBEDDING_RETRY_DELAY * (2 ** attempt)
+    logging.info(f"Embedding batch of {batch_size} rate limited ({error}). Retrying {attempt + 1}/{EMBEDDING_MAX_RETRIES} in {delay} seconds...")
+    return delay
+
+
+def _batches(texts, batch_size):
+    return [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+
+def _embed_batch(embeddings, texts: List[str], attempt=0) -> List[List[float]]:
+    try:
+        return embeddings.embed_documents(texts)
+    except Exception as e:
+        if _is_rate_limit_error(e):
+            delay = _retry_delay(e, attempt, len(texts))
+            if delay is None:
+                raise
+            time.sleep(delay)
+            return _embed_batch(embeddings, texts, attempt + 1)
+        if not _is_size_error(e) or len(texts) <= 1:
+            raise
+        middle = len(texts) // 2
+        logging.info(f"Embedding batch of {len(texts)} rejected ({e}). Splitting into two batches.")
+        return _embed_batch(embeddings, texts[:middle]) + _embed_batch(embeddings, texts[middle:])
+
+
+async def _aembed_batch(embeddings, texts: List[str], attempt=0) -> List[List[float]]:
+    try:
+        return await embeddings.aembed_documents(texts)
+    except Exception as e:
+        if _is_rate_limit_error(e):
+            delay = _retry_delay(e, attempt, len(texts))
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            return await _aembed_batch(embeddings, texts, attempt + 1)
+        if not _is_size_error(e) or len(texts) <= 1:
+            raise
+        middle = len(texts) // 2
+        logging.info(f"Embedding batch of {len(texts)} rejected ({e}). Splitting into two batches.")
+        first, second = await asyncio.gather(
+            _aembed_batch(embeddings, texts[:middle]),
+            _aembed_batch(embeddings, texts[middle:]),
+        )
+        return first + second
+
+
+def embed_texts(embeddings, texts: List[str], embedding_model_name=None) -> List[List[float]]:
+    """
+    Embed ``texts`` with ``embed_documents`` in provider sized batches.
+
+    Several batches are sent concurrently. A batch rejected for its size is
+    split in half; a rate limited batch is retried whole with exponential
+    backoff.
+
+    Args:
+        embeddings: A langchain Embeddings instance.
+        texts: Texts to embed.
+        embedding_model_name: Value of EMBEDDING_MODEL, used to pick batch size and concurrency.
+    Returns:
+        One embedding per input text, in input order.
+    """
+    if not texts:
+        return []
+    batches = _batches(list(texts), get_embedding_batch_size(embedding_model_name))
+    concurrency = min(get_embedding_batch_concurrency(embedding_model_name), len(batches))
+    logging.info(f"Embedding {len(texts)} texts in {len(batches)} batches with concurrency {concurrency}")
+    if concurrency <= 1:
+        results = [_embed_batch(embeddings, batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda batch: _embed_batch(embeddings, batch), batches))
+    return [vector for batch_result in results for vector in batch_result]
+
+
+async def aembed_texts(embeddings, texts: List[str], embedding_model_name=None) -> List[List[float]]:
+    """Async counterpart of :func:`embed_texts` built on ``aembed_documents``."""
+    if not texts:
+        return []
+    batches = _batches(list(texts), get_embedding_batch_size(embedding_model_name))
+    semaphore = asyncio.Semaphore(get_embedding_batch_concurrency(embedding_model_name))
+
+    async def run(batch):
+        async with semaphore:
+            return await _aembed_batch(embeddings, batch)
+
+    results = await asyncio.gather(*(run(batch) for batch in batches))
+    return [vector for batch_result in results for vector in batch_result]
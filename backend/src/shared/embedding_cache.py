@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from src.shared.embedding_batch import embed_texts
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cache", "embedding_cache.db")
+DEFAULT_EMBEDDING_CACHE_MEMORY_SIZE = 10000
+
+
+def content_hash(text: str) -> str:
+    """SHA1 of ``text``, the same hash used for Chunk ids."""
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def get_embedding_model_id(embeddings) -> str:
+    """Return a stable identifier for an embeddings instance, e.g. ``OpenAIEmbeddings:text-embedding-3-small``."""
+    for attr in ["model", "model_name", "model_id"]:
+        model_name = getattr(embeddings, attr, None)
+        if isinstance(model_name, str) and model_name:
+            return f"{type(embeddings).__name__}:{model_name}"
+    return type(embeddings).__name__
+
+
+class EmbeddingCache:
+    """
+    Two tier embedding cache keyed by (embedding model, dimension, content hash).
+
+    An in-memory LRU sits in front of a SQLite file so embeddings survive
+    restarts, retries and reprocessing of the same content.
+    """
+
+    def __init__(self, path: str = DEFAULT_EMBEDDING_CACHE_PATH, memory_size: int = DEFAULT_EMBEDDING_CACHE_MEMORY_SIZE):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, dimension, content_hash)
+            )"""
+        )
+        self._connection.commit()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, dimension: int, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for ``hashes``; missing hashes are left out of the result."""
+        found = {}
+        missing = []
+        with self._lock:
+            for content_sha1 in dict.fromkeys(hashes):
+                key = (model, dimension, content_sha1)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[content_sha1] = self._memory[key]
+                else:
+                    missing.append(content_sha1)
+            for i in range(0, len(missing), 500):
+                batch = missing[i:i + 500]
+                rows = self._connection.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? AND dimension = ? AND content_hash IN ({','.join('?' * len(batch))})",
+                    [model, dimension, *batch],
+                ).fetchall()
+                for content_sha1, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[content_sha1] = vector
+                    self._remember((model, dimension, content_sha1), vector)
+        return found
+
+    def put_many(self, model: str, dimension: int, vectors: Dict[str, List[float]]):
+        """Store ``vectors`` (content hash -> embedding) in both tiers."""
+        if not vectors:
+            return
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dimension, content_hash, vector) VALUES (?, ?, ?, ?)",
+                [(model, dimension, content_sha1, array("f", vector).tobytes()) for content_sha1, vector in vectors.items()],
+            )
+            self._connection.commit()
+            for content_sha1, vector in vectors.items():
+                self._remember((model, dimension, content_sha1), list(vector))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process wide cache, or None when EMBEDDING_CACHE_ENABLED is false."""
+    global _embedding_cache
+    if os.environ.get("EMBEDDING_CACHE_ENABLED", "True").lower() not in ("true", "1", "yes"):
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            path = os.environ.get("EMBEDDING_CACHE_PATH") or DEFAULT_EMBEDDING_CACHE_PATH
+            try:
+                memory_size = int(os.environ.get("EMBEDDING_CACHE_MEMORY_SIZE", DEFAULT_EMBEDDING_CACHE_MEMORY_SIZE))
+            except (TypeError, ValueError):
+                memory_size = DEFAULT_EMBEDDING_CACHE_MEMORY_SIZE
+            try:
+                _embedding_cache = EmbeddingCache(path, memory_size)
+                logging.info(f"Embedding cache opened at {path}")
+            except Exception as e:
+                logging.error(f"Unable to open embedding cache at {path}: {e}")
+                return None
+        return _embedding_cache
+
+
+def embed_texts_with_cache(embeddings, texts: List[str], dimension: int, embedding_model_name=None, hashes: Optional[List[str]] = None) -> List[List[float]]:
+    """
+    Embed ``texts``, serving unchanged content from the embedding cache.
+
+    Args:
+        embeddings: A langchain Embeddings instance.
+        texts: Texts to embed.
+        dimension: Embedding dimension, part of the cache key.
+        embedding_model_name: Value of EMBEDDING_MODEL, used for batching.
+        hashes: Precomputed SHA1 of each text, e.g. the Chunk ids.
+    Returns:
+        One embedding per input text, in input order.
+    """
+    if not texts:
+        return []
+    cache = get_embedding_cache()
+    if cache is None:
+        return embed_texts(embeddings, texts, embedding_model_name)
+
+    hashes = hashes if hashes is not None else [content_hash(text) for text in texts]
+    model_id = get_embedding_model_id(embeddings)
+    cached = cache.get_many(model_id, dimension, hashes)
+    missing = {}
+    for content_sha1, text in zip(hashes, texts):
+        if content_sha1 not in cached and content_sha1 not in missing:
+            missing[content_sha1] = text
+    logging.info(f"Embedding cache hits: {len(texts) - len(missing)} of {len(texts)}")
+    if missing:
+        vectors = embed_texts(embeddings, list(missing.values()), embedding_model_name)
+        computed = dict(zip(missing.keys(), vectors))
+        cache.put_many(model_id, dimension, computed)
+        cached.update(computed)
+    return [cached[content_sha1] for content_sha1 in hashes]
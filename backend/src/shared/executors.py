@@ -0,0 +1,136 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_io_executor = None
+_cpu_executor = None
+_executors_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Thread pool for blocking I/O of the extraction path: Neo4j queries, downloads and embedding calls."""
+    global _io_executor
+    with _executors_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("EXTRACTION_IO_THREADS", 16)),
+                thread_name_prefix="extraction-io",
+            )
+        return _io_executor
+
+
+def get_cpu_executor():
+    """
+    Process pool for CPU bound stages such as document parsing and chunking,
+    or None when EXTRACTION_CPU_PROCESSES is 0. Workers are spawned rather
+    than forked because the server process runs threads and holds sockets.
+    """
+    global _cpu_executor
+    max_workers = int(os.environ.get("EXTRACTION_CPU_PROCESSES") or min(4, os.cpu_count() or 1))
+    if max_workers <= 0:
+        return None
+    with _executors_lock:
+        if _cpu_executor is None:
+            _cpu_executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _cpu_executor
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Run the blocking ``func`` on the I/O thread pool and await its result.
+    ``func`` sees the caller's context variables, like ``asyncio.to_thread``.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Run ``func`` in the process pool and await its result. ``func`` and its
+    arguments must be picklable. Without a process pool ``func`` runs on the
+    I/O thread pool instead.
+    """
+    global _cpu_executor
+    executor = get_cpu_executor()
+    if executor is None:
+        return await run_io(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    except BrokenProcessPool:
+        # A worker died, e.g. a parser crashed on a malformed file; the next call starts a fresh pool.
+        logging.error(f"Process pool broke while running {getattr(func, '__name__', func)}. Restarting it.")
+        with _executors_lock:
+            if _cpu_executor is executor:
+                _cpu_executor = None
+        raise
+
+
+def shutdown_executors():
+    global _io_executor, _cpu_executor
+    with _executors_lock:
+        executors = [_io_executor, _cpu_executor]
+        _io_executor = _cpu_executor = None
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task sleeping for
+    ``interval`` seconds. A lag close to zero means no blocking work is
+    running on the loop thread.
+    """
+
+    def __init__(self, interval=0.5, warning_threshold=None):
+        self.interval = interval
+        self.warning_threshold = warning_threshold if warning_threshold is not None else float(os.environ.get("EVENT_LOOP_LAG_WARNING_SECONDS", 0.5))
+        self.current = 0.0
+        self.average = 0.0
+        self.maximum = 0.0
+        self.samples = 0
+        self._task = None
+
+    def record(self, lag):
+        self.current = lag
+        self.maximum = max(self.maximum, lag)
+        self.average = lag if self.samples == 0 else 0.9 * self.average + 0.1 * lag
+        self.samples += 1
+        if lag > self.warning_threshold:
+            logging.warning(f"Event loop was blocked for {lag:.2f} seconds")
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(max(time.monotonic() - start - self.interval, 0.0))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="event-loop-lag-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "current_lag_ms": round(self.current * 1000, 1),
+            "average_lag_ms": round(self.average * 1000, 1),
+            "max_lag_ms": round(self.maximum * 1000, 1),
+            "samples": self.samples,
+        }
+
+
+event_loop_lag_monitor = EventLoopLagMonitor()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+DEFAULT_EXTRACTION_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cache", "extraction_cache.db")
+
+
+def extraction_cache_key(model_name: str, text: str, allowed_nodes, allowed_relationships, additional_instructions: Optional[str]) -> str:
+    """Hash of everything that influences the graph extracted from ``text``."""
+    payload = json.dumps(
+        [model_name, text, list(allowed_nodes or []), [list(rel) if isinstance(rel, (list, tuple)) else rel for rel in (allowed_relationships or [])], additional_instructions or ""],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _node_to_dict(node: Node) -> dict:
+    return {"id": node.id, "type": node.type, "properties": dict(node.properties or {})}
+
+
+def _node_from_dict(data: dict) -> Node:
+    return Node(id=data["id"], type=data["type"], properties=data.get("properties") or {})
+
+
+def serialize_graph_document(graph_document: GraphDocument) -> str:
+    """Serialize the nodes and relationships of ``graph_document``; the source is not stored."""
+    return json.dumps({
+        "nodes": [_node_to_dict(node) for node in graph_document.nodes],
+        "relationships": [
+            {
+                "source": _node_to_dict(rel.source),
+                "target": _node_to_dict(rel.target),
+                "type": rel.type,
+                "properties": dict(rel.properties or {}),
+            }
+            for rel in graph_document.relationships
+        ],
+    }, ensure_ascii=False, default=str)
+
+
+def deserialize_graph_document(payload: str, source: Document) -> GraphDocument:
+    """Rebuild a GraphDocument from :func:`serialize_graph_document` output for ``source``."""
+    data = json.loads(payload)
+    return GraphDocument(
+        nodes=[_node_from_dict(node) for node in data["nodes"]],
+        relationships=[
+            Relationship(
+                source=_node_from_dict(rel["source"]),
+                target=_node_from_dict(rel["target"]),
+                type=rel["type"],
+                properties=rel.get("properties") or {},
+            )
+            for rel in data["relationships"]
+        ],
+        source=source,
+    )
+
+
+class ExtractionCache:
+    """SQLite store of serialized GraphDocument outputs keyed by :func:`extraction_cache_key`."""
+
+    def __init__(self, path: str = DEFAULT_EXTRACTION_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS graph_documents (
+                cache_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL
+            )"""
+        )
+        self._connection.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Return the stored payloads for ``keys``; missing keys are left out of the result."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._connection.execute(
+                    f"SELECT cache_key, payload FROM graph_documents WHERE cache_key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, payloads: Dict[str, str]):
+        if not payloads:
+            return
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO graph_documents (cache_key, payload) VALUES (?, ?)",
+                list(payloads.items()),
+            )
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Return the process wide cache, or None when EXTRACTION_CACHE_ENABLED is false."""
+    global _extraction_cache
+    if os.environ.get("EXTRACTION_CACHE_ENABLED", "True").lower() not in ("true", "1", "yes"):
+        return None
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            path = os.environ.get("EXTRACTION_CACHE_PATH") or DEFAULT_EXTRACTION_CACHE_PATH
+            try:
+                _extraction_cache = ExtractionCache(path)
+                logging.info(f"Extraction cache opened at {path}")
+            except Exception as e:
+                logging.error(f"Unable to open extraction cache at {path}: {e}")
+                return None
+        return _extraction_cache
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+RATE_LIMIT_ERROR_PATTERNS = (
+    "429", "rate limit", "ratelimit", "rate_limit", "too many requests",
+    "resource exhausted", "resourceexhausted", "throttl", "quota",
+)
+
+# Tokens reserved for the completion on top of the estimated prompt size.
+COMPLETION_TOKEN_ESTIMATE = 512
+
+# Multiplicative decrease applied on a 429 and on a latency spike.
+THROTTLE_DECREASE = 0.5
+LATENCY_DECREASE = 0.9
+# A request slower than this multiple of the average latency, and slower
+# than MIN_LATENCY_SPIKE seconds, counts as a spike.
+LATENCY_SPIKE_FACTOR = 2.0
+MIN_LATENCY_SPIKE = 1.0
+# New requests are held back for this many seconds after a 429.
+THROTTLE_PAUSE = 1.0
+WAIT_POLL_INTERVAL = 0.05
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt plus the expected completion."""
+    return len(text or "") // 4 + COMPLETION_TOKEN_ESTIMATE
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    message = f"{type(error).__name__} {error}".lower()
+    return any(pattern in message for pattern in RATE_LIMIT_ERROR_PATTERNS)
+
+
+class TokenBucket:
+    """Bucket refilled continuously up to ``per_minute`` units per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now) -> float:
+        """Seconds until ``amount`` units are available."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class LLMGovernor:
+    """
+    Admission control for the calls made to one LLM.
+
+    Requests wait for a concurrency slot and for room in the optional
+    requests-per-minute and tokens-per-minute buckets. The concurrency limit
+    grows by about one slot per window of successful calls and is cut
+    multiplicatively on a 429 or a latency spike (AIMD), so throughput
+    settles just below the provider limit instead of oscillating.
+    """
+
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None, initial_concurrency=4, max_concurrency=16, min_concurrency=1, max_retries=3):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.min_concurrency = max(min(int(min_concurrency), self.max_concurrency), 1)
+        self.limit = float(min(max(int(initial_concurrency), self.min_concurrency), self.max_concurrency))
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.latency_average = None
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, tokens) -> float:
+        """Take a slot and reserve capacity, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.in_flight >= int(self.limit):
+                return WAIT_POLL_INTERVAL
+            wait = 0.0
+            if self.request_bucket is not None:
+                wait = max(wait, self.request_bucket.wait_time(1, now))
+            if self.token_bucket is not None:
+                wait = max(wait, self.token_bucket.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            if self.request_bucket is not None:
+                self.request_bucket.consume(1)
+            if self.token_bucket is not None:
+                self.token_bucket.consume(tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def _decrease(self, factor, now):
+        # One decrease per latency window, so a burst of 429s from the same
+        # congestion does not collapse the limit to its minimum.
+        if now - self._last_decrease < (self.latency_average or 1.0):
+            return
+        self.limit = max(float(self.min_concurrency), self.limit * factor)
+        self._last_decrease = now
+        logging.info(f"LLM governor {self.name}: concurrency limit lowered to {self.limit:.1f}")
+
+    def _release(self, latency=None, throttled=False):
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if throttled:
+                self._decrease(THROTTLE_DECREASE, now)
+                self._paused_until = max(self._paused_until, now + THROTTLE_PAUSE)
+                if self.request_bucket is not None:
+                    self.request_bucket.drain()
+                return
+            if latency is None:
+                return
+            previous_average = self.latency_average
+            self.latency_average = latency if previous_average is None else 0.8 * previous_average + 0.2 * latency
+            if previous_average is not None and latency > max(LATENCY_SPIKE_FACTOR * previous_average, MIN_LATENCY_SPIKE):
+                self._decrease(LATENCY_DECREASE, now)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+    def acquire(self, tokens=1):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 1.0))
+
+    async def aacquire(self, tokens=1):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    def run(self, func, *args, tokens=1, **kwargs):
+        """Call ``func`` under the governor, retrying it when the provider answers with a rate limit."""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            start = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                self._release(throttled=throttled)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logging.info(f"LLM governor {self.name}: rate limited ({e}). Retrying {attempt}/{self.max_retries}")
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release(latency=time.monotonic() - start)
+            return result
+
+    async def arun(self, func, *args, tokens=1, **kwargs):
+        """Async counterpart of :meth:`run` for a coroutine function."""
+        attempt = 0
+        while True:
+            await self.aacquire(tokens)
+            start = time.monotonic()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                self._release(throttled=throttled)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logging.info(f"LLM governor {self.name}: rate limited ({e}). Retrying {attempt}/{self.max_retries}")
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release(latency=time.monotonic() - start)
+            return result
+
+
+def _parse_rate_limit(model):
+    """Read ``LLM_RATE_LIMIT_<model>`` formatted as "requests_per_minute,tokens_per_minute"."""
+    env_value = os.environ.get(f"LLM_RATE_LIMIT_{model}")
+    if not env_value:
+        return None, None
+    parts = [part.strip() for part in env_value.split(",")] + ["", ""]
+    try:
+        requests_per_minute = int(parts[0]) if parts[0] else None
+        tokens_per_minute = int(parts[1]) if parts[1] else None
+    except ValueError:
+        logging.warning(f"LLM_RATE_LIMIT_{model} value {env_value!r} is invalid. Ignoring it.")
+        return None, None
+    return requests_per_minute, tokens_per_minute
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_llm_governor(model: str) -> LLMGovernor:
+    """Return the process wide governor of ``model``, the name used in LLM_MODEL_CONFIG_<model>."""
+    model = (model or "").lower().strip()
+    with _governors_lock:
+        governor = _governors.get(model)
+        if governor is None:
+            requests_per_minute, tokens_per_minute = _parse_rate_limit(model)
+            governor = LLMGovernor(
+                model,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                initial_concurrency=int(os.environ.get("LLM_INITIAL_CONCURRENCY", 4)),
+                max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 16)),
+            )
+            _governors[model] = governor
+        return governor
@@ -0,0 +1,178 @@
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Entries checked out by the current request or job, released when its checkout scope ends.
+_scope_checkouts = contextvars.ContextVar("neo4j_pool_checkouts", default=None)
+
+
+def connection_key(uri, username, password, database):
+    """Pool key for a set of credentials; the password is only kept as a hash."""
+    password_hash = hashlib.sha256((password or "").encode()).hexdigest()
+    return (uri, username, database, password_hash)
+
+
+@contextmanager
+def checkout_scope():
+    """
+    Count every connection handed out by any pool inside the block, including
+    in threads started with a copy of the context, as in use until the block
+    ends. Requests and extraction jobs each run in one scope.
+    """
+    checkouts = {}
+    token = _scope_checkouts.set(checkouts)
+    try:
+        yield
+    finally:
+        _scope_checkouts.reset(token)
+        for pool, entry in list(checkouts.values()):
+            pool._release(entry)
+
+
+class _PoolEntry:
+    __slots__ = ("resource", "last_used", "last_checked", "checkouts", "retired")
+
+    def __init__(self, resource, now):
+        self.resource = resource
+        self.last_used = now
+        self.last_checked = now
+        self.checkouts = 0
+        self.retired = False
+
+
+class Neo4jConnectionPool:
+    """
+    Process wide cache of Neo4j connections keyed by :func:`connection_key`.
+
+    The neo4j driver is thread safe and keeps its own pool of bolt
+    connections, so a single driver per set of credentials is shared by
+    every request. A connection handed out inside a :func:`checkout_scope`
+    is in use until the scope ends, and a connection in use is never
+    evicted. Unused entries that have not been handed out for
+    ``idle_timeout`` seconds are closed, and so are the least recently used
+    unused entries beyond ``max_size``. Connectivity is verified at most
+    every ``health_check_interval`` seconds; a broken driver is replaced and
+    closed once it is no longer in use.
+    """
+
+    def __init__(self, name, get_driver=None, max_size=None, idle_timeout=None, health_check_interval=None):
+        self.name = name
+        self._get_driver = get_driver or (lambda resource: resource)
+        self.max_size = max_size if max_size is not None else int(os.environ.get("NEO4J_POOL_MAX_SIZE", 32))
+        self.idle_timeout = idle_timeout if idle_timeout is not None else int(os.environ.get("NEO4J_POOL_IDLE_TIMEOUT", 600))
+        self.health_check_interval = health_check_interval if health_check_interval is not None else int(os.environ.get("NEO4J_POOL_HEALTH_CHECK_INTERVAL", 30))
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        # Replaced entries still in use, closed when their last checkout is released.
+        self._retired = set()
+        self._lock = threading.Lock()
+
+    def _close(self, resources):
+        for resource in resources:
+            try:
+                self._get_driver(resource).close()
+            except Exception as e:
+                logging.warning(f"{self.name} pool: error while closing connection: {e}")
+
+    def _retire(self, entry, closing):
+        """Close a connection that left the pool now, or when its last checkout is released."""
+        if entry.checkouts:
+            entry.retired = True
+            self._retired.add(entry)
+        else:
+            closing.append(entry.resource)
+
+    def _checkout(self, entry):
+        checkouts = _scope_checkouts.get()
+        if checkouts is None or id(entry) in checkouts:
+            return
+        checkouts[id(entry)] = (self, entry)
+        entry.checkouts += 1
+
+    def _release(self, entry):
+        with self._lock:
+            entry.checkouts -= 1
+            if not entry.retired or entry.checkouts:
+                return
+            self._retired.discard(entry)
+        self._close([entry.resource])
+
+    def _is_healthy(self, entry, now):
+        driver = self._get_driver(entry.resource)
+        if getattr(driver, "_closed", False):
+            return False
+        if now - entry.last_checked < self.health_check_interval:
+            return True
+        try:
+            driver.verify_connectivity()
+        except Exception as e:
+            logging.warning(f"{self.name} pool: connection failed health check ({e}). Reconnecting.")
+            return False
+        entry.last_checked = now
+        return True
+
+    def _evict_idle(self, now, closing):
+        for key in [key for key, entry in self._entries.items() if now - entry.last_used > self.idle_timeout and not entry.checkouts]:
+            self._key_locks.pop(key, None)
+            closing.append(self._entries.pop(key).resource)
+            logging.info(f"{self.name} pool: closed connection idle for more than {self.idle_timeout} seconds")
+
+    def _evict_overflow(self, new_key, closing):
+        unused = [key for key, entry in self._entries.items() if not entry.checkouts and key != new_key]
+        for key in unused[:max(len(self._entries) - self.max_size, 0)]:
+            self._key_locks.pop(key, None)
+            closing.append(self._entries.pop(key).resource)
+            logging.info(f"{self.name} pool: closed least recently used connection, pool size is {self.max_size}")
+
+    def get(self, key, factory):
+        """
+        Return the pooled connection for ``key``, building it with ``factory``
+        when needed. Inside a :func:`checkout_scope` it stays checked out until
+        the scope ends.
+        """
+        closing = []
+        with self._lock:
+            self._evict_idle(time.monotonic(), closing)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        self._close(closing)
+        with key_lock:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and self._is_healthy(entry, now):
+                with self._lock:
+                    entry.last_used = now
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self._checkout(entry)
+                return entry.resource
+            resource = factory()
+            closing = []
+            with self._lock:
+                if entry is not None and self._entries.get(key) is entry:
+                    self._retire(entry, closing)
+                new_entry = _PoolEntry(resource, time.monotonic())
+                self._entries[key] = new_entry
+                self._entries.move_to_end(key)
+                self._checkout(new_entry)
+                self._evict_overflow(key, closing)
+            self._close(closing)
+            return resource
+
+    def close_all(self):
+        """Close every pooled connection, e.g. on application shutdown."""
+        with self._lock:
+            resources = [entry.resource for entry in self._entries.values()]
+            resources.extend(entry.resource for entry in self._retired)
+            self._entries.clear()
+            self._key_locks.clear()
+            self._retired.clear()
+        self._close(resources)
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,6 +1,7 @@
 from typing import List
 from pydantic.v1 import BaseModel, Field
-from src.llm import get_llm
+from src.llm import get_llm, get_governor
+from src.shared.llm_governor import estimate_tokens
 from langchain_core.prompts import ChatPromptTemplate
 import logging
 
@@ -54,7 +55,7 @@ def get_schema_local_storage(input_text,llm):
         include_raw=False,
     )
     
-    raw_schema = runnable.invoke({"text": input_text})
+    raw_schema = get_governor(llm).run(runnable.invoke, {"text": input_text}, tokens=estimate_tokens(input_text))
     return raw_schema
 
 
@@ -78,7 +79,7 @@ def schema_extraction_from_text(input_text:str, model:str, is_schema_description
             include_raw=False,
         )
 
-        raw_schema = runnable.invoke({"text": input_text})
+        raw_schema = get_governor(llm).run(runnable.invoke, {"text": input_text}, tokens=estimate_tokens(input_text))
         if raw_schema:
             return raw_schema
         else:
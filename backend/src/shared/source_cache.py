@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from langchain_core.documents import Document
+
+DEFAULT_SOURCE_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cache", "source_cache.db")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of ``url`` for cache keys: lower case scheme and host, sorted query, no fragment or trailing slash."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def documents_to_json(pages: List[Document]) -> str:
+    return json.dumps([{"page_content": page.page_content, "metadata": page.metadata} for page in pages], ensure_ascii=False, default=str)
+
+
+def documents_from_json(payload: str) -> List[Document]:
+    return [Document(page_content=page["page_content"], metadata=page["metadata"]) for page in json.loads(payload)]
+
+
+class CachedSource:
+    __slots__ = ("payload", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, payload, etag, last_modified, fetched_at):
+        self.payload = payload
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+
+class SourceContentCache:
+    """
+    SQLite store of downloaded source content keyed by a normalized source
+    key, with the ETag and Last-Modified validators of the response.
+
+    Entries younger than ``ttl`` seconds are served without a request. Older
+    entries are revalidated with a conditional request when the source
+    supports it, and are still served when the source cannot be reached.
+    The least recently used entries are evicted beyond ``max_bytes``.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOURCE_CACHE_PATH, ttl: float = 86400, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS sources (
+                source_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self._connection.commit()
+
+    def get(self, source_key: str) -> Optional[CachedSource]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload, etag, last_modified, fetched_at FROM sources WHERE source_key = ?", (source_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE sources SET last_used = ? WHERE source_key = ?", (time.time(), source_key))
+            self._connection.commit()
+        return CachedSource(*row)
+
+    def is_fresh(self, entry: CachedSource) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def put(self, source_key: str, payload: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        size = len(payload.encode())
+        if size > self.max_bytes:
+            logging.info(f"Source content of {source_key} is larger than the cache size limit and is not cached")
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sources (source_key, payload, etag, last_modified, fetched_at, last_used, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source_key, payload, etag, last_modified, now, now, size),
+            )
+            total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM sources").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = []
+                for key, entry_size in self._connection.execute("SELECT source_key, size FROM sources ORDER BY last_used"):
+                    if total <= self.max_bytes:
+                        break
+                    if key != source_key:
+                        evicted.append((key,))
+                        total -= entry_size
+                self._connection.executemany("DELETE FROM sources WHERE source_key = ?", evicted)
+            self._connection.commit()
+
+    def mark_revalidated(self, source_key: str):
+        """Restart the TTL of an entry the source confirmed as unchanged."""
+        with self._lock:
+            self._connection.execute("UPDATE sources SET fetched_at = ? WHERE source_key = ?", (time.time(), source_key))
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+_source_cache = None
+_source_cache_lock = threading.Lock()
+
+
+def get_source_cache() -> Optional[SourceContentCache]:
+    """Return the process wide cache, or None when SOURCE_CACHE_ENABLED is false."""
+    global _source_cache
+    if os.environ.get("SOURCE_CACHE_ENABLED", "True").lower() not in ("true", "1", "yes"):
+        return None
+    with _source_cache_lock:
+        if _source_cache is None:
+            path = os.environ.get("SOURCE_CACHE_PATH") or DEFAULT_SOURCE_CACHE_PATH
+            try:
+                _source_cache = SourceContentCache(
+                    path,
+                    ttl=float(os.environ.get("SOURCE_CACHE_TTL_SECONDS", 86400)),
+                    max_bytes=int(os.environ.get("SOURCE_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+                )
+                logging.info(f"Source content cache opened at {path}")
+            except Exception as e:
+                logging.error(f"Unable to open source content cache at {path}: {e}")
+                return None
+        return _source_cache
+
+
+def fetch_with_cache(source_key: str, fetch: Callable, revalidate: Optional[Callable] = None) -> str:
+    """
+    Return the content of ``source_key``, fetching it only when the cache has
+    no fresh copy.
+
+    ``fetch()`` returns ``(payload, etag, last_modified)``. ``revalidate(etag,
+    last_modified)`` returns None when the source is unchanged, or a new
+    ``(payload, etag, last_modified)``. A stale entry is served when the
+    source fails.
+    """
+    cache = get_source_cache()
+    if cache is None:
+        return fetch()[0]
+    entry = cache.get(source_key)
+    if entry is not None and cache.is_fresh(entry):
+        logging.info(f"Source content of {source_key} served from cache")
+        return entry.payload
+    try:
+        if entry is not None and revalidate is not None and (entry.etag or entry.last_modified):
+            fetched = revalidate(entry.etag, entry.last_modified)
+            if fetched is None:
+                logging.info(f"Source content of {source_key} is unchanged")
+                cache.mark_revalidated(source_key)
+                return entry.payload
+        else:
+            fetched = fetch()
+    except Exception as e:
+        if entry is None:
+            raise
+        logging.warning(f"Fetching {source_key} failed ({e}). Serving the cached copy.")
+        return entry.payload
+    payload, etag, last_modified = fetched
+    cache.put(source_key, payload, etag, last_modified)
+    return payload
@@ -0,0 +1,90 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.document_sources import s3_bucket
+from src.entities.source_node import sourceNode
+from src.graphDB_dataAccess import graphDBdataAccess
+
+
+class FakePageIterator:
+    """Like botocore's PageIterator, every iteration lists the pages again from the start."""
+
+    def __init__(self, pages, listed):
+        self.pages = pages
+        self.listed = listed
+
+    def __iter__(self):
+        for page in self.pages:
+            self.listed.append(page)
+            yield page
+
+
+class FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+        self.listed = []
+
+    def paginate(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakePageIterator(self.pages, self.listed)
+
+
+class FakeS3Client:
+    def __init__(self, pages):
+        self.paginator = FakePaginator(pages)
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return self.paginator
+
+
+class RecordingGraph:
+    _database = 'neo4j'
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query, params=None, session_params=None):
+        self.queries.append((query, params))
+        return []
+
+
+def test_s3_scan_follows_every_list_page(monkeypatch):
+    pages = [
+        {'Contents': [{'Key': f'docs/file_{page}_{i}.pdf', 'Size': i} for i in range(1000)] + [{'Key': 'docs/notes.txt', 'Size': 1}]}
+        for page in range(3)
+    ]
+    client = FakeS3Client(pages)
+    monkeypatch.setattr(s3_bucket.boto3, 'client', lambda *args, **kwargs: client)
+
+    files = list(s3_bucket.iter_s3_files_info('s3://bucket/docs/'))
+
+    assert len(files) == 3000
+    assert files[-1] == {'file_key': 'docs/file_2_999.pdf', 'file_size_bytes': 999}
+    assert len({file['file_key'] for file in files}) == 3000
+    assert client.paginator.calls == [{'Bucket': 'bucket', 'Prefix': 'docs/'}]
+    assert client.paginator.listed == pages
+
+
+def test_source_nodes_are_created_with_one_query_per_batch():
+    graph = RecordingGraph()
+    nodes = []
+    for i in range(3):
+        node = sourceNode()
+        node.file_name = f'file_{i}.pdf'
+        node.file_size = i
+        node.file_source = 's3 bucket'
+        node.created_at = datetime.now()
+        nodes.append(node)
+
+    graphDBdataAccess(graph).create_source_nodes(nodes)
+
+    assert len(graph.queries) == 1
+    query, params = graph.queries[0]
+    assert query.lstrip().startswith('UNWIND $rows AS row')
+    assert [row['fn'] for row in params['rows']] == ['file_0.pdf', 'file_1.pdf', 'file_2.pdf']
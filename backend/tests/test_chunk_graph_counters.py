@@ -0,0 +1,103 @@
+import hashlib
+import importlib
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+
+@pytest.fixture
+def make_relationships(monkeypatch):
+    # The module loads the configured embedding model at import; the OpenAI client is built without a request.
+    monkeypatch.setenv("EMBEDDING_MODEL", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return importlib.import_module("src.make_relationships")
+
+
+class RecordingGraph:
+    _database = "neo4j"
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.queries = []
+
+    def query(self, query, params=None, session_params=None):
+        self.queries.append((query, params))
+        return self.results.pop(0) if self.results else []
+
+
+def _set_clause(query, counter):
+    return next(line.strip() for line in query.splitlines() if line.strip().startswith(("SET d." + counter, "d." + counter)))
+
+
+def test_document_counters_count_links_to_this_document(make_relationships):
+    query = make_relationships.QUERY_TO_WRITE_CHUNK_GRAPH
+
+    # A chunk shared with another document counts once it is PART_OF this one.
+    assert "CASE WHEN partOfCreated THEN row.id END" in query
+    assert "chunkNodeCount, 0) + size(linkedChunks)" in _set_clause(query, "chunkNodeCount")
+    # The totals keep the community counters, like the full recount.
+    assert "coalesce(d.communityNodeCount, 0)" in _set_clause(query, "nodeCount =")
+    assert "coalesce(d.communityRelCount, 0)" in _set_clause(query, "relationshipCount =")
+
+
+def test_entity_relationship_delta_is_per_document(make_relationships):
+    node = lambda node_id: SimpleNamespace(id=node_id)
+    rel = lambda source, rel_type, target: SimpleNamespace(source=node(source), type=rel_type, target=node(target))
+    graph_documents = [
+        SimpleNamespace(relationships=[rel("a", "knows", "b"), rel("b", "works at", "c")]),
+        SimpleNamespace(relationships=[rel("a", "knows", "b"), rel("c", "located in", "d")]),
+    ]
+    graph = RecordingGraph([[{"existing": 1}]])
+
+    assert make_relationships.count_new_entity_relationships(graph, "doc.pdf", graph_documents) == 2
+
+    query, params = graph.queries[0]
+    assert params["fileName"] == "doc.pdf"
+    assert sorted((r["source"], r["type"], r["target"]) for r in params["relationships"]) == [
+        ("a", "KNOWS", "b"), ("b", "WORKS_AT", "c"), ("c", "LOCATED_IN", "d"),
+    ]
+    assert "(d)<-[:PART_OF]-(:Chunk)-[:HAS_ENTITY]->(s)" in query
+
+
+def test_entity_relationship_delta_is_applied_once_per_write(make_relationships, monkeypatch):
+    monkeypatch.setattr(make_relationships, "split_rows_by_payload_size", lambda rows: [[row] for row in rows])
+    graph = RecordingGraph([[{"chunkNodeCount": 1}], [{"chunkNodeCount": 2}]])
+
+    counts = make_relationships.write_chunk_graph(graph, "doc.pdf", [{"id": "1", "text": "a"}, {"id": "2", "text": "b"}], entity_relationships_created=3)
+
+    assert counts == {"chunkNodeCount": 2}
+    assert [params["entityEntityRelsCreated"] for _, params in graph.queries] == [3, 0]
+
+
+def test_update_reprocesses_chunks_missing_embedding_or_entities(make_relationships, monkeypatch):
+    monkeypatch.setenv("IS_EMBEDDING", "true")
+    chunks = [Document(page_content=text) for text in ("done", "half done", "new")]
+    done_id, half_done_id, _ = (hashlib.sha1(chunk.page_content.encode()).hexdigest() for chunk in chunks)
+    graph = RecordingGraph([[
+        {"id": done_id, "next_ids": [half_done_id], "processed": True},
+        {"id": half_done_id, "next_ids": [], "processed": False},
+    ]])
+
+    pending = make_relationships.update_chunks_of_document(graph, "doc.pdf", chunks)
+
+    assert graph.queries[0][1] == {"filename": "doc.pdf", "requireEmbedding": True}
+    assert [chunk["chunk_doc"].page_content for chunk in pending] == ["half done", "new"]
+
+
+def test_update_recounts_the_document_only_when_chunks_are_removed(make_relationships):
+    chunks = [Document(page_content="kept")]
+    kept_id = hashlib.sha1(b"kept").hexdigest()
+    unchanged = RecordingGraph([[{"id": kept_id, "next_ids": [], "processed": True}]])
+    removed = RecordingGraph([[{"id": kept_id, "next_ids": [], "processed": True}, {"id": "gone", "next_ids": [], "processed": True}]])
+
+    make_relationships.update_chunks_of_document(unchanged, "doc.pdf", chunks)
+    make_relationships.update_chunks_of_document(removed, "doc.pdf", chunks)
+
+    assert not any("CALL db.labels" in query for query, _ in unchanged.queries)
+    assert any("CALL db.labels" in query for query, _ in removed.queries)
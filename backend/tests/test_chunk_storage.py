@@ -0,0 +1,58 @@
+import io
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.document_sources.gcs_bucket import merge_file_gcs, upload_file_to_gcs
+from src.shared.chunk_storage import LocalChunkStorage, compose_parts
+from src.shared.llm_graph_builder_exception import LLMGraphBuilderException
+
+
+class CountingStorage(LocalChunkStorage):
+    max_compose_sources = 3
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.compose_calls = []
+
+    def compose(self, sources, destination):
+        self.compose_calls.append(len(sources))
+        super().compose(sources, destination)
+
+
+def test_many_parts_are_composed_in_chained_steps(tmp_path):
+    storage = CountingStorage(str(tmp_path))
+    parts = [f"folder/doc.pdf_part_{i}" for i in range(1, 11)]
+    for i, name in enumerate(parts):
+        storage.write(name, io.BytesIO(bytes([i]) * (i + 1)))
+
+    size = compose_parts(storage, parts, "folder/doc.pdf")
+
+    expected = b"".join(bytes([i]) * (i + 1) for i in range(10))
+    assert size == len(expected)
+    with storage.open_read("folder/doc.pdf") as stream:
+        assert stream.read() == expected
+    assert max(storage.compose_calls) <= 3
+    assert sorted(path.name for path in (tmp_path / "folder").iterdir()) == ["doc.pdf"]
+
+
+def test_gcs_upload_and_merge_through_storage_interface(tmp_path):
+    storage = LocalChunkStorage(str(tmp_path))
+    for chunk_number, data in enumerate([b"abc", b"def", b"g"], start=1):
+        upload_file_to_gcs(SimpleNamespace(file=io.BytesIO(data)), chunk_number, "doc.txt", "bucket", "hash", chunk_storage=storage)
+
+    assert merge_file_gcs("bucket", "doc.txt", "hash", 3, chunk_storage=storage) == 7
+    assert (tmp_path / "hash" / "doc.txt").read_bytes() == b"abcdefg"
+
+
+def test_missing_part_fails_the_merge(tmp_path):
+    storage = LocalChunkStorage(str(tmp_path))
+    upload_file_to_gcs(SimpleNamespace(file=io.BytesIO(b"abc")), 1, "doc.txt", "bucket", "hash", chunk_storage=storage)
+
+    with pytest.raises(LLMGraphBuilderException):
+        merge_file_gcs("bucket", "doc.txt", "hash", 2, chunk_storage=storage)
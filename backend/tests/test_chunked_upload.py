@@ -0,0 +1,81 @@
+import fcntl
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+import src.shared.chunked_upload as chunked_upload
+from src.shared.chunked_upload import get_missing_upload_parts, write_upload_part
+
+CONTENT = bytes(range(256)) * 41  # 10496 bytes: three parts of 3000 and a short last one
+PART_SIZE = 3000
+
+
+def _parts():
+    return [CONTENT[i:i + PART_SIZE] for i in range(0, len(CONTENT), PART_SIZE)]
+
+
+def test_parts_written_out_of_order_assemble_the_file(tmp_path):
+    parts = _parts()
+    total = len(parts)
+    # The last part arrives first, before the part size is known.
+    order = [total, 2, 1, 3]
+    for part_number in order[:-1]:
+        assert write_upload_part(str(tmp_path), "doc.pdf", part_number, total, parts[part_number - 1]) is None
+
+    assert get_missing_upload_parts(str(tmp_path), "doc.pdf", total) == [3]
+    assert not (tmp_path / "doc.pdf").exists()
+
+    assert write_upload_part(str(tmp_path), "doc.pdf", 3, total, parts[2]) == len(CONTENT)
+    assert (tmp_path / "doc.pdf").read_bytes() == CONTENT
+    assert os.listdir(tmp_path) == ["doc.pdf"]
+
+
+def test_resent_parts_and_explicit_part_size(tmp_path):
+    parts = _parts()
+    total = len(parts)
+    for part_number in (1, 2, 2, 4):
+        assert write_upload_part(str(tmp_path), "doc.pdf", part_number, total, parts[part_number - 1], PART_SIZE) is None
+
+    assert write_upload_part(str(tmp_path), "doc.pdf", 3, total, parts[2], PART_SIZE) == len(CONTENT)
+    assert (tmp_path / "doc.pdf").read_bytes() == CONTENT
+
+
+def test_part_data_is_written_without_holding_the_state_lock(tmp_path, monkeypatch):
+    parts = _parts()
+    state_path = tmp_path / ("doc.pdf" + chunked_upload.PARTIAL_SUFFIX + chunked_upload.STATE_SUFFIX)
+    pwrite_all = chunked_upload._pwrite_all
+    locked_during_write = []
+
+    def checking_pwrite_all(fd, data, offset):
+        if bytes(data) in parts:
+            with open(state_path, "rb") as state_file:
+                try:
+                    fcntl.flock(state_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked_during_write.append(False)
+                except BlockingIOError:
+                    locked_during_write.append(True)
+        pwrite_all(fd, data, offset)
+
+    monkeypatch.setattr(chunked_upload, "_pwrite_all", checking_pwrite_all)
+    results = [write_upload_part(str(tmp_path), "doc.pdf", number, len(parts), part, PART_SIZE) for number, part in enumerate(parts, 1)]
+
+    assert results[-1] == len(CONTENT) and (tmp_path / "doc.pdf").read_bytes() == CONTENT
+    assert locked_during_write == [False] * len(parts)
+
+
+def test_parts_sent_to_several_processes_assemble_the_file(tmp_path):
+    content = CONTENT * 4
+    content_parts = [content[i:i + PART_SIZE] for i in range(0, len(content), PART_SIZE)]
+    total = len(content_parts)
+
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = list(executor.map(write_upload_part, [str(tmp_path)] * total, ["doc.pdf"] * total, range(1, total + 1), [total] * total, content_parts, [PART_SIZE] * total))
+
+    assert [result for result in results if result is not None] == [len(content)]
+    assert (tmp_path / "doc.pdf").read_bytes() == content
+    assert os.listdir(tmp_path) == ["doc.pdf"]
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+import tiktoken
+from langchain_core.documents import Document
+from langchain_text_splitters.base import Tokenizer, split_text_on_tokens
+
+import src.create_chunks as create_chunks
+from src.create_chunks import TokenWindowSplitter, clean_text, split_pages_into_chunks
+
+# Byte level encoding built in memory, so the tests do not download a tiktoken encoding.
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+
+def test_token_window_splitter_matches_langchain_token_splitting():
+    text = "The quick brown fox jumps over the lazy dog. Ünïcödé text too. " * 5
+    splitter = TokenWindowSplitter(chunk_size=17, chunk_overlap=5, encoding=BYTE_ENCODING)
+    tokenizer = Tokenizer(chunk_overlap=5, tokens_per_chunk=17, decode=BYTE_ENCODING.decode, encode=BYTE_ENCODING.encode)
+
+    assert splitter.split_text(text) == split_text_on_tokens(text=text, tokenizer=tokenizer)
+    assert splitter.split_text("") == []
+
+
+def test_token_window_splitter_rejects_special_tokens_like_langchain():
+    encoding = tiktoken.Encoding(
+        name="bytes_with_special",
+        pat_str=BYTE_ENCODING._pat_str,
+        mergeable_ranks=BYTE_ENCODING._mergeable_ranks,
+        special_tokens={"<|endoftext|>": 256},
+    )
+    text = "before <|endoftext|> after"
+
+    with pytest.raises(ValueError):
+        TokenWindowSplitter(chunk_size=8, chunk_overlap=0, encoding=encoding).split_text(text)
+    assert "".join(TokenWindowSplitter(chunk_size=8, chunk_overlap=0, encoding=encoding, disallowed_special=()).split_text(text)) == text
+
+
+def test_clean_text_removes_quotes_and_newlines():
+    assert clean_text('say "hi"\nit\'s me') == "say hi its me"
+
+
+def test_pages_are_consumed_only_up_to_the_chunk_budget(monkeypatch):
+    monkeypatch.setattr(create_chunks, "get_token_encoding", lambda: BYTE_ENCODING)
+    monkeypatch.setenv("MAX_TOKEN_CHUNK_SIZE", "12")
+    read_pages = []
+
+    def pages():
+        for number in range(1000):
+            read_pages.append(number)
+            yield Document(page_content=f'"page" {number:02d}abcdefghij', metadata={"page": number})
+
+    chunks = split_pages_into_chunks(pages(), 4, 0)
+
+    assert [chunk.page_content for chunk in chunks] == ["page", " 00a", "bcde"]
+    assert [chunk.metadata for chunk in chunks] == [{"page_number": 1}] * 3
+    assert read_pages == [0]
+
+
+def test_pages_without_page_numbers_keep_their_metadata(monkeypatch):
+    monkeypatch.setattr(create_chunks, "get_token_encoding", lambda: BYTE_ENCODING)
+    monkeypatch.setenv("MAX_TOKEN_CHUNK_SIZE", "100")
+
+    chunks = split_pages_into_chunks(iter([Document(page_content="it's\nfine", metadata={"source": "a.txt"})]), 10, 0)
+
+    assert [(chunk.page_content, chunk.metadata) for chunk in chunks] == [("its fine", {"source": "a.txt"})]
+    assert split_pages_into_chunks(iter([]), 10, 0) == []
@@ -0,0 +1,86 @@
+import asyncio
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.shared import embedding_batch
+from src.shared.embedding_batch import aembed_texts, embed_texts
+
+
+class _FakeEmbeddings:
+    def __init__(self, max_batch=None):
+        self.max_batch = max_batch
+        self.calls = []
+
+    def _check(self, texts):
+        self.calls.append(len(texts))
+        if self.max_batch is not None and len(texts) > self.max_batch:
+            raise ValueError("Too many inputs in batch")
+
+    def embed_documents(self, texts):
+        self._check(texts)
+        return [[float(len(text))] for text in texts]
+
+    async def aembed_documents(self, texts):
+        self._check(texts)
+        return [[float(len(text))] for text in texts]
+
+
+def test_embed_texts_batches_and_preserves_order(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "4")
+    monkeypatch.setenv("EMBEDDING_BATCH_CONCURRENCY", "3")
+    texts = ["x" * i for i in range(1, 11)]
+    embeddings = _FakeEmbeddings()
+
+    result = embed_texts(embeddings, texts, "openai")
+
+    assert result == [[float(i)] for i in range(1, 11)]
+    assert sorted(embeddings.calls) == [2, 4, 4]
+
+
+def test_embed_texts_splits_rejected_batches(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "8")
+    texts = ["x" * i for i in range(1, 9)]
+    embeddings = _FakeEmbeddings(max_batch=3)
+
+    result = embed_texts(embeddings, texts)
+
+    assert result == [[float(i)] for i in range(1, 9)]
+
+
+def test_aembed_texts_splits_rejected_batches(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "8")
+    texts = ["x" * i for i in range(1, 9)]
+    embeddings = _FakeEmbeddings(max_batch=2)
+
+    result = asyncio.run(aembed_texts(embeddings, texts, "openai"))
+
+    assert result == [[float(i)] for i in range(1, 9)]
+
+
+class _ThrottledEmbeddings(_FakeEmbeddings):
+    def __init__(self, rejections):
+        super().__init__()
+        self.rejections = rejections
+
+    def embed_documents(self, texts):
+        if self.rejections:
+            self.rejections -= 1
+            self.calls.append(len(texts))
+            raise RuntimeError("Error code: 429 - Rate limit reached")
+        return super().embed_documents(texts)
+
+
+def test_rate_limited_batches_are_retried_whole_with_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(embedding_batch.time, "sleep", delays.append)
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "8")
+    embeddings = _ThrottledEmbeddings(rejections=2)
+
+    result = embed_texts(embeddings, ["x" * i for i in range(1, 9)])
+
+    assert result == [[float(i)] for i in range(1, 9)]
+    assert embeddings.calls == [8, 8, 8]
+    assert delays == [1, 2]
@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+import src.shared.embedding_cache as embedding_cache
+from src.shared.embedding_cache import EmbeddingCache, content_hash, embed_texts_with_cache
+
+
+class _CountingEmbeddings:
+    model = "fake-model"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache(path, memory_size=1)
+    cache.put_many("model", 2, {"a": [1.0, 2.0], "b": [3.0, 4.0]})
+    cache.close()
+
+    reopened = EmbeddingCache(path, memory_size=1)
+    assert reopened.get_many("model", 2, ["a", "b", "c"]) == {"a": [1.0, 2.0], "b": [3.0, 4.0]}
+    assert reopened.get_many("other-model", 2, ["a"]) == {}
+    assert reopened.get_many("model", 3, ["a"]) == {}
+
+
+def test_embed_texts_with_cache_only_embeds_new_content(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.db"))
+    monkeypatch.setattr(embedding_cache, "_embedding_cache", None)
+    embeddings = _CountingEmbeddings()
+
+    first = embed_texts_with_cache(embeddings, ["alpha", "beta"], 2)
+    second = embed_texts_with_cache(embeddings, ["beta", "gamma", "alpha"], 2, hashes=[content_hash("beta"), content_hash("gamma"), content_hash("alpha")])
+
+    assert first == [[5.0, 0.5], [4.0, 0.5]]
+    assert second == [[4.0, 0.5], [5.0, 0.5], [5.0, 0.5]]
+    assert embeddings.embedded == ["alpha", "beta", "gamma"]
+    embedding_cache._embedding_cache.close()
+    monkeypatch.setattr(embedding_cache, "_embedding_cache", None)
+
+
+def test_embed_texts_with_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    embeddings = _CountingEmbeddings()
+
+    embed_texts_with_cache(embeddings, ["alpha"], 2)
+    embed_texts_with_cache(embeddings, ["alpha"], 2)
+
+    assert embeddings.embedded == ["alpha", "alpha"]
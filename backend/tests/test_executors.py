@@ -0,0 +1,38 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.shared.executors import EventLoopLagMonitor, run_cpu, run_io, shutdown_executors
+
+
+def test_run_cpu_and_run_io_keep_the_loop_responsive(monkeypatch):
+    monkeypatch.setenv("EXTRACTION_CPU_PROCESSES", "1")
+
+    async def scenario():
+        monitor = EventLoopLagMonitor(interval=0.01, warning_threshold=10)
+        monitor.start()
+        results = await asyncio.gather(run_cpu(pow, 2, 10), run_io(time.sleep, 0.2))
+        await monitor.stop()
+        return results, monitor
+
+    try:
+        (power, _), monitor = asyncio.run(scenario())
+    finally:
+        shutdown_executors()
+
+    assert power == 1024
+    assert monitor.samples > 5
+    assert monitor.maximum < 0.15
+
+
+def test_run_cpu_falls_back_to_threads_when_disabled(monkeypatch):
+    monkeypatch.setenv("EXTRACTION_CPU_PROCESSES", "0")
+    try:
+        assert asyncio.run(run_cpu(pow, 3, 2)) == 9
+    finally:
+        shutdown_executors()
+
@@ -0,0 +1,73 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+import src.llm as llm_module
+from src.shared.extraction_cache import ExtractionCache, deserialize_graph_document, extraction_cache_key, serialize_graph_document
+
+
+def test_graph_document_round_trip(tmp_path):
+    source = Document(page_content="Marie Curie worked in Paris.", metadata={"combined_chunk_ids": ["a"]})
+    person = Node(id="Marie Curie", type="Person", properties={"description": "Physicist"})
+    city = Node(id="Paris", type="City")
+    graph_document = GraphDocument(
+        nodes=[person, city],
+        relationships=[Relationship(source=person, target=city, type="WORKED_IN")],
+        source=source,
+    )
+    key = extraction_cache_key("ChatOpenAI:gpt-4o", source.page_content, ["Person", "City"], [("Person", "WORKED_IN", "City")], None)
+
+    cache = ExtractionCache(str(tmp_path / "extraction.db"))
+    cache.put_many({key: serialize_graph_document(graph_document)})
+    cache.close()
+    payload = ExtractionCache(str(tmp_path / "extraction.db")).get_many([key, "missing"])
+
+    assert list(payload) == [key]
+    restored = deserialize_graph_document(payload[key], source)
+    assert [(node.id, node.type, node.properties) for node in restored.nodes] == [("Marie Curie", "Person", {"description": "Physicist"}), ("Paris", "City", {})]
+    assert [(rel.source.id, rel.type, rel.target.id) for rel in restored.relationships] == [("Marie Curie", "WORKED_IN", "Paris")]
+    assert restored.source is source
+
+
+def test_cache_key_depends_on_schema_and_instructions():
+    base = extraction_cache_key("model", "text", ["Person"], [], None)
+    assert base == extraction_cache_key("model", "text", ["Person"], [], "")
+    assert base != extraction_cache_key("model", "text", ["Person", "City"], [], None)
+    assert base != extraction_cache_key("model", "text", ["Person"], [], "Only people")
+    assert base != extraction_cache_key("other-model", "text", ["Person"], [], None)
+
+
+def test_results_keep_chunk_order_and_empty_results_are_not_cached(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path / "extraction.db"))
+    chunks = [Document(page_content=text) for text in ("cached", "empty", "found")]
+    calls = []
+
+    async def fake_convert(llm, llm_transformer, documents):
+        calls.append([document.page_content for document in documents])
+        # Diffbot may skip a document it could not process.
+        return [
+            GraphDocument(nodes=[Node(id=document.page_content, type="Thing")] if document.page_content != "empty" else [], relationships=[], source=document)
+            for document in documents
+            if document.page_content != "skipped"
+        ]
+
+    monkeypatch.setattr(llm_module, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(llm_module, "convert_to_graph_documents", fake_convert)
+    llm = SimpleNamespace(diffbot_api_key="key", model_name="diffbot")
+    extract = lambda documents: asyncio.run(llm_module.get_graph_document_list(llm, documents, [], []))
+
+    extract(chunks[:1])
+    assert [document.source.page_content for document in extract(chunks)] == ["cached", "empty", "found"]
+    assert calls == [["cached"], ["empty", "found"]]
+
+    # The empty result was not cached, and a mismatched count still returns chunk order.
+    skipped = Document(page_content="skipped")
+    assert [document.source.page_content for document in extract([skipped] + chunks)] == ["cached", "empty", "found"]
+    assert calls[-1] == ["skipped", "empty"]
@@ -0,0 +1,94 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.ingestion_pipeline import run_ingestion_pipeline
+
+
+def _batches(count):
+    return [(i, i + 1, [f"chunk-{i}"]) for i in range(count)]
+
+
+def test_pipeline_writes_batches_in_order():
+    events = []
+
+    async def embed(batch):
+        events.append(("embed", batch.index))
+        return f"embedding-{batch.index}"
+
+    async def extract(batch):
+        await asyncio.sleep(0.01 * (3 - batch.index))
+        events.append(("extract", batch.index))
+        return f"graph-{batch.index}"
+
+    async def write(batch, embedding, extraction):
+        events.append(("write", batch.index, embedding, extraction))
+
+    written, stopped = asyncio.run(run_ingestion_pipeline(_batches(3), embed, extract, write))
+
+    assert written == 3
+    assert not stopped
+    writes = [event for event in events if event[0] == "write"]
+    assert writes == [("write", i, f"embedding-{i}", f"graph-{i}") for i in range(3)]
+
+
+def test_pipeline_overlaps_extraction_with_writes():
+    active = {"write": False, "overlap": False}
+
+    async def embed(batch):
+        return None
+
+    async def extract(batch):
+        if active["write"]:
+            active["overlap"] = True
+        return None
+
+    async def write(batch, embedding, extraction):
+        active["write"] = True
+        await asyncio.sleep(0.01)
+        active["write"] = False
+
+    asyncio.run(run_ingestion_pipeline(_batches(4), embed, extract, write))
+
+    assert active["overlap"]
+
+
+def test_pipeline_stops_when_requested():
+    written_batches = []
+
+    async def should_stop():
+        return len(written_batches) >= 1
+
+    async def noop(batch):
+        return None
+
+    async def write(batch, embedding, extraction):
+        written_batches.append(batch.index)
+
+    written, stopped = asyncio.run(
+        run_ingestion_pipeline(_batches(10), noop, noop, write, should_stop=should_stop, queue_size=1)
+    )
+
+    assert stopped
+    assert written == len(written_batches) < 10
+
+
+def test_pipeline_propagates_stage_errors():
+    async def embed(batch):
+        return None
+
+    async def extract(batch):
+        if batch.index == 1:
+            raise RuntimeError("llm failure")
+        return None
+
+    async def write(batch, embedding, extraction):
+        return None
+
+    with pytest.raises(RuntimeError, match="llm failure"):
+        asyncio.run(run_ingestion_pipeline(_batches(5), embed, extract, write))
@@ -0,0 +1,105 @@
+import asyncio
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src import job_queue
+from src.job_queue import ExtractJobQueue, ExtractWorkerPool, JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+
+def _params(user, file_name, password="secret"):
+    return {"uri": "neo4j://db", "userName": user, "database": "neo4j", "file_name": file_name, "password": password}
+
+
+def test_claim_order_uses_priority_then_tenant_fairness(tmp_path):
+    queue = ExtractJobQueue(str(tmp_path / "jobs.db"))
+    for i in range(3):
+        queue.submit(_params("alice", f"a{i}"))
+    queue.submit(_params("bob", "b0"))
+    queue.submit(_params("carol", "urgent"), priority=5)
+
+    claimed = [queue.claim_next()[1]["file_name"] for _ in range(5)]
+
+    assert claimed == ["urgent", "a0", "b0", "a1", "a2"]
+    assert queue.claim_next() is None
+
+
+def test_processes_share_the_queue_and_recover_stopped_siblings(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = ExtractJobQueue(path)
+    secret_job = queue.submit(_params("alice", "a0"))
+    plain_job = queue.submit(_params("alice", "a1", password=None))
+    queued_secret_job = queue.submit(_params("alice", "a2"))
+    sibling = ExtractJobQueue(path)
+
+    # Jobs needing credentials are only claimed by the process holding them.
+    assert sibling.claim_next()[0] == plain_job
+    assert sibling.claim_next() is None
+    job_id, params = queue.claim_next()
+    assert (job_id, params["password"]) == (secret_job, "secret")
+    assert "secret" not in (tmp_path / "jobs.db").read_bytes().decode("latin-1")
+    queue.close()
+
+    # The sibling is alive, so its running job is kept; the credentials of the stopped process are lost.
+    assert sibling.requeue_interrupted() == 0
+    assert sibling.get(plain_job)["status"] == JOB_RUNNING
+    assert sibling.get(secret_job)["status"] == JOB_FAILED
+    assert sibling.get(queued_secret_job)["status"] == JOB_FAILED
+    sibling.close()
+
+    restarted = ExtractJobQueue(path)
+    assert restarted.requeue_interrupted() == 1
+    assert restarted.get(plain_job)["status"] == JOB_QUEUED
+    assert restarted.claim_next()[0] == plain_job
+
+
+def test_waiters_see_cancellation_and_jobs_finished_elsewhere(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "WAIT_POLL_INTERVAL", 0.01)
+    path = str(tmp_path / "jobs.db")
+
+    async def scenario():
+        pool = ExtractWorkerPool(ExtractJobQueue(path), None, worker_count=1)
+        sibling = ExtractJobQueue(path)
+        cancelled_job = pool.submit(_params("alice", "a0", password=None))
+        finished_job = pool.submit(_params("alice", "a1", password=None))
+        cancelled_wait = asyncio.create_task(pool.wait(cancelled_job))
+        finished_wait = asyncio.create_task(pool.wait(finished_job))
+        await asyncio.sleep(0.05)
+
+        assert pool.cancel_queued("neo4j://db", "alice", "neo4j", "a0") == 1
+        job_id, _ = sibling.claim_next()
+        sibling.finish(job_id, JOB_COMPLETED, result={"status": "Success", "data": {"fileName": "a1"}})
+        return await asyncio.wait_for(asyncio.gather(cancelled_wait, finished_wait), 5)
+
+    cancelled, finished = asyncio.run(scenario())
+
+    assert cancelled["status"] == "Cancelled"
+    assert finished == {"status": "Success", "data": {"fileName": "a1"}}
+
+
+def test_worker_pool_bounds_concurrency_and_returns_responses(tmp_path):
+    running = []
+    peak = []
+
+    async def handler(params):
+        running.append(params["file_name"])
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(params["file_name"])
+        return {"status": "Success", "data": {"fileName": params["file_name"]}}
+
+    async def scenario():
+        pool = ExtractWorkerPool(ExtractJobQueue(str(tmp_path / "jobs.db")), handler, worker_count=2)
+        pool.start()
+        job_ids = [pool.submit(_params("alice", f"f{i}")) for i in range(6)]
+        responses = await asyncio.gather(*(pool.wait(job_id) for job_id in job_ids))
+        await pool.stop()
+        return pool, job_ids, responses
+
+    pool, job_ids, responses = asyncio.run(scenario())
+
+    assert [response["data"]["fileName"] for response in responses] == [f"f{i}" for i in range(6)]
+    assert max(peak) == 2
+    assert all(pool.queue.get(job_id)["status"] == JOB_COMPLETED for job_id in job_ids)
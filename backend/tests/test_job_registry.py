@@ -0,0 +1,43 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.job_registry import JobRegistry
+
+
+def test_cancel_stops_running_tasks_from_another_thread():
+    registry = JobRegistry()
+
+    async def run():
+        job = registry.register("neo4j://db", "neo4j", "neo4j", "file.pdf")
+        task = asyncio.ensure_future(asyncio.sleep(60))
+        job.add_task(task)
+        threading.Thread(target=registry.cancel, args=("neo4j://db", "neo4j", "neo4j", "file.pdf")).start()
+        try:
+            await asyncio.wait_for(task, timeout=5)
+        except asyncio.CancelledError:
+            pass
+        assert task.cancelled()
+        assert registry.is_cancelled("neo4j://db", "neo4j", "neo4j", "file.pdf")
+        registry.unregister("neo4j://db", "neo4j", "neo4j", "file.pdf", job)
+
+    asyncio.run(run())
+    assert not registry.is_cancelled("neo4j://db", "neo4j", "neo4j", "file.pdf")
+    assert registry.cancel("neo4j://db", "neo4j", "neo4j", "file.pdf") is False
+
+
+def test_jobs_of_other_databases_and_users_are_not_cancelled():
+    registry = JobRegistry()
+
+    async def run():
+        job = registry.register("neo4j://db", "neo4j", "sales", "file.pdf")
+        assert registry.cancel("neo4j://db", "neo4j", "hr", "file.pdf") is False
+        assert registry.cancel("neo4j://db", "analyst", "sales", "file.pdf") is False
+        assert not job.cancelled
+        assert registry.cancel("neo4j://db", "neo4j", "sales", "file.pdf") is True
+
+    asyncio.run(run())
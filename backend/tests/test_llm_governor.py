@@ -0,0 +1,58 @@
+import asyncio
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+import src.shared.llm_governor as llm_governor
+from src.shared.llm_governor import LLMGovernor, TokenBucket
+
+
+def test_token_bucket_reports_wait_until_refilled():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60, bucket.updated) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(1, bucket.updated) == 1.0
+
+
+def test_governor_never_exceeds_concurrency_limit():
+    governor = LLMGovernor("test", initial_concurrency=2, max_concurrency=2)
+    state = {"running": 0, "peak": 0}
+
+    async def call():
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(governor.arun(call) for _ in range(6)))
+
+    assert asyncio.run(run()) == ["ok"] * 6
+    assert state["peak"] == 2
+
+
+def test_governor_backs_off_on_rate_limit_and_retries(monkeypatch):
+    monkeypatch.setattr(llm_governor, "THROTTLE_PAUSE", 0)
+    governor = LLMGovernor("test", initial_concurrency=8, max_concurrency=8)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("Error code: 429 - Rate limit reached")
+        return "ok"
+
+    assert governor.run(call) == "ok"
+    assert len(calls) == 2
+    assert governor.limit < 8
+    assert governor.in_flight == 0
+
+
+def test_governor_grows_concurrency_additively():
+    governor = LLMGovernor("test", initial_concurrency=1, max_concurrency=4)
+    for _ in range(10):
+        governor.run(lambda: None)
+    assert 1 < governor.limit <= 4
@@ -0,0 +1,51 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from langchain_core.documents import Document
+from langchain_experimental.graph_transformers.diffbot import DiffbotGraphTransformer
+
+import src.llm as llm_module
+
+
+def test_get_llm_reuses_client_until_config_changes(monkeypatch):
+    built = []
+
+    def fake_create_llm(model):
+        built.append(model)
+        return object(), f"name-{len(built)}"
+
+    monkeypatch.setattr(llm_module, "create_llm", fake_create_llm)
+    llm_module.clear_llm_registry()
+    monkeypatch.setenv("LLM_MODEL_CONFIG_ollama_llama3", "llama3,http://localhost:11434")
+
+    first, first_name = llm_module.get_llm("Ollama_llama3 ")
+    second, second_name = llm_module.get_llm("ollama_llama3")
+    assert first is second and first_name == second_name == "name-1"
+
+    monkeypatch.setenv("LLM_MODEL_CONFIG_ollama_llama3", "llama3.1,http://localhost:11434")
+    third, third_name = llm_module.get_llm("ollama_llama3")
+    assert third is not first and third_name == "name-2"
+    assert built == ["ollama_llama3", "ollama_llama3"]
+    llm_module.clear_llm_registry()
+
+
+def test_diffbot_documents_are_converted_off_the_event_loop(monkeypatch):
+    diffbot = DiffbotGraphTransformer(diffbot_api_key="key")
+    threads = []
+
+    def fake_convert(documents):
+        threads.append(threading.current_thread())
+        return [f"graph of {document.page_content}" for document in documents]
+
+    monkeypatch.setattr(diffbot, "convert_to_graph_documents", fake_convert)
+    documents = [Document(page_content="first"), Document(page_content="second")]
+
+    result = asyncio.run(llm_module.convert_to_graph_documents(diffbot, diffbot, documents))
+
+    assert result == ["graph of first", "graph of second"]
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.document_sources import local_file
+from src.document_sources.local_file import get_documents_from_file_by_path, get_pages_with_page_numbers
+
+MARKDOWN = "intro\n# One\ntext\n```\n# not a heading\n```\n### Three\n## Two\nmore\n"
+
+
+def test_text_files_are_one_page_by_default(tmp_path):
+    file_path = tmp_path / "notes.md"
+    file_path.write_text(MARKDOWN, encoding="utf-8")
+
+    _, pages, _ = get_documents_from_file_by_path(file_path, "notes.md")
+
+    assert [(page.page_content, page.metadata["page_number"]) for page in pages] == [(MARKDOWN, 1)]
+
+
+def test_markdown_is_split_on_top_level_headings(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_file, "TEXT_FILE_SPLIT_PAGES", True)
+    file_path = tmp_path / "notes.md"
+    file_path.write_text(MARKDOWN, encoding="utf-8")
+
+    _, pages, _ = get_documents_from_file_by_path(file_path, "notes.md")
+
+    assert [page.page_content for page in pages] == [
+        "intro\n",
+        "# One\ntext\n```\n# not a heading\n```\n### Three\n",
+        "## Two\nmore\n",
+    ]
+    assert [page.metadata["page_number"] for page in pages] == [1, 2, 3]
+    assert pages[0].metadata["filetype"] == "text/markdown"
+
+
+def test_text_and_html_files_are_read_directly(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_file, "TEXT_FILE_SPLIT_PAGES", True)
+    text_path = tmp_path / "report.txt"
+    text_path.write_bytes("première page\fseconde page".encode("latin-1"))
+    html_path = tmp_path / "page.html"
+    html_path.write_text("<html><head><style>p {}</style></head><body><h1>Title</h1><p>Body <b>text</b></p></body></html>")
+
+    _, text_pages, _ = get_documents_from_file_by_path(text_path, "report.txt")
+    _, html_pages, _ = get_documents_from_file_by_path(html_path, "page.html")
+
+    assert [page.page_content for page in text_pages] == ["première page", "seconde page"]
+    assert [page.page_content for page in html_pages] == ["Title\nBody\ntext"]
+
+
+def _element(content, **metadata):
+    return Document(page_content=content, metadata={"source": "file", "filename": "file", "filetype": "text/plain", **metadata})
+
+
+def test_elements_are_grouped_by_page_number_or_page_break():
+    numbered = [_element("a", page_number=1), _element("b", page_number=1), _element("c", page_number=2), _element("c", page_number=2)]
+    broken = [_element("a", category="Title"), _element("", category="PageBreak"), _element("b", category="NarrativeText")]
+
+    assert [(page.page_content, page.metadata["page_number"]) for page in get_pages_with_page_numbers(numbered)] == [("ab", 1), ("cc", 2)]
+    assert [(page.page_content, page.metadata["page_number"]) for page in get_pages_with_page_numbers(broken)] == [("a", 1), ("b", 2)]
@@ -0,0 +1,92 @@
+import contextvars
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.shared.neo4j_pool import Neo4jConnectionPool, checkout_scope, connection_key
+
+
+class _FakeDriver:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self._closed = False
+        self.checks = 0
+
+    def verify_connectivity(self):
+        self.checks += 1
+        if not self.healthy:
+            raise ConnectionError("unreachable")
+
+    def close(self):
+        self._closed = True
+
+
+def test_pool_reuses_driver_per_credentials():
+    pool = Neo4jConnectionPool("test", max_size=4, idle_timeout=60, health_check_interval=60)
+    key = connection_key("neo4j://localhost", "neo4j", "secret", "neo4j")
+
+    first = pool.get(key, _FakeDriver)
+    second = pool.get(key, _FakeDriver)
+    other = pool.get(connection_key("neo4j://localhost", "neo4j", "other", "neo4j"), _FakeDriver)
+
+    assert first is second
+    assert other is not first
+    assert "secret" not in repr(key)
+
+
+def test_pool_replaces_closed_or_unhealthy_drivers():
+    pool = Neo4jConnectionPool("test", max_size=4, idle_timeout=60, health_check_interval=0)
+    first = pool.get("key", _FakeDriver)
+    first.healthy = False
+    second = pool.get("key", _FakeDriver)
+    second._closed = True
+    third = pool.get("key", _FakeDriver)
+
+    assert len({id(first), id(second), id(third)}) == 3
+
+
+def test_pool_limits_size_and_closes_on_shutdown():
+    pool = Neo4jConnectionPool("test", max_size=2, idle_timeout=60, health_check_interval=60)
+    drivers = [pool.get(key, _FakeDriver) for key in ["a", "b", "c"]]
+
+    assert len(pool) == 2
+    assert pool.get("a", _FakeDriver) is not drivers[0]
+    pool.close_all()
+    assert drivers[2]._closed and drivers[0]._closed
+    assert len(pool) == 0
+
+
+def test_replaced_unhealthy_drivers_are_closed_once_released():
+    pool = Neo4jConnectionPool("test", max_size=4, idle_timeout=60, health_check_interval=0)
+    unused = pool.get("unused", _FakeDriver)
+    unused.healthy = False
+    pool.get("unused", _FakeDriver)
+    assert unused._closed
+
+    with checkout_scope():
+        in_use = pool.get("in_use", _FakeDriver)
+        in_use.healthy = False
+        contextvars.Context().run(pool.get, "in_use", _FakeDriver)
+        assert not in_use._closed
+    assert in_use._closed
+
+
+def test_checked_out_drivers_are_never_evicted(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("src.shared.neo4j_pool.time.monotonic", lambda: clock[0])
+    pool = Neo4jConnectionPool("test", max_size=2, idle_timeout=60, health_check_interval=60)
+    idle = pool.get("idle", _FakeDriver)
+    with checkout_scope():
+        busy = pool.get("busy", _FakeDriver)
+        clock[0] = 100.0
+        # Requests outside the scope overflow the pool while the busy driver goes idle.
+        other_request = contextvars.Context()
+        other_request.run(pool.get, "b", _FakeDriver)
+        other_request.run(pool.get, "c", _FakeDriver)
+
+        assert idle._closed
+        assert not busy._closed and len(pool) == 2
+    pool.get("c", _FakeDriver)
+    assert busy._closed
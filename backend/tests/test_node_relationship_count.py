@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.graphDB_dataAccess import graphDBdataAccess
+from src.shared.constants import NODEREL_COUNT_QUERY_WITH_COMMUNITY
+
+
+class _FakeGraph:
+    _database = "neo4j"
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query, params=None, session_params=None):
+        self.queries.append((query, params))
+        if query == "CALL db.labels":
+            return [{"label": "__Community__"}]
+        if query == NODEREL_COUNT_QUERY_WITH_COMMUNITY:
+            return [
+                {"filename": "a.pdf", "chunkNodeCount": 2, "chunkRelCount": 3, "entityNodeCount": 4, "entityEntityRelCount": 5, "communityNodeCount": 1, "communityRelCount": 1},
+                {"filename": "b.pdf", "chunkNodeCount": 1, "chunkRelCount": 1, "entityNodeCount": 0, "entityEntityRelCount": 0, "communityNodeCount": 0, "communityRelCount": 0},
+            ]
+        return []
+
+
+def test_full_recount_updates_all_documents_in_one_query():
+    graph = _FakeGraph()
+
+    response = graphDBdataAccess(graph).update_node_relationship_count("")
+
+    assert response["a.pdf"]["nodeCount"] == 7
+    assert response["a.pdf"]["relationshipCount"] == 9
+    assert len(graph.queries) == 3
+    update_query, params = graph.queries[-1]
+    assert "UNWIND $rows" in update_query
+    assert [row["filename"] for row in params["rows"]] == ["a.pdf", "b.pdf"]
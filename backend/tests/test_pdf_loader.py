@@ -0,0 +1,61 @@
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.document_sources import pdf_loader
+from src.document_sources.local_file import get_documents_from_file_by_path
+
+
+def _write_pdf(path, page_count):
+    document = fitz.open()
+    for number in range(page_count):
+        document.new_page().insert_text((72, 72), f"page {number}")
+    document.save(str(path))
+    document.close()
+
+
+def test_parallel_parsing_returns_pages_in_order(tmp_path, monkeypatch):
+    file_path = tmp_path / "large.pdf"
+    _write_pdf(file_path, 23)
+    monkeypatch.setattr(pdf_loader, "PARALLEL_PDF_MIN_PAGES", 10)
+    monkeypatch.setattr(pdf_loader, "PDF_PAGES_PER_TASK", 4)
+
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pages = list(pdf_loader.iter_pdf_pages_parallel(file_path, source="gs://bucket/large.pdf", executor=executor))
+
+    assert [page.page_content.strip() for page in pages] == [f"page {number}" for number in range(23)]
+    assert [page.metadata["page"] for page in pages] == list(range(23))
+    assert {page.metadata["source"] for page in pages} == {"gs://bucket/large.pdf"}
+    assert {page.metadata["total_pages"] for page in pages} == {23}
+
+
+def test_small_files_match_the_sequential_loader(tmp_path):
+    file_path = tmp_path / "small.pdf"
+    _write_pdf(file_path, 3)
+
+    parallel = list(pdf_loader.iter_pdf_pages_parallel(file_path))
+    sequential = list(pdf_loader.iter_pdf_pages(str(file_path)))
+
+    assert parallel == sequential
+
+
+def test_local_pdf_loader_splits_large_files_across_the_pool(tmp_path, monkeypatch):
+    file_path = tmp_path / "report.pdf"
+    _write_pdf(file_path, 12)
+    monkeypatch.setattr(pdf_loader, "PARALLEL_PDF_MIN_PAGES", 5)
+    monkeypatch.setattr(pdf_loader, "PDF_PAGES_PER_TASK", 5)
+    assert pdf_loader.is_large_pdf(file_path)
+
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        monkeypatch.setattr(pdf_loader, "get_cpu_executor", lambda: executor)
+        file_name, pages, extension = get_documents_from_file_by_path(file_path, "report.pdf")
+
+    assert (file_name, extension) == ("report.pdf", ".pdf")
+    assert [page.metadata["page"] for page in pages] == list(range(12))
+    assert pages == list(pdf_loader.iter_pdf_pages(str(file_path)))
@@ -0,0 +1,67 @@
+import io
+import re
+import sys
+import threading
+from pathlib import Path
+
+import fitz
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from src.document_sources.s3_bucket import fetch_s3_object, get_documents_from_s3
+
+
+class StreamingBody:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def iter_chunks(self, chunk_size):
+        while data := self._stream.read(chunk_size):
+            yield data
+
+
+class LocalS3:
+    """In-memory stand-in for an S3-compatible endpoint that honours Range headers."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[(Bucket, Key)]
+        start, end = map(int, re.fullmatch(r'bytes=(\d+)-(\d+)', Range).groups())
+        with self._lock:
+            self.ranges.append((start, end))
+        return {'Body': StreamingBody(data[start:end + 1])}
+
+
+def _pdf_bytes(page_texts):
+    document = fitz.open()
+    for text in page_texts:
+        document.new_page().insert_text((72, 72), text)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def test_ranged_fetch_reassembles_the_object():
+    data = bytes(range(256)) * 100
+    s3 = LocalS3({('bucket', 'key'): data})
+
+    assert fetch_s3_object(s3, 'bucket', 'key', part_size=1000) == data
+    assert len(s3.ranges) == 26
+
+
+def test_pdf_from_s3_is_parsed_into_pages():
+    s3 = LocalS3({('bucket', 'docs/report.pdf'): _pdf_bytes(['first page', 'second page'])})
+
+    file_name, pages = get_documents_from_s3('s3://bucket/docs/report.pdf', None, None, s3=s3)
+
+    assert file_name == 'report.pdf'
+    assert [page.page_content.strip() for page in pages] == ['first page', 'second page']
+    assert [page.metadata['page'] for page in pages] == [0, 1]
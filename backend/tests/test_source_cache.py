@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+import src.shared.source_cache as source_cache
+from src.shared.source_cache import SourceContentCache, fetch_with_cache, normalize_url
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = SourceContentCache(str(tmp_path / "sources.db"), ttl=60, max_bytes=1000)
+    monkeypatch.setattr(source_cache, "_source_cache", cache)
+    yield cache
+    cache.close()
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com/Docs/?b=2&a=1#intro") == "https://example.com/Docs?a=1&b=2"
+    assert normalize_url("https://example.com") == "https://example.com/"
+
+
+def test_fresh_entry_is_served_without_fetching(cache):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return "content", '"v1"', None
+
+    assert fetch_with_cache("web:a", fetch) == "content"
+    assert fetch_with_cache("web:a", fetch) == "content"
+    assert len(calls) == 1
+
+
+def test_stale_entry_is_revalidated_and_served_when_source_fails(cache):
+    fetch_with_cache("web:a", lambda: ("v1", '"etag-1"', None))
+    cache.ttl = 0
+    seen_validators = []
+
+    def not_modified(etag, last_modified):
+        seen_validators.append(etag)
+        return None
+
+    assert fetch_with_cache("web:a", lambda: ("unused", None, None), not_modified) == "v1"
+    assert seen_validators == ['"etag-1"']
+
+    def failing_fetch():
+        raise ConnectionError("site down")
+
+    assert fetch_with_cache("youtube:a", lambda: ("transcript", None, None)) == "transcript"
+    assert fetch_with_cache("youtube:a", failing_fetch) == "transcript"
+    with pytest.raises(ConnectionError):
+        fetch_with_cache("youtube:b", failing_fetch)
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_limit(cache):
+    cache.put("a", "x" * 400)
+    cache.put("b", "y" * 400)
+    cache.get("a")
+    cache.put("c", "z" * 400)
+
+    assert cache.get("b") is None
+    assert cache.get("a").payload == "x" * 400
+    assert cache.get("c").payload == "z" * 400
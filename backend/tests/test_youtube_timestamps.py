@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from langchain_core.documents import Document
+
+from src.document_sources.youtube import get_calculated_timestamps
+
+TRANSCRIPT = [
+    {"text": "welcome to the\nlecture", "start": 0.0, "duration": 4.0},
+    {"text": "today we'll talk about graphs", "start": 4.0, "duration": 5.0},
+    {"text": "nodes and edges", "start": 9.0, "duration": 3.0},
+    {"text": 'and then about "paths"', "start": 3600.0, "duration": 6.5},
+]
+
+
+def test_chunks_get_the_timestamps_of_the_segments_they_span():
+    chunks = [
+        Document(page_content="welcome to the lecture today", metadata={}),
+        Document(page_content="today well talk about graphs nodes", metadata={}),
+        Document(page_content="edges and then about paths", metadata={}),
+    ]
+
+    get_calculated_timestamps(chunks, "abcdefghijk", transcript=TRANSCRIPT)
+
+    assert [(chunk.metadata["start_timestamp"], chunk.metadata["end_timestamp"]) for chunk in chunks] == [
+        ("0:00:00", "0:00:09"),
+        ("0:00:04", "0:00:12"),
+        ("0:00:09", "1:00:06"),
+    ]
+
+
+def test_unmatched_chunk_falls_back_to_the_search_position():
+    chunks = [Document(page_content="nodes and edges", metadata={}), Document(page_content="not in the transcript", metadata={})]
+
+    get_calculated_timestamps(chunks, "abcdefghijk", transcript=TRANSCRIPT)
+
+    assert chunks[0].metadata["start_timestamp"] == "0:00:09"
+    assert chunks[1].metadata["start_timestamp"] == "0:00:09"